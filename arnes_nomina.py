@@ -0,0 +1,327 @@
+"""
+Arnés diferencial de nómina: compara los motores alternativos con la ruta de referencia
+
+Genera plantillas de personal y novedades aleatorias, calcula la nómina con la
+ruta de referencia (un objeto Nomina por empleado) y con cada motor registrado,
+y verifica que los registros coincidan campo a campo. Por omisión la comparación
+es exacta: cada campo debe serializarse igual que en la referencia, con
+fecha_calculo como única excepción. Con una tolerancia en centavos, los campos de
+dinero que difieren dentro de ella se aceptan pero se cuentan y se informan.
+También informa el tiempo de cada motor y su relación de velocidad frente a la
+referencia.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+from typing import Any, Callable, Dict, List, Optional
+
+import sistema_rrhh
+from sistema_rrhh import (Empleado, Nomina, SistemaRRHH, MotorNominaCentavos, a_centavos,
+                          evaluador_reglas)
+
+# Campos de nómina con valores de dinero
+CAMPOS_DINERO = ("salario_base", "valor_hora_extra", "bonificaciones", "deduccion_salud",
+                 "deduccion_pension", "deducciones_adicionales", "total_devengado",
+                 "total_deducciones", "salario_neto")
+CAMPOS_IGNORADOS = ("fecha_calculo",)
+
+TIPOS_CONTRATO = ("indefinido", "termino_fijo", "prestacion_servicios")
+CARGOS = ("Desarrollador", "Analista", "Contador", "Gerente", "Auxiliar", "Diseñador")
+
+# Nombre del motor -> función(sistema, periodo, horas_extra, bonificaciones, deducciones)
+# que devuelve {cédula: nómina como diccionario} o None si no aplica con las reglas vigentes
+MOTORES: Dict[str, Callable] = {}
+
+
+def registrar_motor(nombre: str):
+    """Registra un motor de nómina para compararlo con la referencia"""
+    def decorador(funcion):
+        MOTORES[nombre] = funcion
+        return funcion
+    return decorador
+
+
+def generar_plantilla(cantidad: int, periodo: str, semilla: int = 0) -> Dict:
+    """Genera empleados y novedades aleatorias para un período"""
+    aleatorio = random.Random(semilla)
+    anio = int(periodo[:4])
+    empleados = []
+    horas_extra, bonificaciones, deducciones = {}, {}, {}
+
+    for i in range(cantidad):
+        cedula = str(10_000_000 + i)
+        empleado = Empleado(cedula, f"Nombre{i}", f"Apellido{i}", aleatorio.choice(CARGOS),
+                            aleatorio.randrange(130_000_000, 2_000_000_000) / 100,
+                            aleatorio.choice(TIPOS_CONTRATO), valoracion=aleatorio.randint(1, 10))
+        if aleatorio.random() < 0.3:
+            # Cambio salarial en el mismo año, antes o después del período
+            empleado.registrar_salario(aleatorio.randrange(130_000_000, 2_000_000_000) / 100,
+                                       f"{anio:04d}-{aleatorio.randint(1, 12):02d}")
+        if aleatorio.random() < 0.05:
+            empleado.desactivar()
+        empleados.append(empleado.to_dict())
+
+        if aleatorio.random() < 0.4:
+            horas_extra[cedula] = aleatorio.randint(1, 40)
+        if aleatorio.random() < 0.3:
+            bonificaciones[cedula] = aleatorio.choice([aleatorio.randrange(1, 100_000_000) / 100,
+                                                       aleatorio.randrange(1, 50) * 50000])
+        if aleatorio.random() < 0.2:
+            deducciones[cedula] = aleatorio.randrange(1, 20_000_000) / 100
+
+    return {"empleados": empleados, "horas_extra": horas_extra,
+            "bonificaciones": bonificaciones, "deducciones": deducciones}
+
+
+def normalizar(nomina_data: Dict) -> Dict:
+    """Deja una nómina lista para comparar: sin marcas de tiempo y cada valor serializado"""
+    return {campo: json.dumps(valor, sort_keys=True) for campo, valor in nomina_data.items()
+            if campo not in CAMPOS_IGNORADOS}
+
+
+def _dentro_de_tolerancia(campo: str, esperado, obtenido, tolerancia_centavos: int) -> bool:
+    """Indica si un campo de dinero difiere a lo sumo en la tolerancia indicada"""
+    if not tolerancia_centavos:
+        return False
+    if campo in CAMPOS_DINERO:
+        esperado, obtenido = {campo: esperado}, {campo: obtenido}
+    elif campo not in ("otras_deducciones", "otros_devengados"):
+        return False
+    try:
+        return (esperado.keys() == obtenido.keys() and
+                all(abs(a_centavos(esperado[nombre]) - a_centavos(obtenido[nombre])) <= tolerancia_centavos
+                    for nombre in esperado))
+    except (AttributeError, TypeError):
+        return False
+
+
+def comparar(referencia: Dict[str, Dict], resultado: Dict[str, Dict], tolerancia_centavos: int = 0,
+             limite: int = 20) -> Dict[str, Any]:
+    """Compara dos conjuntos de nóminas por cédula
+
+    Devuelve las diferencias descritas (a lo sumo limite) y la cantidad de campos
+    aceptados solo por estar dentro de la tolerancia.
+    """
+    diferencias = []
+    toleradas = 0
+    for cedula in sorted(set(referencia) | set(resultado)):
+        if cedula not in resultado:
+            diferencias.append(f"{cedula}: falta la nómina")
+        elif cedula not in referencia:
+            diferencias.append(f"{cedula}: nómina inesperada")
+        else:
+            esperada = normalizar(referencia[cedula])
+            obtenida = normalizar(resultado[cedula])
+            for campo in sorted(set(esperada) | set(obtenida)):
+                if esperada.get(campo) == obtenida.get(campo):
+                    continue
+                if (campo in esperada and campo in obtenida and _dentro_de_tolerancia(
+                        campo, referencia[cedula][campo], resultado[cedula][campo], tolerancia_centavos)):
+                    toleradas += 1
+                    continue
+                diferencias.append(f"{cedula}.{campo}: esperado {esperada.get(campo)}, "
+                                   f"obtenido {obtenida.get(campo)}")
+        if len(diferencias) >= limite:
+            break
+    return {"diferencias": diferencias[:limite], "toleradas": toleradas}
+
+
+def _nominas_registradas(sistema: SistemaRRHH, periodo: str) -> Dict[str, Dict]:
+    """Nóminas del período guardadas en el historial de los empleados"""
+    return {empleado.cedula: empleado.nomina_periodo(periodo)
+            for empleado in sistema.empleados.values()
+            if empleado.nomina_periodo(periodo) is not None}
+
+
+def referencia(sistema: SistemaRRHH, periodo: str, horas_extra: Dict, bonificaciones: Dict,
+               deducciones: Dict) -> Dict[str, Dict]:
+    """Ruta de referencia: un objeto Nomina por empleado activo"""
+    nominas = {}
+    for cedula, empleado in sistema.empleados.items():
+        if not empleado.activo:
+            continue
+        nomina = Nomina(empleado, periodo)
+        if cedula in horas_extra:
+            nomina.agregar_horas_extra(horas_extra[cedula])
+        if cedula in bonificaciones:
+            nomina.agregar_bonificacion(bonificaciones[cedula])
+        if cedula in deducciones:
+            nomina.agregar_deduccion(deducciones[cedula])
+        nominas[cedula] = nomina.to_dict()
+    return nominas
+
+
+@registrar_motor("procesar_nomina_completa")
+def _motor_completa(sistema, periodo, horas_extra, bonificaciones, deducciones):
+    sistema.procesar_nomina_completa(periodo, horas_extra, bonificaciones, deducciones)
+    return _nominas_registradas(sistema, periodo)
+
+
+@registrar_motor("procesar_nomina_incremental")
+def _motor_incremental(sistema, periodo, horas_extra, bonificaciones, deducciones):
+    sistema.procesar_nomina_incremental(periodo, horas_extra, bonificaciones, deducciones)
+    return _nominas_registradas(sistema, periodo)
+
+
+@registrar_motor("incremental_reutilizada")
+def _motor_incremental_reutilizada(sistema, periodo, horas_extra, bonificaciones, deducciones):
+    # La segunda corrida debe reutilizar todas las nóminas sin alterarlas
+    sistema.procesar_nomina_incremental(periodo, horas_extra, bonificaciones, deducciones)
+    resultado = sistema.procesar_nomina_incremental(periodo, horas_extra, bonificaciones, deducciones)
+    if resultado["recalculadas"]:
+        return {}
+    return _nominas_registradas(sistema, periodo)
+
+
+@registrar_motor("procesar_nomina_por_lotes")
+def _motor_por_lotes(sistema, periodo, horas_extra, bonificaciones, deducciones):
+    sistema.procesar_nomina_por_lotes(periodo, horas_extra, bonificaciones, deducciones,
+                                      tamano_lote=97)
+    return _nominas_registradas(sistema, periodo)
+
+
+@registrar_motor("motor_centavos_lote")
+def _motor_centavos_lote(sistema, periodo, horas_extra, bonificaciones, deducciones):
+    # Solo reproduce las reglas predeterminadas: salud, pensión y hora extra fija
+    if sistema_rrhh.REGLAS_NOMINA != sistema_rrhh.REGLAS_NOMINA_PREDETERMINADAS:
+        return None
+    evaluador = evaluador_reglas(periodo)
+    activos = [empleado for empleado in sistema.empleados.values() if empleado.activo]
+    salarios = [empleado.salario_vigente(periodo) for empleado in activos]
+    valores_hora = [evaluador.valor_hora_extra(a_centavos(salario), empleado.tipo_contrato)
+                    for salario, empleado in zip(salarios, activos)]
+    motor = MotorNominaCentavos()
+    columnas = motor.calcular_lote(
+        array('q', [a_centavos(salario) for salario in salarios]),
+        array('q', [horas_extra.get(empleado.cedula, 0) for empleado in activos]),
+        array('q', [a_centavos(valor) for valor in valores_hora]),
+        array('q', [a_centavos(bonificaciones.get(empleado.cedula, 0)) for empleado in activos]),
+        array('q', [a_centavos(deducciones.get(empleado.cedula, 0)) for empleado in activos]))
+
+    nominas = {}
+    for i, empleado in enumerate(activos):
+        nominas[empleado.cedula] = {
+            "empleado_cedula": empleado.cedula,
+            "empleado_nombre": f"{empleado.nombre} {empleado.apellido}",
+            "periodo": periodo,
+            "salario_base": salarios[i],
+            "tipo_contrato": empleado.tipo_contrato.lower(),
+            "horas_extra": horas_extra.get(empleado.cedula, 0),
+            "valor_hora_extra": valores_hora[i],
+            "bonificaciones": bonificaciones.get(empleado.cedula, 0),
+            "deduccion_salud": columnas["deduccion_salud"][i] / 100,
+            "deduccion_pension": columnas["deduccion_pension"][i] / 100,
+            "deducciones_adicionales": deducciones.get(empleado.cedula, 0),
+            "total_devengado": columnas["total_devengado"][i] / 100,
+            "total_deducciones": columnas["total_deducciones"][i] / 100,
+            "salario_neto": columnas["salario_neto"][i] / 100,
+            "tasas_pb": {"salud": motor.tasa_salud_pb, "pension": motor.tasa_pension_pb},
+            "reglas": evaluador.firma
+        }
+    return nominas
+
+
+def ejecutar_arnes(cantidad: int = 1000, periodo: str = "2024-06", semilla: int = 0,
+                   motores: Optional[List[str]] = None, directorio: str = None,
+                   tolerancia_centavos: int = 0) -> Dict[str, Dict]:
+    """Compara cada motor con la referencia sobre una plantilla aleatoria
+
+    Devuelve por motor: segundos, relacion (tiempo de referencia / tiempo del motor),
+    aplica, la lista de diferencias y toleradas (campos de dinero aceptados solo
+    por la tolerancia; siempre 0 con la comparación exacta). Cada motor trabaja
+    sobre su propia copia de los datos, cargada del mismo archivo.
+    """
+    plantilla = generar_plantilla(cantidad, periodo, semilla)
+    novedades = (plantilla["horas_extra"], plantilla["bonificaciones"], plantilla["deducciones"])
+    motores = motores or list(MOTORES)
+
+    with contextlib.ExitStack() as pila:
+        if directorio is None:
+            directorio = pila.enter_context(tempfile.TemporaryDirectory())
+        ruta = os.path.join(directorio, "plantilla.json")
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            json.dump({"sistema_info": {"version": "1.0"}, "empleados": plantilla["empleados"]},
+                      archivo, ensure_ascii=False)
+
+        def cargar(nombre: str) -> SistemaRRHH:
+            ruta_motor = os.path.join(directorio, f"{nombre}.json")
+            with open(ruta, 'rb') as origen, open(ruta_motor, 'wb') as destino:
+                destino.write(origen.read())
+            return SistemaRRHH(ruta_motor)
+
+        # Los mensajes de la consola del sistema no forman parte de la medición
+        with contextlib.redirect_stdout(io.StringIO()):
+            sistema = cargar("referencia")
+            inicio = time.perf_counter()
+            esperadas = referencia(sistema, periodo, *novedades)
+            tiempo_referencia = time.perf_counter() - inicio
+
+            resultados = {"referencia": {"segundos": tiempo_referencia, "relacion": 1.0,
+                                         "aplica": True, "diferencias": [], "toleradas": 0}}
+            for nombre in motores:
+                sistema = cargar(nombre)
+                inicio = time.perf_counter()
+                obtenidas = MOTORES[nombre](sistema, periodo, *novedades)
+                segundos = time.perf_counter() - inicio
+                comparacion = {"diferencias": [], "toleradas": 0}
+                if obtenidas is not None:
+                    comparacion = comparar(esperadas, obtenidas, tolerancia_centavos)
+                resultados[nombre] = {
+                    "segundos": segundos,
+                    "relacion": tiempo_referencia / segundos if segundos else float("inf"),
+                    "aplica": obtenidas is not None,
+                    **comparacion
+                }
+    return resultados
+
+
+def main(argumentos: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Arnés diferencial de motores de nómina")
+    parser.add_argument("--cantidad", type=int, default=5000)
+    parser.add_argument("--periodo", default="2024-06")
+    parser.add_argument("--semillas", type=int, default=3, help="cantidad de plantillas aleatorias")
+    parser.add_argument("--reglas", help="archivo JSON de reglas de nómina a usar")
+    parser.add_argument("--motor", action="append", choices=sorted(MOTORES),
+                        help="motor a comparar (por omisión, todos)")
+    parser.add_argument("--tolerancia-centavos", type=int, default=0,
+                        help="diferencia aceptada en los campos de dinero (por omisión, comparación exacta)")
+    opciones = parser.parse_args(argumentos)
+
+    if opciones.reglas and not sistema_rrhh.cargar_reglas_nomina(opciones.reglas):
+        return 2
+
+    fallas = 0
+    for semilla in range(opciones.semillas):
+        resultados = ejecutar_arnes(opciones.cantidad, opciones.periodo, semilla, opciones.motor,
+                                    tolerancia_centavos=opciones.tolerancia_centavos)
+        print(f"\nPlantilla {semilla}: {opciones.cantidad:,} empleados, período {opciones.periodo}")
+        if opciones.tolerancia_centavos:
+            print(f"Tolerancia: {opciones.tolerancia_centavos} centavo(s) en los campos de dinero")
+        print(f"{'MOTOR':<30} {'TIEMPO':>10} {'RELACIÓN':>10}  RESULTADO")
+        print("-" * 70)
+        for nombre, resultado in resultados.items():
+            if not resultado["aplica"]:
+                estado = "no aplica"
+            elif resultado["diferencias"]:
+                estado = f"{len(resultado['diferencias'])} diferencia(s)"
+                fallas += 1
+            elif resultado["toleradas"]:
+                estado = f"igual con tolerancia ({resultado['toleradas']} campo(s) distintos)"
+            else:
+                estado = "idéntico"
+            print(f"{nombre:<30} {resultado['segundos']:>9.3f}s {resultado['relacion']:>9.2f}x  {estado}")
+            for diferencia in resultado["diferencias"]:
+                print(f"    {diferencia}")
+    return 1 if fallas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
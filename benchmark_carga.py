@@ -0,0 +1,94 @@
+"""
+Compara la carga en serie de un almacenamiento fragmentado con la carga en procesos
+
+SistemaRRHH lee los fragmentos en serie. Este benchmark muestra por qué: los
+empleados tienen que quedar como objetos del proceso principal, y recibirlos de
+los trabajadores por pickle cuesta casi lo mismo que decodificar el JSON.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sistema_rrhh import _leer_fragmento, abrir_datos, ruta_fragmento
+
+
+def generar_almacen(directorio: str, cantidad: int, fragmentos: int, extension: str) -> list:
+    """Escribe los fragmentos de un almacenamiento de prueba y devuelve sus rutas"""
+    empleados = [[] for _ in range(fragmentos)]
+    for i in range(cantidad):
+        empleados[i % fragmentos].append({
+            "cedula": str(10_000_000 + i), "nombre": "Nombre", "apellido": f"Apellido{i}",
+            "cargo": "Analista", "salario_base": 3_000_000, "tipo_contrato": "indefinido",
+            "telefono": "3000000000", "email": f"empleado{i}@empresa.com", "valoracion": 7,
+            "activo": True, "fecha_desactivacion": None,
+            "historial_nominas": [{"periodo": f"2024-{mes:02d}", "salario_base": 3_000_000,
+                                   "deduccion_salud": 120_000.0, "deduccion_pension": 120_000.0,
+                                   "salario_neto": 2_760_000.0} for mes in range(1, 13)],
+            "historial_salarios": [], "historial_reajustes": [], "historial_valoraciones": []
+        })
+    rutas = []
+    for indice, lista in enumerate(empleados):
+        ruta = ruta_fragmento(os.path.join(directorio, f"empleados.json{extension}"), indice)
+        with abrir_datos(ruta, 'w') as archivo:
+            json.dump({"empleados": lista}, archivo)
+        rutas.append(ruta)
+    return rutas
+
+
+def leer_texto(ruta: str) -> str:
+    """Devuelve el texto descomprimido de un fragmento"""
+    with abrir_datos(ruta) as archivo:
+        return archivo.read()
+
+
+def medir(nombre: str, funcion):
+    """Ejecuta una función y muestra su duración"""
+    inicio = time.perf_counter()
+    resultado = funcion()
+    print(f"{nombre:<44} {time.perf_counter() - inicio:>8.3f}s")
+    return resultado
+
+
+def cargar_en_paralelo(rutas: list, procesos: int, funcion) -> list:
+    """Reparte la lectura de los fragmentos entre procesos trabajadores"""
+    with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+        return list(ejecutor.map(funcion, rutas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de carga de fragmentos")
+    parser.add_argument("--cantidad", type=int, default=50_000)
+    parser.add_argument("--fragmentos", type=int, default=8)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f"Empleados: {args.cantidad:,}  fragmentos: {args.fragmentos}  procesos: {args.procesos}")
+    with tempfile.TemporaryDirectory() as directorio:
+        for extension in ("", ".gz", ".xz"):
+            rutas = generar_almacen(directorio, args.cantidad, args.fragmentos, extension)
+            tamano = sum(os.path.getsize(ruta) for ruta in rutas) / 1e6
+            print("-" * 60)
+            print(f"Extensión {extension or '.json'} ({tamano:,.1f} MB en disco)")
+            medir("en serie (json.load por fragmento)", lambda: [_leer_fragmento(r) for r in rutas])
+            textos = medir("solo descomprimir, en serie", lambda: [leer_texto(r) for r in rutas])
+            medir("solo decodificar JSON", lambda: [json.loads(t) for t in textos])
+            cargas = [pickle.dumps(_leer_fragmento(r), pickle.HIGHEST_PROTOCOL) for r in rutas]
+            medir("recibir diccionarios por pickle", lambda: [pickle.loads(c) for c in cargas])
+            cargas = [pickle.dumps(t, pickle.HIGHEST_PROTOCOL) for t in textos]
+            medir("recibir texto por pickle", lambda: [pickle.loads(c) for c in cargas])
+            medir("trabajadores devuelven diccionarios",
+                  lambda: cargar_en_paralelo(rutas, args.procesos, _leer_fragmento))
+            medir("trabajadores descomprimen, JSON aquí",
+                  lambda: [json.loads(t) for t in cargar_en_paralelo(rutas, args.procesos,
+                                                                     leer_texto)])
+            for ruta in rutas:
+                os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Compara el rendimiento del cálculo de nómina en float, Decimal y centavos enteros
+"""
+
+import argparse
+import random
+import time
+from array import array
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+
+from sistema_rrhh import (Empleado, Nomina, MotorNominaCentavos, VALOR_HORA_EXTRA_PREDETERMINADO,
+                          evaluador_reglas)
+
+
+def generar_datos(cantidad: int, semilla: int = 7):
+    """Genera salarios y novedades aleatorias en centavos"""
+    aleatorio = random.Random(semilla)
+    salarios = [aleatorio.randrange(100_000_000, 1_500_000_000) + aleatorio.randrange(100)
+                for _ in range(cantidad)]
+    horas = [aleatorio.randrange(0, 20) for _ in range(cantidad)]
+    bonificaciones = [aleatorio.randrange(0, 50_000_000) for _ in range(cantidad)]
+    deducciones = [aleatorio.randrange(0, 10_000_000) for _ in range(cantidad)]
+    return salarios, horas, bonificaciones, deducciones
+
+
+def medir(nombre: str, funcion, cantidad: int):
+    """Ejecuta una función y muestra su rendimiento"""
+    inicio = time.perf_counter()
+    resultado = funcion()
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<28} {duracion:>8.3f}s {cantidad / duracion:>14,.0f} nóminas/s")
+    return resultado
+
+
+def calcular_float(salarios, horas, bonificaciones, deducciones):
+    """Cálculo en float, igual que la versión original de Nomina"""
+    valor_hora = float(VALOR_HORA_EXTRA_PREDETERMINADO)
+    total = 0.0
+    for s, h, b, d in zip(salarios, horas, bonificaciones, deducciones):
+        base = s / 100
+        salud = base * 0.04
+        pension = base * 0.04
+        devengado = base + h * valor_hora + b / 100
+        total += devengado - (salud + pension + d / 100)
+    return total
+
+
+def calcular_decimal(salarios, horas, bonificaciones, deducciones):
+    """Cálculo exacto con Decimal"""
+    tasa = Decimal("0.04")
+    centavo = Decimal("0.01")
+    valor_hora = Decimal(VALOR_HORA_EXTRA_PREDETERMINADO)
+    total = Decimal(0)
+    for s, h, b, d in zip(salarios, horas, bonificaciones, deducciones):
+        base = Decimal(s).scaleb(-2)
+        salud = (base * tasa).quantize(centavo, rounding=ROUND_HALF_UP)
+        pension = (base * tasa).quantize(centavo, rounding=ROUND_HALF_UP)
+        devengado = base + h * valor_hora + Decimal(b).scaleb(-2)
+        total += devengado - (salud + pension + Decimal(d).scaleb(-2))
+    return total
+
+
+def calcular_centavos(evaluador, salarios, horas, bonificaciones, deducciones):
+    """Cálculo escalar en centavos con las reglas compiladas, un empleado a la vez"""
+    valor_hora = VALOR_HORA_EXTRA_PREDETERMINADO * 100
+    total = 0
+    for s, h, b, d in zip(salarios, horas, bonificaciones, deducciones):
+        total += evaluador.calcular(s, "indefinido", h, valor_hora, b, d)["salario_neto"]
+    return total
+
+
+class NominaFloat:
+    """Nomina original en float, como referencia para los objetos Nomina"""
+    
+    def __init__(self, empleado: Empleado, periodo: str):
+        self.empleado = empleado
+        self.periodo = periodo
+        self.fecha_calculo = datetime.now().isoformat()
+        self.salario_base = empleado.salario_base
+        self.horas_extra = 0
+        self.valor_hora_extra = VALOR_HORA_EXTRA_PREDETERMINADO
+        self.bonificaciones = 0
+        self.deducciones_adicionales = 0
+        self.deduccion_salud = self.salario_base * 0.04
+        self.deduccion_pension = self.salario_base * 0.04
+        self._calcular_nomina()
+    
+    def agregar_horas_extra(self, horas: int):
+        self.horas_extra = horas
+        self._calcular_nomina()
+    
+    def agregar_bonificacion(self, monto: float):
+        self.bonificaciones += monto
+        self._calcular_nomina()
+    
+    def agregar_deduccion(self, monto: float):
+        self.deducciones_adicionales += monto
+        self._calcular_nomina()
+    
+    def _calcular_nomina(self):
+        self.total_devengado = (self.salario_base + self.horas_extra * self.valor_hora_extra +
+                                self.bonificaciones)
+        self.total_deducciones = (self.deduccion_salud + self.deduccion_pension +
+                                  self.deducciones_adicionales)
+        self.salario_neto = self.total_devengado - self.total_deducciones
+
+
+def generar_empleados(salarios) -> list:
+    """Crea un empleado por salario"""
+    return [Empleado(str(i), "Ana", "Pérez", "Analista", s / 100, "indefinido")
+            for i, s in enumerate(salarios)]
+
+
+def calcular_objetos_float(empleados, horas, bonificaciones, deducciones):
+    """Cálculo con la Nomina original en float, un objeto por empleado"""
+    total = 0.0
+    for empleado, h, b, d in zip(empleados, horas, bonificaciones, deducciones):
+        nomina = NominaFloat(empleado, "2024-01")
+        nomina.agregar_horas_extra(h)
+        nomina.agregar_bonificacion(b / 100)
+        nomina.agregar_deduccion(d / 100)
+        total += nomina.salario_neto
+    return total
+
+
+def calcular_objetos_nomina(empleados, horas, bonificaciones, deducciones):
+    """Cálculo con objetos Nomina, uno por empleado"""
+    evaluador = evaluador_reglas("2024-01")
+    total = 0.0
+    for empleado, h, b, d in zip(empleados, horas, bonificaciones, deducciones):
+        nomina = Nomina(empleado, "2024-01", evaluador)
+        nomina.agregar_horas_extra(h)
+        nomina.agregar_bonificacion(b / 100)
+        nomina.agregar_deduccion(d / 100)
+        total += nomina.salario_neto
+    return total
+
+
+def calcular_objetos_lote(empleados, novedades):
+    """Cálculo con objetos Nomina liquidados por columnas, como en procesar_nomina_completa"""
+    nominas = Nomina.liquidar_lote(empleados, "2024-01", evaluador_reglas("2024-01"), *novedades)
+    return sum(nomina.salario_neto for nomina in nominas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de aritmética de nómina")
+    parser.add_argument("--cantidad", type=int, default=200_000)
+    args = parser.parse_args()
+
+    cantidad = args.cantidad
+    salarios, horas, bonificaciones, deducciones = generar_datos(cantidad)
+    motor = MotorNominaCentavos()
+    evaluador = evaluador_reglas("2024-01")
+
+    print(f"Nóminas por prueba: {cantidad:,}")
+    print("-" * 60)
+    total_float = medir("float (aritmética directa)",
+                        lambda: calcular_float(salarios, horas, bonificaciones, deducciones), cantidad)
+    total_decimal = medir("Decimal", lambda: calcular_decimal(salarios, horas, bonificaciones, deducciones),
+                          cantidad)
+    total_centavos = medir("centavos (escalar)",
+                           lambda: calcular_centavos(evaluador, salarios, horas, bonificaciones, deducciones),
+                           cantidad)
+
+    columnas = [array('q', salarios), array('q', horas),
+                array('q', [VALOR_HORA_EXTRA_PREDETERMINADO * 100]) * cantidad,
+                array('q', bonificaciones), array('q', deducciones)]
+    lote = medir("centavos (lote)", lambda: motor.calcular_lote(*columnas), cantidad)
+    empleados = generar_empleados(salarios)
+    medir("objetos Nomina float original",
+          lambda: calcular_objetos_float(empleados, horas, bonificaciones, deducciones), cantidad)
+    medir("objetos Nomina", lambda: calcular_objetos_nomina(empleados, horas, bonificaciones, deducciones),
+          cantidad)
+    cedulas = [empleado.cedula for empleado in empleados]
+    novedades = (dict(zip(cedulas, horas)),
+                 {cedula: b / 100 for cedula, b in zip(cedulas, bonificaciones)},
+                 {cedula: d / 100 for cedula, d in zip(cedulas, deducciones)})
+    medir("objetos Nomina (lote)", lambda: calcular_objetos_lote(empleados, novedades), cantidad)
+
+    total_lote = sum(lote["salario_neto"])
+    print("-" * 60)
+    print(f"Total neto float:    {total_float:,.2f}")
+    print(f"Total neto Decimal:  {total_decimal:,.2f}")
+    print(f"Total neto centavos: {total_centavos / 100:,.2f}")
+    print(f"Lote igual a escalar: {'sí' if total_lote == total_centavos else 'no'}")
+    print(f"Centavos igual a Decimal: {'sí' if Decimal(total_centavos).scaleb(-2) == total_decimal else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,548 @@
+import argparse
+import bz2
+import copy
+import csv
+import gzip
+import itertools
 import json
+import lzma
+import math
 import os
+import queue
+import sys
+import threading
+import time
+import unicodedata
+import weakref
+import zipfile
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from decimal import Decimal, ROUND_HALF_UP
+from functools import partial, wraps
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional
+
+VALOR_HORA_EXTRA_PREDETERMINADO = 20000
+TIPOS_CONTRATO_VALIDOS = ["indefinido", "termino_fijo", "prestacion_servicios"]
+
+
+# Compresores por extensión y firmas para detectar archivos comprimidos al leer
+COMPRESORES = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open, ".lzma": lzma.open}
+FIRMAS_COMPRESION = [(b"\x1f\x8b", gzip.open), (b"BZh", bz2.open), (b"\xfd7zXZ\x00", lzma.open)]
+
+
+def abrir_datos(ruta: str, modo: str = 'r'):
+    """Abre un archivo de datos en modo texto, comprimido o no
+    
+    Al leer detecta la compresión por la firma del archivo; al escribir la elige
+    por la extensión (.gz, .bz2, .xz, .lzma). El compresor trabaja en flujo: no
+    arma en memoria el archivo comprimido completo. Quien lee decide si arma el
+    documento: cargar_datos usa json.load y lo carga entero, mientras que
+    iterar_empleados_archivo lo recorre por bloques con LectorJSONIncremental.
+    """
+    if modo == 'r':
+        with open(ruta, 'rb') as archivo:
+            cabecera = archivo.read(6)
+        for firma, abrir in FIRMAS_COMPRESION:
+            if cabecera.startswith(firma):
+                return abrir(ruta, 'rt', encoding='utf-8')
+        return open(ruta, 'r', encoding='utf-8')
+    
+    abrir = COMPRESORES.get(os.path.splitext(ruta)[1].lower())
+    if abrir:
+        return abrir(ruta, modo + 't', encoding='utf-8')
+    return open(ruta, modo, encoding='utf-8')
+
+
+# Segundo de la última marca de tiempo y su texto ISO, para no formatearlo en cada nómina
+_marca_segundo = [None, ""]
+
+
+def fecha_calculo_actual() -> str:
+    """Devuelve la fecha y hora local actual con el mismo texto que datetime.now().isoformat()
+    
+    Solo arma la fecha cuando cambia el segundo; en cada llamada agrega los microsegundos.
+    """
+    segundo, microsegundo = divmod(time.time_ns() // 1000, 1000000)
+    if segundo != _marca_segundo[0]:
+        _marca_segundo[:] = segundo, datetime.fromtimestamp(segundo).isoformat() + "."
+    if microsegundo:
+        # Seis dígitos con ceros a la izquierda, más barato que un formato
+        return _marca_segundo[1] + str(1000000 + microsegundo)[1:]
+    return _marca_segundo[1][:-1]
+
+
+def formatear_centavos(centavos: int) -> str:
+    """Escribe un valor en centavos como pesos con dos decimales y signo explícito"""
+    pesos, resto = divmod(abs(centavos), 100)
+    return f"{'-' if centavos < 0 else ''}{pesos}.{resto:02d}"
+
+
+def a_centavos(valor: float) -> int:
+    """Convierte un valor en pesos a centavos enteros, redondeando la mitad hacia arriba"""
+    escalado = valor * 100
+    redondeado = math.floor(escalado + 0.5)
+    if -0.4999 < escalado - redondeado < 0.4999:
+        # Lejos de la mitad el redondeo binario coincide con el decimal
+        return redondeado
+    return int(Decimal(repr(valor)).scaleb(2).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+# Tasas de ley en puntos básicos (400 = 4%)
+TASA_SALUD_PB = 400
+TASA_PENSION_PB = 400
+
+
+class MotorNominaCentavos:
+    """Motor de nómina por columnas con el dinero en centavos enteros
+    
+    Reproduce las reglas predeterminadas (salud y pensión sobre el salario base,
+    redondeadas al centavo con la mitad hacia arriba) para muchos empleados a la
+    vez, con columnas array('q'). Nomina usa EvaluadorReglas, que admite
+    cualquier conjunto de reglas.
+    """
+    
+    def __init__(self, tasa_salud_pb: int = TASA_SALUD_PB, tasa_pension_pb: int = TASA_PENSION_PB):
+        self.tasa_salud_pb = tasa_salud_pb
+        self.tasa_pension_pb = tasa_pension_pb
+    
+    def calcular_lote(self, salarios: array, horas_extra: array, valores_hora_extra: array,
+                      bonificaciones: array, deducciones_adicionales: array) -> Dict[str, array]:
+        """Calcula la nómina de muchos empleados a partir de columnas en centavos"""
+        salud_pb = self.tasa_salud_pb
+        pension_pb = self.tasa_pension_pb
+        salud = [(s * salud_pb + 5000) // 10000 for s in salarios]
+        # Con tasas iguales la columna de pensión es la misma que la de salud
+        if pension_pb == salud_pb:
+            pension = salud
+        else:
+            pension = [(s * pension_pb + 5000) // 10000 for s in salarios]
+        devengado = [s + h * v + b for s, h, v, b in
+                     zip(salarios, horas_extra, valores_hora_extra, bonificaciones)]
+        deducciones = [a + b + d for a, b, d in zip(salud, pension, deducciones_adicionales)]
+        neto = [d - t for d, t in zip(devengado, deducciones)]
+        columna_salud = array('q', salud)
+        return {
+            "deduccion_salud": columna_salud,
+            "deduccion_pension": columna_salud if pension is salud else array('q', pension),
+            "total_devengado": array('q', devengado),
+            "total_deducciones": array('q', deducciones),
+            "salario_neto": array('q', neto)
+        }
+
+
+# Reglas de nómina declaradas como datos. Cada regla admite:
+#   nombre, concepto ("deduccion", "devengado" u "hora_extra"),
+#   porcentaje_pb (sobre el salario base, en puntos básicos) o valor (fijo, en pesos),
+#   tope (pesos), salario_desde / salario_hasta (banda salarial, hasta excluido),
+#   tipos_contrato (lista), vigente_desde / vigente_hasta ("YYYY-MM", hasta excluido)
+CONCEPTOS_REGLA = ("deduccion", "devengado", "hora_extra")
+REGLAS_NOMINA_PREDETERMINADAS = [
+    {"nombre": "salud", "concepto": "deduccion", "porcentaje_pb": TASA_SALUD_PB},
+    {"nombre": "pension", "concepto": "deduccion", "porcentaje_pb": TASA_PENSION_PB},
+    {"nombre": "hora_extra", "concepto": "hora_extra", "valor": VALOR_HORA_EXTRA_PREDETERMINADO}
+]
+
+
+def validar_periodo(periodo: Any) -> bool:
+    """Indica si un período tiene el formato YYYY-MM"""
+    return (isinstance(periodo, str) and len(periodo) == 7 and periodo[4] == "-" and
+            periodo[:4].isdigit() and periodo[5:].isdigit() and "01" <= periodo[5:] <= "12")
+
+
+def _validar_regla(regla: Dict):
+    """Verifica que una regla de nómina esté bien declarada"""
+    nombre = regla.get("nombre")
+    if not nombre or not isinstance(nombre, str):
+        raise ValueError(f"Regla sin nombre: {regla}")
+    if regla.get("concepto") not in CONCEPTOS_REGLA:
+        raise ValueError(f"Concepto inválido en la regla {nombre}: {regla.get('concepto')}")
+    if ("porcentaje_pb" in regla) == ("valor" in regla):
+        raise ValueError(f"La regla {nombre} debe declarar porcentaje_pb o valor, no ambos")
+    if regla["concepto"] == "hora_extra" and "valor" not in regla:
+        raise ValueError(f"La regla {nombre} de hora extra debe declarar un valor")
+    for campo in ("vigente_desde", "vigente_hasta"):
+        if campo in regla and not validar_periodo(regla[campo]):
+            raise ValueError(f"Período inválido en la regla {nombre}: {regla[campo]}")
+    tipos = regla.get("tipos_contrato")
+    if tipos is not None and (not isinstance(tipos, list) or
+                              not all(isinstance(tipo, str) for tipo in tipos)):
+        raise ValueError(f"tipos_contrato de la regla {nombre} debe ser una lista de textos")
+
+
+class EvaluadorReglas:
+    """Reglas de nómina compiladas para un período
+    
+    Al compilar se descartan las reglas no vigentes y, por cada tipo de contrato,
+    se precalcula la lista de reglas que aplica en cada tramo de la banda salarial.
+    Evaluar un empleado es una búsqueda por tipo de contrato y una bisección sobre
+    los bordes de la banda; solo se recorren las reglas que le aplican. Los tipos
+    de contrato se comparan sin distinguir mayúsculas.
+    """
+    
+    def __init__(self, reglas: List[Dict], periodo: str):
+        self.periodo = periodo
+        vigentes = [regla for regla in reglas
+                    if regla.get("vigente_desde", "") <= periodo < regla.get("vigente_hasta", "9999-99")]
+        self.firma = f"{zlib.crc32(json.dumps(vigentes, sort_keys=True).encode('utf-8')):08x}"
+        
+        tipos_regla = [{tipo.lower() for tipo in regla.get("tipos_contrato") or ()} for regla in vigentes]
+        self._grupos = {None: self._compilar_grupo([regla for regla, tipos in zip(vigentes, tipos_regla)
+                                                    if not tipos])}
+        for tipo in set().union(*tipos_regla):
+            self._grupos[tipo] = self._compilar_grupo(
+                [regla for regla, tipos in zip(vigentes, tipos_regla) if not tipos or tipo in tipos])
+        # Grupo de cada tipo de contrato tal como llega, para no normalizarlo en cada nómina
+        self._grupo_por_tipo: Dict[str, tuple] = {}
+        # Tramo común cuando todos los tramos son de ley con las mismas tasas y hora extra:
+        # entonces la nómina de muchos empleados se liquida por columnas (ver Nomina.liquidar_lote)
+        tramos = [tramo for _, tramos_grupo in self._grupos.values() for tramo in tramos_grupo]
+        self.tramo_uniforme = (tramos[0] if tramos[0][5] is not None and
+                               len({(tramo[2], tramo[5]) for tramo in tramos}) == 1 else None)
+    
+    @staticmethod
+    def _compilar_grupo(reglas: List[Dict]) -> tuple:
+        """Devuelve los bordes de la banda salarial y las reglas aplicables en cada tramo"""
+        bordes = sorted({a_centavos(regla[campo]) for regla in reglas
+                         for campo in ("salario_desde", "salario_hasta") if campo in regla})
+        tramos = []
+        # El tramo i cubre los salarios s con bisect_right(bordes, s) == i
+        for i in range(len(bordes) + 1):
+            inferior = bordes[i - 1] if i > 0 else None
+            superior = bordes[i] if i < len(bordes) else None
+            deducciones = []
+            devengados = []
+            valor_hora_extra = VALOR_HORA_EXTRA_PREDETERMINADO
+            for regla in reglas:
+                if "salario_desde" in regla and (
+                        inferior is None or a_centavos(regla["salario_desde"]) > inferior):
+                    continue
+                if "salario_hasta" in regla and (
+                        superior is None or a_centavos(regla["salario_hasta"]) < superior):
+                    continue
+                if regla["concepto"] == "hora_extra":
+                    valor_hora_extra = regla["valor"]
+                    continue
+                compilada = (regla["nombre"], regla.get("porcentaje_pb"),
+                             a_centavos(regla.get("valor", 0)),
+                             a_centavos(regla["tope"]) if "tope" in regla else None)
+                if regla["concepto"] == "deduccion":
+                    deducciones.append(compilada)
+                else:
+                    devengados.append(compilada)
+            # Tasas de salud y pensión para las etiquetas del comprobante, si son porcentajes
+            tasas = {}
+            for nombre, puntos_basicos, _, _ in deducciones:
+                if nombre in ("salud", "pension"):
+                    acumulado = tasas.get(nombre, 0)
+                    tasas[nombre] = (None if puntos_basicos is None or acumulado is None
+                                     else acumulado + puntos_basicos)
+            tasas = {nombre: pb for nombre, pb in tasas.items() if pb is not None}
+            # Tramo con solo salud y pensión porcentuales sin tope (las reglas de ley):
+            # se liquida sin recorrer las reglas ni armar diccionarios de conceptos
+            nombres = sorted(nombre for nombre, _, _, _ in deducciones)
+            solo_ley = (not devengados and nombres == ["pension", "salud"] and
+                        all(pb is not None and tope is None for _, pb, _, tope in deducciones))
+            tramos.append((tuple(deducciones), tuple(devengados), valor_hora_extra,
+                           a_centavos(valor_hora_extra), tasas,
+                           (tasas["salud"], tasas["pension"]) if solo_ley else None))
+        return bordes, tramos
+    
+    def _tramo(self, salario_base: int, tipo_contrato: str) -> tuple:
+        """Devuelve las reglas aplicables a un salario en centavos y un tipo de contrato"""
+        bordes, tramos = self._grupo_por_tipo.get(tipo_contrato) or self._grupo(tipo_contrato)
+        return tramos[bisect_right(bordes, salario_base)] if bordes else tramos[0]
+    
+    def _grupo(self, tipo_contrato: str) -> tuple:
+        """Busca el grupo de reglas de un tipo de contrato sin distinguir mayúsculas"""
+        grupo = self._grupos.get(tipo_contrato.lower()) or self._grupos[None]
+        self._grupo_por_tipo[tipo_contrato] = grupo
+        return grupo
+    
+    @staticmethod
+    def _aplicar(reglas: tuple, salario_base: int) -> Dict[str, int]:
+        """Calcula en centavos los conceptos de las reglas aplicables"""
+        conceptos = {}
+        for nombre, puntos_basicos, valor, tope in reglas:
+            monto = valor if puntos_basicos is None else (salario_base * puntos_basicos + 5000) // 10000
+            if tope is not None and monto > tope:
+                monto = tope
+            conceptos[nombre] = conceptos.get(nombre, 0) + monto
+        return conceptos
+    
+    def valor_hora_extra(self, salario_base: int, tipo_contrato: str) -> float:
+        """Devuelve el valor de la hora extra en pesos para un salario en centavos"""
+        return self._tramo(salario_base, tipo_contrato)[2]
+    
+    def conceptos(self, salario_base: int, tipo_contrato: str) -> tuple:
+        """Devuelve las deducciones y devengados de las reglas en centavos y el valor de la hora extra
+        
+        El valor de la hora extra se devuelve en pesos y en centavos, seguido de las
+        tasas en puntos básicos de salud y pensión. Nada de esto depende de las
+        novedades, solo del salario base y el tipo de contrato.
+        """
+        reglas_deduccion, reglas_devengado, valor_pesos, valor_centavos, tasas, _ = self._tramo(
+            salario_base, tipo_contrato)
+        deducciones = self._aplicar(reglas_deduccion, salario_base) if reglas_deduccion else {}
+        devengados = self._aplicar(reglas_devengado, salario_base) if reglas_devengado else {}
+        return deducciones, devengados, valor_pesos, valor_centavos, tasas
+    
+    def liquidar(self, salario_base: int, tipo_contrato: str) -> tuple:
+        """Liquida las reglas de un salario en centavos para construir una Nomina
+        
+        Devuelve salud, pensión, las demás deducciones y los devengados (diccionarios),
+        el total de deducciones y de devengados de las reglas, el valor de la hora
+        extra en pesos y en centavos y las tasas de salud y pensión.
+        """
+        grupo = self._grupo_por_tipo.get(tipo_contrato) or self._grupo(tipo_contrato)
+        tramo = grupo[1][bisect_right(grupo[0], salario_base)] if grupo[0] else grupo[1][0]
+        ley = tramo[5]
+        if ley is not None:
+            salud = (salario_base * ley[0] + 5000) // 10000
+            pension = (salario_base * ley[1] + 5000) // 10000
+            return salud, pension, {}, {}, salud + pension, 0, tramo[2], tramo[3], tramo[4]
+        deducciones = self._aplicar(tramo[0], salario_base) if tramo[0] else {}
+        devengados = self._aplicar(tramo[1], salario_base) if tramo[1] else {}
+        salud = deducciones.pop("salud", 0)
+        pension = deducciones.pop("pension", 0)
+        return (salud, pension, deducciones, devengados, salud + pension + sum(deducciones.values()),
+                sum(devengados.values()), tramo[2], tramo[3], tramo[4])
+    
+    def calcular(self, salario_base: int, tipo_contrato: str, horas_extra: int = 0,
+                 valor_hora_extra: int = None, bonificaciones: int = 0,
+                 deducciones_adicionales: int = 0) -> Dict[str, Any]:
+        """Calcula la nómina de un empleado; todos los valores en centavos
+        
+        Las reglas llamadas salud y pension llenan deduccion_salud y deduccion_pension;
+        las demás se devuelven en otras_deducciones y otros_devengados.
+        """
+        deducciones, devengados, _, valor_regla, _ = self.conceptos(salario_base, tipo_contrato)
+        if valor_hora_extra is None:
+            valor_hora_extra = valor_regla
+        deduccion_salud = deducciones.pop("salud", 0)
+        deduccion_pension = deducciones.pop("pension", 0)
+        
+        total_devengado = (salario_base + horas_extra * valor_hora_extra + bonificaciones +
+                           sum(devengados.values()))
+        total_deducciones = (deduccion_salud + deduccion_pension + deducciones_adicionales +
+                             sum(deducciones.values()))
+        return {
+            "deduccion_salud": deduccion_salud,
+            "deduccion_pension": deduccion_pension,
+            "otras_deducciones": deducciones,
+            "otros_devengados": devengados,
+            "total_devengado": total_devengado,
+            "total_deducciones": total_deducciones,
+            "salario_neto": total_devengado - total_deducciones
+        }
+
+
+REGLAS_NOMINA = list(REGLAS_NOMINA_PREDETERMINADAS)
+_EVALUADORES: Dict[str, EvaluadorReglas] = {}
+_BLOQUEO_EVALUADORES = threading.Lock()
+
+
+def evaluador_reglas(periodo: str) -> EvaluadorReglas:
+    """Devuelve las reglas vigentes compiladas para un período, compilándolas una sola vez"""
+    evaluador = _EVALUADORES.get(periodo)
+    if evaluador is None:
+        with _BLOQUEO_EVALUADORES:
+            evaluador = _EVALUADORES.get(periodo)
+            if evaluador is None:
+                evaluador = _EVALUADORES[periodo] = EvaluadorReglas(REGLAS_NOMINA, periodo)
+    return evaluador
+
+
+def configurar_reglas_nomina(reglas: List[Dict]) -> bool:
+    """Reemplaza las reglas de nómina y descarta las compiladas anteriormente"""
+    global REGLAS_NOMINA
+    try:
+        for regla in reglas:
+            _validar_regla(regla)
+    except ValueError as e:
+        print(f"Error en las reglas de nómina: {e}")
+        return False
+    
+    with _BLOQUEO_EVALUADORES:
+        REGLAS_NOMINA = copy.deepcopy(list(reglas))
+        _EVALUADORES.clear()
+    return True
+
+
+def cargar_reglas_nomina(ruta: str) -> bool:
+    """Carga las reglas de nómina desde un archivo JSON"""
+    try:
+        with open(ruta, 'r', encoding='utf-8') as archivo:
+            reglas = json.load(archivo)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Error al cargar las reglas de nómina: {e}")
+        return False
+    if not isinstance(reglas, list):
+        print("Error al cargar las reglas de nómina: se esperaba una lista de reglas")
+        return False
+    return configurar_reglas_nomina(reglas)
+
+
+def marca_tiempo(fecha) -> float:
+    """Convierte una fecha ISO o datetime en una marca de tiempo numérica ordenable"""
+    if isinstance(fecha, datetime):
+        return fecha.timestamp()
+    try:
+        return datetime.fromisoformat(fecha).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+class BloqueoLecturaEscritura:
+    """Bloqueo reentrante de múltiples lectores y un escritor, con preferencia por escritores
+    
+    Un hilo que ya tiene el bloqueo de escritura puede leer y volver a escribir;
+    un hilo que solo tiene lectura no puede pasar a escritura.
+    """
+    
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._lectores = 0
+        self._escritor: Optional[int] = None
+        self._profundidad_escritura = 0
+        self._escritores_esperando = 0
+        self._local = threading.local()
+    
+    def adquirir_lectura(self):
+        profundidad = getattr(self._local, "lecturas", 0)
+        if profundidad or self._escritor == threading.get_ident():
+            self._local.lecturas = profundidad + 1
+            self._local.lector_real = getattr(self._local, "lector_real", False)
+            return
+        with self._condicion:
+            while self._escritor is not None or self._escritores_esperando:
+                self._condicion.wait()
+            self._lectores += 1
+        self._local.lecturas = 1
+        self._local.lector_real = True
+    
+    def liberar_lectura(self):
+        self._local.lecturas -= 1
+        if self._local.lecturas == 0 and self._local.lector_real:
+            self._local.lector_real = False
+            with self._condicion:
+                self._lectores -= 1
+                if not self._lectores:
+                    self._condicion.notify_all()
+    
+    def adquirir_escritura(self):
+        actual = threading.get_ident()
+        with self._condicion:
+            if self._escritor == actual:
+                self._profundidad_escritura += 1
+                return
+            if getattr(self._local, "lecturas", 0):
+                raise RuntimeError("No se puede pasar de lectura a escritura")
+            self._escritores_esperando += 1
+            try:
+                while self._escritor is not None or self._lectores:
+                    self._condicion.wait()
+            finally:
+                self._escritores_esperando -= 1
+            self._escritor = actual
+            self._profundidad_escritura = 1
+    
+    def liberar_escritura(self):
+        with self._condicion:
+            self._profundidad_escritura -= 1
+            if not self._profundidad_escritura:
+                self._escritor = None
+                self._condicion.notify_all()
+    
+    @contextmanager
+    def lectura(self):
+        self.adquirir_lectura()
+        try:
+            yield
+        finally:
+            self.liberar_lectura()
+    
+    @contextmanager
+    def escritura(self):
+        self.adquirir_escritura()
+        try:
+            yield
+        finally:
+            self.liberar_escritura()
+
+
+class BloqueoNulo:
+    """Bloqueo sin efecto para el modo de un solo hilo"""
+    
+    @contextmanager
+    def lectura(self):
+        yield
+    
+    @contextmanager
+    def escritura(self):
+        yield
+
+
+def _lectura(metodo):
+    """Ejecuta el método de SistemaRRHH con bloqueo de lectura"""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        with self._bloqueo.lectura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+def _escritura(metodo):
+    """Ejecuta el método de SistemaRRHH con bloqueo exclusivo de escritura"""
+    @wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        self._verificar_escritura()
+        with self._bloqueo.escritura():
+            return metodo(self, *args, **kwargs)
+    return envoltura
+
+
+class TablaCategorias:
+    """Tabla compartida que asigna códigos enteros a los valores de un campo categórico"""
+    
+    def __init__(self):
+        self._codigos: Dict[str, int] = {}
+        self.valores: List[str] = []
+        self._bloqueo = threading.Lock()
+    
+    def codificar(self, valor: str) -> int:
+        """Devuelve el código del valor, registrándolo si es nuevo"""
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            with self._bloqueo:
+                codigo = self._codigos.get(valor)
+                if codigo is None:
+                    codigo = len(self.valores)
+                    self.valores.append(valor)
+                    self._codigos[valor] = codigo
+        return codigo
+    
+    def codigo(self, valor: str) -> Optional[int]:
+        """Devuelve el código del valor sin registrarlo"""
+        return self._codigos.get(valor)
+    
+    def decodificar(self, codigo: int) -> str:
+        """Devuelve el valor de un código"""
+        return self.valores[codigo]
+    
+    def __len__(self):
+        return len(self.valores)
+
+
+# Tablas de códigos compartidas por todos los empleados del proceso
+CATEGORIAS: Dict[str, TablaCategorias] = {
+    "cargo": TablaCategorias(),
+    "tipo_contrato": TablaCategorias()
+}
+
 
 class Empleado:
     """Clase que representa un empleado del sistema"""
@@ -19,31 +560,211 @@ class Empleado:
         self.email = email
         self.valoracion = valoracion
         self.activo = True
+        self.fecha_desactivacion: Optional[str] = None
         self.historial_nominas = []
+        self.historial_salarios = []  # [{"vigente_desde": "YYYY-MM", "salario_base": ...}]
+        self.historial_reajustes = []
         self.historial_valoraciones = [{"fecha": datetime.now().isoformat(), "valoracion": valoracion}]
+        # Índice período -> posición en historial_nominas (se construye bajo demanda)
+        self._indice_nominas: Optional[Dict[str, int]] = None
+        self._indice_nominas_lista: Optional[List[Dict]] = None
+        self._indice_nominas_total = 0
+        # Índice temporal de valoraciones: marcas de tiempo ordenadas y sus valores
+        self._valoraciones_lista: Optional[List[Dict]] = None
+        self._valoraciones_tiempos: List[float] = []
+        self._valoraciones_valores: List[int] = []
+        self._resumen: Dict[str, Any] = {}
+        # Marca del sistema que puede modificar este objeto sin copiarlo
+        self._marca: Optional[object] = None
+    
+    def copiar(self) -> "Empleado":
+        """Copia para copy-on-write: listas propias, registros de historial compartidos"""
+        copia = copy.copy(self)
+        copia.historial_nominas = list(self.historial_nominas)
+        copia.historial_salarios = list(self.historial_salarios)
+        copia.historial_reajustes = list(self.historial_reajustes)
+        copia.historial_valoraciones = list(self.historial_valoraciones)
+        
+        if self._indice_nominas_valido():
+            copia._indice_nominas = dict(self._indice_nominas)
+            copia._indice_nominas_lista = copia.historial_nominas
+        else:
+            copia._indice_nominas = None
+        
+        if self._valoraciones_lista is self.historial_valoraciones:
+            copia._valoraciones_lista = copia.historial_valoraciones
+        else:
+            copia._valoraciones_lista = None
+        copia._valoraciones_tiempos = list(self._valoraciones_tiempos)
+        copia._valoraciones_valores = list(self._valoraciones_valores)
+        copia._resumen = dict(self._resumen)
+        return copia
+    
+    @property
+    def cargo(self) -> str:
+        return CATEGORIAS["cargo"].valores[self.codigo_cargo]
+    
+    @cargo.setter
+    def cargo(self, valor: str):
+        self.codigo_cargo = CATEGORIAS["cargo"].codificar(valor)
+    
+    @property
+    def tipo_contrato(self) -> str:
+        return CATEGORIAS["tipo_contrato"].valores[self.codigo_tipo_contrato]
+    
+    @tipo_contrato.setter
+    def tipo_contrato(self, valor: str):
+        self.codigo_tipo_contrato = CATEGORIAS["tipo_contrato"].codificar(valor)
     
     def actualizar_valoracion(self, nueva_valoracion: int):
         """Actualiza la valoración del empleado y mantiene historial"""
         if 1 <= nueva_valoracion <= 10:
+            self._indexar_valoraciones()
             self.valoracion = nueva_valoracion
-            self.historial_valoraciones.append({
+            registro = {
                 "fecha": datetime.now().isoformat(),
                 "valoracion": nueva_valoracion
-            })
+            }
+            self.historial_valoraciones.append(registro)
+            self._agregar_al_indice(marca_tiempo(registro["fecha"]), nueva_valoracion)
             return True
         return False
     
+    def _indexar_valoraciones(self):
+        """Reconstruye el índice temporal si el historial cambió por fuera"""
+        if (self._valoraciones_lista is self.historial_valoraciones and
+                len(self._valoraciones_tiempos) == len(self.historial_valoraciones)):
+            return
+        pares = sorted((marca_tiempo(v.get("fecha")), v.get("valoracion"))
+                       for v in self.historial_valoraciones)
+        self._valoraciones_lista = self.historial_valoraciones
+        self._valoraciones_tiempos = [t for t, _ in pares]
+        self._valoraciones_valores = [v for _, v in pares]
+        self._resumen = {}
+        if pares:
+            self._resumen = {"cantidad": 0, "suma": 0, "minima": pares[0][1], "maxima": pares[0][1]}
+            for _, valor in pares:
+                self._acumular_resumen(valor)
+            self._resumen["ultima"] = self._valoraciones_valores[-1]
+            self._resumen["tendencia"] = self._valoraciones_valores[-1] - self._valoraciones_valores[0]
+    
+    def _acumular_resumen(self, valor: int):
+        """Suma una valoración a los acumulados del resumen"""
+        self._resumen["cantidad"] += 1
+        self._resumen["suma"] += valor
+        self._resumen["minima"] = min(self._resumen["minima"], valor)
+        self._resumen["maxima"] = max(self._resumen["maxima"], valor)
+        self._resumen["media"] = self._resumen["suma"] / self._resumen["cantidad"]
+    
+    def _agregar_al_indice(self, tiempo: float, valor: int):
+        """Agrega una valoración recién registrada al índice y al resumen"""
+        posicion = bisect_right(self._valoraciones_tiempos, tiempo)
+        self._valoraciones_tiempos.insert(posicion, tiempo)
+        self._valoraciones_valores.insert(posicion, valor)
+        if not self._resumen:
+            self._resumen = {"cantidad": 0, "suma": 0, "minima": valor, "maxima": valor}
+        self._acumular_resumen(valor)
+        self._resumen["ultima"] = self._valoraciones_valores[-1]
+        self._resumen["tendencia"] = self._valoraciones_valores[-1] - self._valoraciones_valores[0]
+    
+    def resumen_valoraciones(self) -> Dict[str, Any]:
+        """Resumen precalculado: última, media, mínima, máxima, tendencia y cantidad"""
+        self._indexar_valoraciones()
+        return {clave: valor for clave, valor in self._resumen.items() if clave != "suma"}
+    
+    def valoraciones_en_rango(self, desde=None, hasta=None) -> List[int]:
+        """Valoraciones en orden cronológico entre desde (incluido) y hasta (excluido)"""
+        self._indexar_valoraciones()
+        inicio = 0 if desde is None else bisect_left(self._valoraciones_tiempos, marca_tiempo(desde))
+        fin = (len(self._valoraciones_tiempos) if hasta is None
+               else bisect_left(self._valoraciones_tiempos, marca_tiempo(hasta)))
+        return self._valoraciones_valores[inicio:fin]
+    
+    def registrar_salario(self, salario_base: float, vigente_desde: str) -> bool:
+        """Registra un salario con fecha efectiva (período YYYY-MM)
+        
+        salario_base queda con el salario vigente en el período actual: un cambio
+        con fecha futura solo rige desde esa fecha.
+        """
+        if not validar_periodo(vigente_desde):
+            print(f"Período inválido: {vigente_desde}. Use el formato YYYY-MM")
+            return False
+        
+        if not self.historial_salarios:
+            # El salario previo rige para todo período anterior al primer cambio
+            self.historial_salarios.append({"vigente_desde": "", "salario_base": self.salario_base})
+        
+        fechas = [s["vigente_desde"] for s in self.historial_salarios]
+        posicion = bisect_right(fechas, vigente_desde)
+        registro = {"vigente_desde": vigente_desde, "salario_base": salario_base}
+        if posicion and fechas[posicion - 1] == vigente_desde:
+            self.historial_salarios[posicion - 1] = registro
+        else:
+            self.historial_salarios.insert(posicion, registro)
+        self.salario_base = self.salario_vigente(datetime.now().strftime("%Y-%m"))
+        return True
+    
+    def salario_vigente(self, periodo: str) -> float:
+        """Devuelve el salario base vigente para un período"""
+        if not self.historial_salarios:
+            return self.salario_base
+        fechas = [s["vigente_desde"] for s in self.historial_salarios]
+        posicion = bisect_right(fechas, periodo)
+        return self.historial_salarios[max(posicion - 1, 0)]["salario_base"]
+    
     def agregar_nomina(self, nomina_data: Dict):
         """Agrega una nómina al historial del empleado"""
+        indice_vigente = self._indice_nominas_valido()
         self.historial_nominas.append(nomina_data)
+        if indice_vigente:
+            self._indice_nominas.setdefault(nomina_data.get("periodo"), self._indice_nominas_total)
+            self._indice_nominas_total += 1
+    
+    def _indice_nominas_valido(self) -> bool:
+        """Indica si el índice de períodos corresponde al historial actual"""
+        return (self._indice_nominas is not None and
+                self._indice_nominas_lista is self.historial_nominas and
+                len(self._indice_nominas_lista) == self._indice_nominas_total)
+    
+    def _posicion_nomina(self, periodo: str) -> Optional[int]:
+        """Devuelve la posición de la primera nómina del período en el historial"""
+        if not self._indice_nominas_valido():
+            indice = {}
+            for posicion, nomina_data in enumerate(self.historial_nominas):
+                indice.setdefault(nomina_data.get("periodo"), posicion)
+            self._indice_nominas = indice
+            self._indice_nominas_lista = self.historial_nominas
+            self._indice_nominas_total = len(self.historial_nominas)
+        return self._indice_nominas.get(periodo)
+    
+    def nomina_periodo(self, periodo: str) -> Optional[Dict]:
+        """Obtiene la nómina registrada para un período, si existe"""
+        posicion = self._posicion_nomina(periodo)
+        return None if posicion is None else self.historial_nominas[posicion]
+    
+    def periodos_nomina(self, desde: str = "") -> List[str]:
+        """Lista ordenada de los períodos con nómina registrada a partir de desde"""
+        self._posicion_nomina(desde)
+        return sorted(periodo for periodo in self._indice_nominas
+                      if periodo and periodo >= desde)
+    
+    def reemplazar_nomina(self, nomina_data: Dict):
+        """Reemplaza la nómina del período o la agrega si no existe"""
+        posicion = self._posicion_nomina(nomina_data["periodo"])
+        if posicion is None:
+            self.agregar_nomina(nomina_data)
+        else:
+            self.historial_nominas[posicion] = nomina_data
     
     def desactivar(self):
         """Realiza eliminación lógica del empleado"""
         self.activo = False
+        self.fecha_desactivacion = datetime.now().isoformat()
     
     def activar(self):
         """Reactiva un empleado desactivado"""
         self.activo = True
+        self.fecha_desactivacion = None
     
     def to_dict(self) -> Dict:
         """Convierte el empleado a diccionario para serialización JSON"""
@@ -58,7 +779,10 @@ class Empleado:
             "email": self.email,
             "valoracion": self.valoracion,
             "activo": self.activo,
+            "fecha_desactivacion": self.fecha_desactivacion,
             "historial_nominas": self.historial_nominas,
+            "historial_salarios": self.historial_salarios,
+            "historial_reajustes": self.historial_reajustes,
             "historial_valoraciones": self.historial_valoraciones
         }
     
@@ -77,7 +801,13 @@ class Empleado:
             valoracion=data.get("valoracion", 5)
         )
         empleado.activo = data.get("activo", True)
+        empleado.fecha_desactivacion = data.get("fecha_desactivacion")
         empleado.historial_nominas = data.get("historial_nominas", [])
+        empleado.historial_salarios = data.get("historial_salarios", [])
+        if empleado.historial_salarios:
+            # Un cambio registrado con fecha futura pudo entrar en vigencia desde que se guardó
+            empleado.salario_base = empleado.salario_vigente(datetime.now().strftime("%Y-%m"))
+        empleado.historial_reajustes = data.get("historial_reajustes", [])
         empleado.historial_valoraciones = data.get("historial_valoraciones", [])
         return empleado
     
@@ -85,68 +815,223 @@ class Empleado:
         estado = "Activo" if self.activo else "Inactivo"
         return f"{self.nombre} {self.apellido} - {self.cargo} ({estado})"
 
+# Plantilla del comprobante de nómina; se prepara una vez y se reutiliza por empleado
+PLANTILLA_COMPROBANTE = """
+=== LIQUIDACIÓN DE NÓMINA ===
+Empleado: {empleado_nombre}
+Cédula: {empleado_cedula}
+Cargo: {cargo}
+Período: {periodo}
+Fecha de cálculo: {fecha}
+
+DEVENGADO:
+Salario Base: ${salario_base:,.2f}
+Horas Extra ({horas_extra}h): ${valor_horas_extra:,.2f}
+Bonificaciones: ${bonificaciones:,.2f}
+{lineas_devengado}TOTAL DEVENGADO: ${total_devengado:,.2f}
+
+DEDUCCIONES:
+Salud{tasa_salud}: ${deduccion_salud:,.2f}
+Pensión{tasa_pension}: ${deduccion_pension:,.2f}
+Otras deducciones: ${deducciones_adicionales:,.2f}
+{lineas_deduccion}TOTAL DEDUCCIONES: ${total_deducciones:,.2f}
+
+NETO A PAGAR: ${salario_neto:,.2f}
+================================
+        """.format
+
+
+def renderizar_comprobante(nomina_data: Dict, cargo: str) -> str:
+    """Genera el comprobante de una nómina registrada"""
+    tasas = nomina_data.get("tasas_pb") or {}
+    return PLANTILLA_COMPROBANTE(
+        cargo=cargo,
+        tasa_salud=_etiqueta_tasa(tasas.get("salud")),
+        tasa_pension=_etiqueta_tasa(tasas.get("pension")),
+        fecha=nomina_data["fecha_calculo"][:10],
+        valor_horas_extra=nomina_data["horas_extra"] * nomina_data["valor_hora_extra"],
+        lineas_devengado=_lineas_conceptos(nomina_data.get("otros_devengados")),
+        lineas_deduccion=_lineas_conceptos(nomina_data.get("otras_deducciones")),
+        **nomina_data
+    )
+
+
+def _etiqueta_tasa(puntos_basicos: Optional[int]) -> str:
+    """Etiqueta del porcentaje de una deducción en el comprobante; vacía si no se conoce"""
+    return "" if puntos_basicos is None else f" ({puntos_basicos / 100:g}%)"
+
+
+def _lineas_conceptos(conceptos: Optional[Dict[str, float]]) -> str:
+    """Genera las líneas del comprobante para los conceptos de reglas adicionales"""
+    if not conceptos:
+        return ""
+    return "".join(f"{nombre.replace('_', ' ').capitalize()}: ${valor:,.2f}\n"
+                   for nombre, valor in conceptos.items())
+
+
+def _renderizar_bloque(filas: List[tuple]) -> List[tuple]:
+    """Genera los comprobantes de un bloque de (nómina, cargo) en un trabajador"""
+    return [(nomina_data["empleado_cedula"], renderizar_comprobante(nomina_data, cargo))
+            for nomina_data, cargo in filas]
+
+
 class Nomina:
     """Clase que maneja los cálculos de nómina"""
     
-    def __init__(self, empleado: Empleado, periodo: str):
+    def __init__(self, empleado: Empleado, periodo: str, evaluador: EvaluadorReglas = None,
+                 fecha_calculo: str = None):
         self.empleado = empleado
         self.periodo = periodo  # Formato: "YYYY-MM"
-        self.fecha_calculo = datetime.now().isoformat()
-        self.salario_base = empleado.salario_base
+        self.fecha_calculo = fecha_calculo or fecha_calculo_actual()
+        self.salario_base = empleado.salario_vigente(periodo)
+        # Reglas vigentes del período (ver REGLAS_NOMINA)
+        self.evaluador = evaluador = evaluador or evaluador_reglas(periodo)
         self.horas_extra = 0
-        self.valor_hora_extra = 20000  # Valor por defecto
         self.bonificaciones = 0
         self.deducciones_adicionales = 0
         
+        # Los conceptos de las reglas dependen solo del salario base: se calculan una vez
+        # y quedan como una parte fija del devengado y de las deducciones. Las novedades
+        # se guardan también en centavos y se convierten solo al cambiar.
+        salario_c = a_centavos(self.salario_base)
+        tramo = evaluador.tramo_uniforme
+        if tramo is not None:
+            # Solo las reglas de ley, iguales para todos: no hay tramo que buscar
+            (_, _, self.valor_hora_extra, self._valor_hora_extra_c, self.tasas_pb,
+             (salud_pb, pension_pb)) = tramo
+            salud = (salario_c * salud_pb + 5000) // 10000
+            pension = (salario_c * pension_pb + 5000) // 10000
+            self.otras_deducciones = {}
+            self.otros_devengados = {}
+            devengado_fijo = salario_c
+            deducciones_fijas = salud + pension
+        else:
+            (salud, pension, deducciones, devengados, deducciones_fijas, devengados_reglas,
+             self.valor_hora_extra, self._valor_hora_extra_c,
+             self.tasas_pb) = evaluador.liquidar(salario_c, empleado.tipo_contrato)
+            self.otras_deducciones = {nombre: valor / 100 for nombre, valor in deducciones.items()}
+            self.otros_devengados = {nombre: valor / 100 for nombre, valor in devengados.items()}
+            devengado_fijo = salario_c + devengados_reglas
+        self._devengado_fijo_c = devengado_fijo
+        self._deducciones_fijas_c = deducciones_fijas
+        self._bonificaciones_c = 0
+        self._deducciones_adicionales_c = 0
+        
         # Deducciones legales colombianas
-        self.deduccion_salud = self.salario_base * 0.04  # 4%
-        self.deduccion_pension = self.salario_base * 0.04  # 4%
+        self.deduccion_salud = salud / 100
+        self.deduccion_pension = pension / 100
+        
+        # Sin novedades los totales son la parte fija
+        self.total_devengado = devengado_fijo / 100
+        self.total_deducciones = deducciones_fijas / 100
+        self.salario_neto = (devengado_fijo - deducciones_fijas) / 100
+    
+    @classmethod
+    def liquidar_lote(cls, empleados: List[Empleado], periodo: str, evaluador: EvaluadorReglas,
+                      horas_extra: Dict[str, int], bonificaciones: Dict[str, float],
+                      deducciones: Dict[str, float], fecha_calculo: str = None) -> List['Nomina']:
+        """Liquida la nómina de muchos empleados por columnas con MotorNominaCentavos
         
-        # Cálculos
-        self.total_devengado = 0
-        self.total_deducciones = 0
-        self.salario_neto = 0
+        Solo aplica cuando evaluador.tramo_uniforme existe; el resultado es el mismo que
+        construir cada Nomina y agregarle sus novedades.
+        """
+        _, _, valor_pesos, valor_centavos, tasas, (salud_pb, pension_pb) = evaluador.tramo_uniforme
+        fecha_calculo = fecha_calculo or fecha_calculo_actual()
+        salarios = [empleado.salario_vigente(periodo) for empleado in empleados]
+        horas = [horas_extra.get(empleado.cedula, 0) for empleado in empleados]
+        montos_bonificacion = [bonificaciones.get(empleado.cedula, 0) for empleado in empleados]
+        montos_deduccion = [deducciones.get(empleado.cedula, 0) for empleado in empleados]
+        salarios_c = array('q', map(a_centavos, salarios))
+        bonificaciones_c = array('q', [a_centavos(monto) if monto else 0 for monto in montos_bonificacion])
+        deducciones_c = array('q', [a_centavos(monto) if monto else 0 for monto in montos_deduccion])
+        columnas = MotorNominaCentavos(salud_pb, pension_pb).calcular_lote(
+            salarios_c, array('q', horas), array('q', [valor_centavos]) * len(empleados),
+            bonificaciones_c, deducciones_c)
         
-        self._calcular_nomina()
+        nominas = []
+        for (empleado, salario_base, salario_c, horas_empleado, bonificacion, bonificacion_c,
+             deduccion, deduccion_c, salud, pension, devengado, deducido, neto) in zip(
+                empleados, salarios, salarios_c, horas, montos_bonificacion, bonificaciones_c,
+                montos_deduccion, deducciones_c, columnas["deduccion_salud"],
+                columnas["deduccion_pension"], columnas["total_devengado"],
+                columnas["total_deducciones"], columnas["salario_neto"]):
+            # Los atributos se asignan en el mismo orden que en __init__
+            nomina = cls.__new__(cls)
+            nomina.empleado = empleado
+            nomina.periodo = periodo
+            nomina.fecha_calculo = fecha_calculo
+            nomina.salario_base = salario_base
+            nomina.evaluador = evaluador
+            nomina.horas_extra = horas_empleado
+            nomina.bonificaciones = bonificacion
+            nomina.deducciones_adicionales = deduccion
+            nomina.valor_hora_extra = valor_pesos
+            nomina._valor_hora_extra_c = valor_centavos
+            nomina.tasas_pb = tasas
+            nomina.otras_deducciones = {}
+            nomina.otros_devengados = {}
+            nomina._devengado_fijo_c = salario_c
+            nomina._deducciones_fijas_c = salud + pension
+            nomina._bonificaciones_c = bonificacion_c
+            nomina._deducciones_adicionales_c = deduccion_c
+            nomina.deduccion_salud = salud / 100
+            nomina.deduccion_pension = pension / 100
+            nomina.total_devengado = devengado / 100
+            nomina.total_deducciones = deducido / 100
+            nomina.salario_neto = neto / 100
+            nominas.append(nomina)
+        return nominas
     
     def agregar_horas_extra(self, horas: int, valor_por_hora: float = None):
         """Agrega horas extra al cálculo de nómina"""
         self.horas_extra = horas
         if valor_por_hora:
             self.valor_hora_extra = valor_por_hora
+            self._valor_hora_extra_c = a_centavos(valor_por_hora)
         self._calcular_nomina()
     
     def agregar_bonificacion(self, monto: float):
         """Agrega bonificaciones al cálculo"""
         self.bonificaciones += monto
+        self._bonificaciones_c = a_centavos(self.bonificaciones)
         self._calcular_nomina()
     
     def agregar_deduccion(self, monto: float):
         """Agrega deducciones adicionales"""
         self.deducciones_adicionales += monto
+        self._deducciones_adicionales_c = a_centavos(self.deducciones_adicionales)
         self._calcular_nomina()
     
     def _calcular_nomina(self):
         """Realiza todos los cálculos de la nómina"""
-        # Total devengado
-        valor_horas_extra = self.horas_extra * self.valor_hora_extra
-        self.total_devengado = self.salario_base + valor_horas_extra + self.bonificaciones
-        
-        # Total deducciones
-        self.total_deducciones = (self.deduccion_salud + self.deduccion_pension + 
-                                self.deducciones_adicionales)
-        
-        # Salario neto
-        self.salario_neto = self.total_devengado - self.total_deducciones
+        # El cálculo se hace en centavos exactos y se expone en pesos
+        total_devengado = (self._devengado_fijo_c + self.horas_extra * self._valor_hora_extra_c +
+                           self._bonificaciones_c)
+        total_deducciones = self._deducciones_fijas_c + self._deducciones_adicionales_c
+        self.total_devengado = total_devengado / 100
+        self.total_deducciones = total_deducciones / 100
+        self.salario_neto = (total_devengado - total_deducciones) / 100
+    
+    @staticmethod
+    def huella_registro(nomina_data: Dict) -> tuple:
+        """Devuelve la huella de entradas de una nómina ya registrada"""
+        return (nomina_data.get("empleado_nombre"), nomina_data.get("salario_base"),
+                nomina_data.get("tipo_contrato"),
+                nomina_data.get("horas_extra", 0), nomina_data.get("valor_hora_extra"),
+                nomina_data.get("bonificaciones", 0), nomina_data.get("deducciones_adicionales", 0),
+                nomina_data.get("reglas"))
     
     def to_dict(self) -> Dict:
         """Convierte la nómina a diccionario"""
-        return {
-            "empleado_cedula": self.empleado.cedula,
-            "empleado_nombre": f"{self.empleado.nombre} {self.empleado.apellido}",
+        empleado = self.empleado
+        datos = {
+            "empleado_cedula": empleado.cedula,
+            "empleado_nombre": f"{empleado.nombre} {empleado.apellido}",
             "periodo": self.periodo,
             "fecha_calculo": self.fecha_calculo,
             "salario_base": self.salario_base,
+            # Las reglas pueden depender del tipo de contrato (sin distinguir mayúsculas)
+            "tipo_contrato": empleado.tipo_contrato.lower(),
             "horas_extra": self.horas_extra,
             "valor_hora_extra": self.valor_hora_extra,
             "bonificaciones": self.bonificaciones,
@@ -155,79 +1040,927 @@ class Nomina:
             "deducciones_adicionales": self.deducciones_adicionales,
             "total_devengado": self.total_devengado,
             "total_deducciones": self.total_deducciones,
-            "salario_neto": self.salario_neto
+            "salario_neto": self.salario_neto,
+            "tasas_pb": self.tasas_pb,
+            "reglas": self.evaluador.firma
         }
+        # Los conceptos de reglas adicionales solo se guardan cuando existen
+        if self.otras_deducciones:
+            datos["otras_deducciones"] = self.otras_deducciones
+        if self.otros_devengados:
+            datos["otros_devengados"] = self.otros_devengados
+        return datos
     
     def generar_reporte(self) -> str:
         """Genera un reporte detallado de la nómina"""
-        reporte = f"""
-=== LIQUIDACIÓN DE NÓMINA ===
-Empleado: {self.empleado.nombre} {self.empleado.apellido}
-Cédula: {self.empleado.cedula}
-Cargo: {self.empleado.cargo}
-Período: {self.periodo}
-Fecha de cálculo: {self.fecha_calculo[:10]}
+        return renderizar_comprobante(self.to_dict(), self.empleado.cargo)
 
-DEVENGADO:
-Salario Base: ${self.salario_base:,.2f}
-Horas Extra ({self.horas_extra}h): ${self.horas_extra * self.valor_hora_extra:,.2f}
-Bonificaciones: ${self.bonificaciones:,.2f}
-TOTAL DEVENGADO: ${self.total_devengado:,.2f}
+# Memoria aproximada de un empleado cargado y de cada registro de sus historiales
+BYTES_POR_EMPLEADO = 1200
+BYTES_POR_REGISTRO = 800
 
-DEDUCCIONES:
-Salud (4%): ${self.deduccion_salud:,.2f}
-Pensión (4%): ${self.deduccion_pension:,.2f}
-Otras deducciones: ${self.deducciones_adicionales:,.2f}
-TOTAL DEDUCCIONES: ${self.total_deducciones:,.2f}
+# Los números de secuencia de cambios se reservan en disco por bloques de este tamaño
+BLOQUE_SECUENCIA = 1000
 
-NETO A PAGAR: ${self.salario_neto:,.2f}
-================================
+# Anchos de la cédula y del valor en centavos del registro de detalle del archivo de pagos
+ANCHO_CEDULA_PAGO = 15
+ANCHO_VALOR_PAGO = 15
+
+
+def ruta_fragmento(archivo_datos: str, indice: int) -> str:
+    """Ruta del archivo de un fragmento de empleados"""
+    base, extension = os.path.splitext(archivo_datos)
+    return f"{base}.fragmento-{indice:03d}{extension or '.json'}"
+
+
+def ruta_particion(archivo_datos: str, anio: str) -> str:
+    """Ruta del archivo de historial de nóminas de un año"""
+    base, extension = os.path.splitext(archivo_datos)
+    return f"{base}.historial-{anio}{extension or '.json'}"
+
+
+def anios_archivados(archivo_datos: str) -> List[str]:
+    """Lista los años con archivo de historial en disco junto a un archivo de datos"""
+    base, extension = os.path.splitext(archivo_datos)
+    directorio = os.path.dirname(base) or "."
+    prefijo = f"{os.path.basename(base)}.historial-"
+    sufijo = extension or '.json'
+    anios = []
+    if os.path.isdir(directorio):
+        for nombre in os.listdir(directorio):
+            if nombre.startswith(prefijo) and nombre.endswith(sufijo):
+                anio = nombre[len(prefijo):len(nombre) - len(sufijo)]
+                if anio.isdigit():
+                    anios.append(anio)
+    return sorted(anios)
+
+
+def fragmento_de(cedula: str, fragmentos: int) -> int:
+    """Devuelve el fragmento de almacenamiento al que pertenece una cédula"""
+    return zlib.crc32(cedula.encode('utf-8')) % fragmentos
+
+
+def _leer_fragmento(ruta: str) -> List[Dict]:
+    """Lee los empleados de un archivo de fragmento"""
+    with abrir_datos(ruta) as file:
+        return json.load(file).get("empleados", [])
+
+
+class SumideroCola:
+    """Sumidero de eventos de cambio que los deja en una cola en proceso"""
+    
+    def __init__(self, cola: "queue.Queue" = None):
+        self.cola = cola if cola is not None else queue.Queue()
+    
+    def publicar(self, evento: Dict):
+        self.cola.put(evento)
+
+
+class SumideroJSONL:
+    """Sumidero de eventos de cambio en archivos JSONL con rotación por tamaño
+    
+    El archivo activo es ruta; al superar max_bytes pasa a ruta.1, el anterior a
+    ruta.2 y así hasta max_archivos, descartando los más antiguos.
+    """
+    
+    def __init__(self, ruta: str, max_bytes: int = 10 * 1024 * 1024, max_archivos: int = 5):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.max_archivos = max_archivos
+        self._archivo = open(ruta, 'a', encoding='utf-8')
+    
+    def _rutas(self) -> List[str]:
+        """Archivos existentes del más antiguo al más reciente"""
+        rotados = [f"{self.ruta}.{n}" for n in range(self.max_archivos, 0, -1)]
+        return [ruta for ruta in rotados + [self.ruta] if os.path.exists(ruta)]
+    
+    def publicar(self, evento: Dict):
+        self._archivo.write(json.dumps(evento, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+        if self._archivo.tell() >= self.max_bytes:
+            self._rotar()
+    
+    def _rotar(self):
+        self._archivo.close()
+        for numero in range(self.max_archivos, 0, -1):
+            origen = f"{self.ruta}.{numero - 1}" if numero > 1 else self.ruta
+            if os.path.exists(origen):
+                os.replace(origen, f"{self.ruta}.{numero}")
+        self._archivo = open(self.ruta, 'a', encoding='utf-8')
+    
+    def leer_eventos(self, desde_secuencia: int = 0):
+        """Genera en orden los eventos con secuencia mayor a desde_secuencia"""
+        for ruta in self._rutas():
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                for linea in archivo:
+                    if linea.strip():
+                        evento = json.loads(linea)
+                        if evento["secuencia"] > desde_secuencia:
+                            yield evento
+    
+    def ultima_secuencia(self) -> int:
+        """Secuencia del último evento escrito"""
+        for ruta in reversed(self._rutas()):
+            ultima = 0
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                for linea in archivo:
+                    if linea.strip():
+                        ultima = json.loads(linea)["secuencia"]
+            if ultima:
+                return ultima
+        return 0
+    
+    def cerrar(self):
+        self._archivo.close()
+
+
+def periodo_numerico(periodo: str) -> int:
+    """Convierte un período YYYY-MM en el entero YYYYMM (0 si es inválido)"""
+    return int(periodo[:4]) * 100 + int(periodo[5:]) if validar_periodo(periodo) else 0
+
+
+class VistaColumnar:
+    """Vista en columnas NumPy de los empleados y de su historial de nóminas
+    
+    Cada empleado ocupa una fila fija y sus nóminas un tramo contiguo de la tabla
+    de nóminas. Al actualizar un empleado se invalida su tramo anterior y se
+    agrega uno nuevo al final; los tramos inválidos se compactan al consultar.
+    Los valores de nómina se guardan en centavos enteros.
+    """
+    
+    COLUMNAS_EMPLEADO = {"salario_base": "float64", "valoracion": "int16", "activo": "bool",
+                         "codigo_cargo": "int32", "codigo_tipo_contrato": "int32",
+                         "nomina_inicio": "int64", "nomina_cantidad": "int64"}
+    COLUMNAS_NOMINA = {"empleado": "int32", "periodo": "int32", "devengado": "int64",
+                       "deducciones": "int64", "neto": "int64", "valido": "bool"}
+    
+    def __init__(self):
+        import numpy as np
+        self._np = np
+        self._filas: Dict[str, int] = {}
+        self.cedulas: List[str] = []
+        self._empleados = {campo: np.zeros(16, tipo) for campo, tipo in self.COLUMNAS_EMPLEADO.items()}
+        self._nominas = {campo: np.zeros(64, tipo) for campo, tipo in self.COLUMNAS_NOMINA.items()}
+        self._total_nominas = 0
+        self._invalidas = 0
+    
+    def _ampliar(self, columnas: Dict, necesario: int):
+        """Duplica la capacidad de las columnas hasta alojar las filas necesarias"""
+        capacidad = len(next(iter(columnas.values())))
+        if necesario <= capacidad:
+            return
+        while capacidad < necesario:
+            capacidad *= 2
+        for campo, columna in columnas.items():
+            nueva = self._np.zeros(capacidad, columna.dtype)
+            nueva[:len(columna)] = columna
+            columnas[campo] = nueva
+    
+    def actualizar(self, empleados: Dict[str, Empleado], cedulas: Iterable[str] = None):
+        """Incorpora los empleados indicados (todos si cedulas es None)"""
+        if cedulas is None:
+            cedulas = empleados.keys()
+        columnas = self._empleados
+        nominas = self._nominas
+        for cedula in cedulas:
+            empleado = empleados.get(cedula)
+            if empleado is None:
+                continue
+            fila = self._filas.get(cedula)
+            if fila is None:
+                fila = self._filas[cedula] = len(self.cedulas)
+                self.cedulas.append(cedula)
+                self._ampliar(columnas, fila + 1)
+            else:
+                inicio = columnas["nomina_inicio"][fila]
+                cantidad = columnas["nomina_cantidad"][fila]
+                nominas["valido"][inicio:inicio + cantidad] = False
+                self._invalidas += int(cantidad)
+            
+            columnas["salario_base"][fila] = empleado.salario_base
+            columnas["valoracion"][fila] = empleado.valoracion
+            columnas["activo"][fila] = empleado.activo
+            columnas["codigo_cargo"][fila] = empleado.codigo_cargo
+            columnas["codigo_tipo_contrato"][fila] = empleado.codigo_tipo_contrato
+            
+            historial = empleado.historial_nominas
+            inicio = self._total_nominas
+            fin = inicio + len(historial)
+            self._ampliar(nominas, fin)
+            nominas["empleado"][inicio:fin] = fila
+            nominas["periodo"][inicio:fin] = [periodo_numerico(n.get("periodo", "")) for n in historial]
+            nominas["devengado"][inicio:fin] = [a_centavos(n.get("total_devengado", 0)) for n in historial]
+            nominas["deducciones"][inicio:fin] = [a_centavos(n.get("total_deducciones", 0)) for n in historial]
+            nominas["neto"][inicio:fin] = [a_centavos(n.get("salario_neto", 0)) for n in historial]
+            nominas["valido"][inicio:fin] = True
+            columnas["nomina_inicio"][fila] = inicio
+            columnas["nomina_cantidad"][fila] = len(historial)
+            self._total_nominas = fin
+    
+    def _compactar(self):
+        """Elimina de la tabla de nóminas los tramos invalidados"""
+        np = self._np
+        total = self._total_nominas
+        valido = self._nominas["valido"][:total]
+        nueva_posicion = np.cumsum(valido) - 1
+        n = len(self.cedulas)
+        inicio = self._empleados["nomina_inicio"][:n]
+        con_nominas = self._empleados["nomina_cantidad"][:n] > 0
+        inicio[con_nominas] = nueva_posicion[inicio[con_nominas]]
+        inicio[~con_nominas] = 0
+        for campo, columna in self._nominas.items():
+            restantes = columna[:total][valido]
+            columna[:len(restantes)] = restantes
+        self._total_nominas = total - self._invalidas
+        self._nominas["valido"][:self._total_nominas] = True
+        self._invalidas = 0
+    
+    def columnas(self) -> Dict[str, Any]:
+        """Devuelve copias de las columnas de empleados y de la tabla de nóminas"""
+        np = self._np
+        if self._invalidas:
+            self._compactar()
+        n = len(self.cedulas)
+        m = self._total_nominas
+        resultado = {"cedula": np.array(self.cedulas, dtype=str)}
+        for campo in ("salario_base", "valoracion", "activo"):
+            resultado[campo] = self._empleados[campo][:n].copy()
+        for campo in ("empleado", "periodo", "devengado", "deducciones", "neto"):
+            resultado[f"nomina_{campo}"] = self._nominas[campo][:m].copy()
+        
+        # Las tablas de CATEGORIAS son de todo el proceso y pueden tener valores de
+        # otras empresas: los códigos se renumeran con una tabla propia de la vista
+        for campo, tabla in (("cargo", "cargos"), ("tipo_contrato", "tipos_contrato")):
+            usados, codigos = np.unique(self._empleados[f"codigo_{campo}"][:n], return_inverse=True)
+            valores = CATEGORIAS[campo].valores
+            resultado[f"codigo_{campo}"] = codigos.astype("int32")
+            resultado[tabla] = np.array([valores[codigo] for codigo in usados], dtype=str)
+        return resultado
+
+
+class LectorJSONIncremental:
+    """Lee un documento JSON por bloques, valor por valor, sin cargarlo completo"""
+    
+    def __init__(self, archivo, tamano_bloque: int = 1 << 16):
+        self.archivo = archivo
+        self.tamano_bloque = tamano_bloque
+        self.bufer = ""
+        self.posicion = 0
+        self._decodificador = json.JSONDecoder()
+    
+    def _leer_bloque(self, tamano: int = None) -> bool:
+        """Agrega un bloque del archivo al búfer, descartando lo ya consumido"""
+        bloque = self.archivo.read(tamano or self.tamano_bloque)
+        if not bloque:
+            return False
+        self.bufer = self.bufer[self.posicion:] + bloque
+        self.posicion = 0
+        return True
+    
+    def caracter(self) -> str:
+        """Devuelve sin consumirlo el siguiente carácter que no sea espacio ('' al final)"""
+        while True:
+            while self.posicion < len(self.bufer) and self.bufer[self.posicion] in " \t\r\n":
+                self.posicion += 1
+            if self.posicion < len(self.bufer):
+                return self.bufer[self.posicion]
+            if not self._leer_bloque():
+                return ""
+    
+    def consumir(self, esperado: str):
+        """Consume un carácter estructural ({, [, :, ...)"""
+        if self.caracter() != esperado:
+            raise ValueError(f"JSON inválido: se esperaba {esperado!r} y se encontró {self.caracter()!r}")
+        self.posicion += 1
+    
+    def separador(self, cierre: str) -> bool:
+        """Consume la coma entre elementos; devuelve False al llegar al cierre"""
+        if self.caracter() == ",":
+            self.posicion += 1
+        return self.caracter() != cierre
+    
+    def valor(self) -> Any:
+        """Decodifica el siguiente valor completo
+        
+        Cada intento incompleto se repite desde el inicio del valor, así que se lee
+        el doble de texto en cada intento: el costo total es lineal en su tamaño.
         """
-        return reporte
+        self.caracter()
+        tamano = self.tamano_bloque
+        while True:
+            try:
+                valor, fin = self._decodificador.raw_decode(self.bufer, self.posicion)
+            except json.JSONDecodeError:
+                if not self._leer_bloque(tamano):
+                    raise
+                tamano *= 2
+                continue
+            # Un número al final del búfer puede continuar en el siguiente bloque
+            if fin == len(self.bufer) and self._leer_bloque(tamano):
+                tamano *= 2
+                continue
+            self.posicion = fin
+            return valor
+    
+    def miembros(self) -> Iterator[str]:
+        """Recorre las claves de un objeto; el llamador debe consumir cada valor"""
+        self.consumir("{")
+        while self.separador("}"):
+            clave = self.valor()
+            self.consumir(":")
+            yield clave
+        self.consumir("}")
+    
+    def elementos(self) -> Iterator[Any]:
+        """Recorre uno a uno los elementos de un arreglo"""
+        self.consumir("[")
+        while self.separador("]"):
+            yield self.valor()
+        self.consumir("]")
+
+
+def iterar_empleados_archivo(ruta: str) -> Iterator[Dict]:
+    """Recorre los empleados de un archivo de datos (y sus fragmentos) como diccionarios"""
+    fragmentos = 0
+    with abrir_datos(ruta) as archivo:
+        lector = LectorJSONIncremental(archivo)
+        for clave in lector.miembros():
+            if clave == "empleados":
+                yield from lector.elementos()
+            else:
+                valor = lector.valor()
+                if clave == "sistema_info":
+                    fragmentos = valor.get("fragmentos", 0)
+    for indice in range(fragmentos):
+        if os.path.exists(ruta_fragmento(ruta, indice)):
+            yield from iterar_empleados_archivo(ruta_fragmento(ruta, indice))
+
+
+def iterar_nominas_archivadas(ruta: str) -> Iterator[tuple]:
+    """Recorre un archivo de historial anual como pares (cédula, nóminas)"""
+    with abrir_datos(ruta) as archivo:
+        lector = LectorJSONIncremental(archivo)
+        for clave in lector.miembros():
+            if clave == "nominas":
+                for cedula in lector.miembros():
+                    yield cedula, lector.valor()
+            else:
+                lector.valor()
+
+
+class VerificadorIntegridad:
+    """Revisa la consistencia de los datos en una sola pasada por los empleados
+    
+    Detecta emails y teléfonos repetidos con tablas hash de los valores ya vistos,
+    nóminas de períodos posteriores a la desactivación del empleado, deducciones
+    de salud y pensión que no corresponden al salario base según las reglas de
+    nómina, y períodos con formato inválido. Cada hallazgo se entrega apenas se
+    encuentra; la memoria crece con los valores únicos, no con los historiales.
+    """
+    
+    def __init__(self):
+        self._emails: Dict[str, str] = {}
+        self._telefonos: Dict[str, str] = {}
+        # Datos mínimos para revisar nóminas archivadas en otro archivo
+        self._contratos: Dict[str, str] = {}
+        self._desactivaciones: Dict[str, str] = {}
+        self.empleados_revisados = 0
+        self.nominas_revisadas = 0
+        self.hallazgos: Dict[str, int] = {}
+    
+    def _hallazgo(self, tipo: str, cedula: str, detalle: str, periodo: str = None) -> Dict:
+        self.hallazgos[tipo] = self.hallazgos.get(tipo, 0) + 1
+        hallazgo = {"tipo": tipo, "cedula": cedula, "detalle": detalle}
+        if periodo is not None:
+            hallazgo["periodo"] = periodo
+        return hallazgo
+    
+    def _duplicado(self, vistos: Dict[str, str], valor: str, cedula: str) -> Optional[str]:
+        """Registra un valor y devuelve la cédula que ya lo tenía, si es otra"""
+        if not valor:
+            return None
+        anterior = vistos.setdefault(valor, cedula)
+        return anterior if anterior != cedula else None
+    
+    def revisar_empleado(self, data: Dict) -> Iterator[Dict]:
+        """Revisa un empleado serializado y su historial"""
+        cedula = data.get("cedula", "")
+        self.empleados_revisados += 1
+        
+        email = (data.get("email") or "").strip().lower()
+        anterior = self._duplicado(self._emails, email, cedula)
+        if anterior:
+            yield self._hallazgo("email_duplicado", cedula, f"{email} también pertenece a {anterior}")
+        telefono = "".join(c for c in data.get("telefono") or "" if c.isdigit())
+        anterior = self._duplicado(self._telefonos, telefono, cedula)
+        if anterior:
+            yield self._hallazgo("telefono_duplicado", cedula, f"{telefono} también pertenece a {anterior}")
+        
+        tipo_contrato = data.get("tipo_contrato", "")
+        self._contratos[cedula] = tipo_contrato
+        desactivacion = None
+        if not data.get("activo", True) and data.get("fecha_desactivacion"):
+            desactivacion = self._desactivaciones[cedula] = data["fecha_desactivacion"]
+        
+        for salario in data.get("historial_salarios", []):
+            # El primer registro, con vigente_desde vacío, rige desde siempre
+            vigente_desde = salario.get("vigente_desde")
+            if vigente_desde != "" and not validar_periodo(vigente_desde):
+                yield self._hallazgo("periodo_invalido", cedula,
+                                     f"vigente_desde inválido en historial de salarios: "
+                                     f"{salario.get('vigente_desde')!r}")
+        yield from self.revisar_nominas(cedula, data.get("historial_nominas", []),
+                                        tipo_contrato, desactivacion)
+    
+    def revisar_nominas(self, cedula: str, nominas: List[Dict], tipo_contrato: str = None,
+                        desactivacion: str = None) -> Iterator[Dict]:
+        """Revisa nóminas; sin tipo de contrato usa el del empleado ya revisado"""
+        if tipo_contrato is None:
+            tipo_contrato = self._contratos.get(cedula, "")
+            desactivacion = self._desactivaciones.get(cedula)
+        mes_desactivacion = desactivacion[:7] if desactivacion else None
+        
+        for nomina_data in nominas:
+            self.nominas_revisadas += 1
+            periodo = nomina_data.get("periodo")
+            if not validar_periodo(periodo):
+                yield self._hallazgo("periodo_invalido", cedula,
+                                     f"período de nómina inválido: {periodo!r}")
+                continue
+            
+            if mes_desactivacion and periodo > mes_desactivacion:
+                yield self._hallazgo("nomina_posterior_desactivacion", cedula,
+                                     f"empleado desactivado el {desactivacion[:10]}", periodo)
+            
+            # Solo se comparan nóminas calculadas con las reglas vigentes hoy para su período
+            evaluador = evaluador_reglas(periodo)
+            firma = nomina_data.get("reglas")
+            if firma is not None and firma != evaluador.firma:
+                continue
+            salario = a_centavos(nomina_data.get("salario_base", 0))
+            esperado = evaluador.calcular(salario, tipo_contrato)
+            for campo in ("deduccion_salud", "deduccion_pension"):
+                # Un centavo de tolerancia para nóminas calculadas con float
+                if abs(a_centavos(nomina_data.get(campo, 0)) - esperado[campo]) > 1:
+                    yield self._hallazgo("deduccion_inconsistente", cedula,
+                                         f"{campo} {nomina_data.get(campo)} no corresponde a un "
+                                         f"salario base de {nomina_data.get('salario_base')}", periodo)
+
+
+def verificar_integridad_archivo(ruta: str, verificador: VerificadorIntegridad = None) -> Iterator[Dict]:
+    """Verifica un archivo de datos, sus fragmentos y sus historiales anuales sin construir empleados"""
+    verificador = verificador or VerificadorIntegridad()
+    for data in iterar_empleados_archivo(ruta):
+        yield from verificador.revisar_empleado(data)
+    for anio in anios_archivados(ruta):
+        for cedula, nominas in iterar_nominas_archivadas(ruta_particion(ruta, anio)):
+            yield from verificador.revisar_nominas(cedula, nominas)
+
 
 class SistemaRRHH:
     """Clase principal que maneja todo el sistema de RRHH"""
     
-    def __init__(self, archivo_datos: str = "empleados.json"):
+    def __init__(self, archivo_datos: str = "empleados.json", particionar_historial: bool = False,
+                 concurrente: bool = False, fragmentos: int = 0):
+        # En modo concurrente las lecturas se comparten y las escrituras son exclusivas
+        bloqueo = BloqueoLecturaEscritura() if concurrente else BloqueoNulo()
+        self._inicializar_estado(archivo_datos, particionar_historial, bloqueo, fragmentos)
+        self.cargar_datos()
+    
+    def _inicializar_estado(self, archivo_datos: str, particionar_historial: bool,
+                            bloqueo, fragmentos: int):
+        """Inicializa el estado vacío del sistema; las instantáneas también lo usan"""
         self.archivo_datos = archivo_datos
+        self._bloqueo = bloqueo
+        self._bloqueo_guardado = threading.Lock()
         self.empleados: Dict[str, Empleado] = {}
-        self.cargar_datos()
+        # Copy-on-write: los empleados con otra marca pueden estar compartidos con instantáneas
+        self._marca = object()
+        self._instantaneas = weakref.WeakSet()
+        # Flujo de cambios: eventos numerados publicados a los sumideros suscritos
+        self._sumideros = []
+        self.secuencia_cambios = 0
+        self._secuencia_reservada = 0
+        # Con historial particionado solo el año actual y el anterior quedan residentes;
+        # los años más antiguos viven en archivos de archivo y se abren bajo demanda
+        self.particionar_historial = particionar_historial
+        self._anio_residente = str(datetime.now().year - 1)
+        self._anios_cargados = set()
+        # Con fragmentos los empleados se reparten por cédula en varios archivos junto a
+        # archivo_datos, que queda como índice; al guardar solo se reescriben los modificados
+        self.fragmentos = fragmentos
+        self._fragmentos_sucios = set()
+        self._fragmentos_en_disco = 0
+        # Versión de los datos: aumenta con cada modificación de un empleado
+        self.version_datos = 0
+        self._version_guardada = 0
+        # Vista columnar incremental: se crea con la primera consulta
+        self._vista_columnar = None
+        self._cedulas_vista = set()
+        self._bloqueo_vista = threading.Lock()
+        # Empleados ordenados por apellido y nombre, válidos para una versión de datos
+        self._orden_listado = (None, [])
     
+    @_escritura
     def cargar_datos(self):
         """Carga los datos desde el archivo JSON"""
+        self._anios_cargados = set()
+        self._vista_columnar = None
+        self._orden_listado = (None, [])
         if os.path.exists(self.archivo_datos):
             try:
-                with open(self.archivo_datos, 'r', encoding='utf-8') as file:
+                with abrir_datos(self.archivo_datos) as file:
                     data = json.load(file)
-                    for emp_data in data.get("empleados", []):
-                        empleado = Empleado.from_dict(emp_data)
-                        self.empleados[empleado.cedula] = empleado
+                sistema_info = data.get("sistema_info", {})
+                self.secuencia_cambios = sistema_info.get("secuencia_cambios", 0)
+                self._fragmentos_en_disco = sistema_info.get("fragmentos", 0)
+                if not self.fragmentos:
+                    self.fragmentos = self._fragmentos_en_disco
+                registros = data.get("empleados", [])
+                if self._fragmentos_en_disco:
+                    registros = itertools.chain(registros, *self._leer_fragmentos())
+                for emp_data in registros:
+                    empleado = Empleado.from_dict(emp_data)
+                    empleado._marca = self._marca
+                    self.empleados[empleado.cedula] = empleado
+                # Al fragmentar por primera vez o cambiar la cantidad se reescribe todo
+                if self.fragmentos != self._fragmentos_en_disco:
+                    self._fragmentos_sucios = set(range(self.fragmentos))
+                # Nóminas antiguas que aún estén en el archivo principal se unen a su partición
+                for anio in self._anios_no_residentes_en_memoria():
+                    self.cargar_particion(anio)
+                self._version_guardada = self.version_datos
                 print(f"Datos cargados exitosamente. {len(self.empleados)} empleados encontrados.")
             except Exception as e:
                 print(f"Error al cargar datos: {e}")
                 self.empleados = {}
         else:
             print("Archivo de datos no encontrado. Iniciando con base de datos vacía.")
+        self._cargar_secuencia_reservada()
+    
+    def _ruta_secuencia(self) -> str:
+        """Ruta del archivo con el último número de secuencia de cambios reservado"""
+        return f"{self.archivo_datos}.secuencia"
+    
+    def _cargar_secuencia_reservada(self):
+        """Continúa la secuencia después del último bloque reservado
+        
+        Los eventos ya publicados pueden tener números mayores que la secuencia del
+        último guardado; continuar desde la reserva evita repetirlos tras una caída.
+        """
+        try:
+            with open(self._ruta_secuencia(), 'r', encoding='utf-8') as archivo:
+                reservada = int(json.load(archivo)["secuencia_reservada"])
+        except FileNotFoundError:
+            reservada = 0
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error al leer la secuencia de cambios reservada: {e}")
+            reservada = 0
+        self.secuencia_cambios = max(self.secuencia_cambios, reservada)
+        self._secuencia_reservada = self.secuencia_cambios
+    
+    def guardar_datos(self):
+        """Guarda los datos en el archivo JSON
+        
+        Toma una instantánea consistente bajo bloqueo de lectura y serializa fuera
+        del bloqueo, de modo que las lecturas concurrentes no esperan la escritura.
+        """
+        self._verificar_escritura()
+        sucios = set()
+        try:
+            with self._bloqueo_guardado:
+                if self.particionar_historial:
+                    self._cargar_anios_no_residentes()
+                with self._bloqueo.lectura():
+                    particiones = self._particiones_en_memoria() if self.particionar_historial else {}
+                    data = {
+                        "sistema_info": {
+                            "version": "1.0",
+                            "ultima_actualizacion": datetime.now().isoformat(),
+                            "total_empleados": len(self.empleados),
+                            "secuencia_cambios": self.secuencia_cambios
+                        },
+                        "empleados": []
+                    }
+                    version = self.version_datos
+                    if self.fragmentos:
+                        data["sistema_info"]["fragmentos"] = self.fragmentos
+                        sucios, self._fragmentos_sucios = self._fragmentos_sucios, set()
+                        fragmentos = {indice: [] for indice in sucios}
+                        if fragmentos:
+                            for cedula, emp in self.empleados.items():
+                                lista = fragmentos.get(fragmento_de(cedula, self.fragmentos))
+                                if lista is not None:
+                                    lista.append(self._serializar_empleado(emp))
+                    else:
+                        data["empleados"] = [self._serializar_empleado(emp)
+                                             for emp in self.empleados.values()]
+                
+                # Las instantáneas vivas cargan antes los años que se van a reemplazar,
+                # para seguir viéndolos como estaban al tomarlas
+                for vista in list(self._instantaneas):
+                    for anio in particiones:
+                        vista.cargar_particion(anio)
+                # Las particiones son la única copia de los años archivados
+                for anio, nominas in particiones.items():
+                    self._escribir_atomico(self._ruta_particion(anio), {"anio": anio, "nominas": nominas})
+                if sucios:
+                    for indice, empleados in sorted(fragmentos.items()):
+                        self._escribir_atomico(self._ruta_fragmento(indice), {"empleados": empleados})
+                self._escribir_atomico(self.archivo_datos, data, indent=2)
+                # Eliminar los fragmentos sobrantes de una cantidad anterior mayor
+                for indice in range(self.fragmentos, self._fragmentos_en_disco):
+                    if os.path.exists(self._ruta_fragmento(indice)):
+                        os.remove(self._ruta_fragmento(indice))
+                self._fragmentos_en_disco = self.fragmentos
+                self._version_guardada = version
+                if self._secuencia_reservada > self.secuencia_cambios:
+                    # La secuencia ya consta en los datos: se libera el resto del bloque reservado
+                    self._escribir_atomico(self._ruta_secuencia(),
+                                           {"secuencia_reservada": self.secuencia_cambios})
+                    self._secuencia_reservada = self.secuencia_cambios
+            print("Datos guardados exitosamente.")
+            return True
+        except Exception as e:
+            self._fragmentos_sucios |= sucios
+            print(f"Error al guardar datos: {e}")
+            return False
+    
+    @staticmethod
+    def _escribir_atomico(ruta: str, data: Dict, indent: int = None):
+        """Escribe un archivo JSON en un temporal y lo reemplaza de una vez"""
+        raiz, extension = os.path.splitext(ruta)
+        ruta_temporal = f"{raiz}.tmp{extension}"
+        with abrir_datos(ruta_temporal, 'w') as file:
+            json.dump(data, file, indent=indent, ensure_ascii=False)
+        os.replace(ruta_temporal, ruta)
+    
+    def _ruta_fragmento(self, indice: int) -> str:
+        """Ruta del archivo de un fragmento de empleados"""
+        return ruta_fragmento(self.archivo_datos, indice)
+    
+    def _leer_fragmentos(self) -> List[List[Dict]]:
+        """Lee los fragmentos en disco
+        
+        Se leen en serie: los empleados deben quedar como objetos de este proceso y
+        recibirlos de procesos trabajadores cuesta casi lo mismo que decodificar el
+        JSON (ver benchmark_carga.py).
+        """
+        rutas = [self._ruta_fragmento(indice) for indice in range(self._fragmentos_en_disco)]
+        # Un fragmento sin empleados nunca se escribe
+        return [_leer_fragmento(ruta) for ruta in rutas if os.path.exists(ruta)]
+    
+    def _marcar_modificado(self, cedula: str):
+        """Registra la modificación de un empleado y el fragmento a reescribir al guardar"""
+        self.version_datos += 1
+        if self._vista_columnar is not None:
+            self._cedulas_vista.add(cedula)
+        if self.fragmentos:
+            self._fragmentos_sucios.add(fragmento_de(cedula, self.fragmentos))
+    
+    def _verificar_escritura(self):
+        """Impide modificar el sistema cuando es una vista de solo lectura"""
+    
+    def tiene_cambios_pendientes(self) -> bool:
+        """Indica si hay modificaciones sin guardar"""
+        return self.version_datos != self._version_guardada
+    
+    @_lectura
+    def memoria_estimada(self) -> int:
+        """Estimación en bytes de la memoria ocupada por los empleados y sus historiales"""
+        registros = sum(len(emp.historial_nominas) + len(emp.historial_valoraciones) +
+                        len(emp.historial_salarios) for emp in self.empleados.values())
+        return len(self.empleados) * BYTES_POR_EMPLEADO + registros * BYTES_POR_REGISTRO
+    
+    @_escritura
+    def suscribir(self, sumidero):
+        """Agrega un sumidero al flujo de cambios
+        
+        Si el sumidero ya tiene eventos (por ejemplo un JSONL de una ejecución
+        anterior), la secuencia continúa a partir del último.
+        """
+        if hasattr(sumidero, "ultima_secuencia"):
+            self.secuencia_cambios = max(self.secuencia_cambios, sumidero.ultima_secuencia())
+        self._sumideros.append(sumidero)
+    
+    def _emitir(self, tipo: str, cedula: str, datos: Dict = None):
+        """Publica un evento de cambio numerado a los sumideros suscritos"""
+        if not self._sumideros:
+            return
+        self.secuencia_cambios += 1
+        if self.secuencia_cambios > self._secuencia_reservada:
+            # Se reserva un bloque en disco antes de publicar el primer número del bloque
+            reservada = self.secuencia_cambios + BLOQUE_SECUENCIA - 1
+            try:
+                self._escribir_atomico(self._ruta_secuencia(), {"secuencia_reservada": reservada})
+                self._secuencia_reservada = reservada
+            except OSError as e:
+                print(f"Error al reservar la secuencia de cambios: {e}")
+        evento = {
+            "secuencia": self.secuencia_cambios,
+            "tipo": tipo,
+            "cedula": cedula,
+            "fecha": datetime.now().isoformat(),
+            "datos": datos or {}
+        }
+        for sumidero in self._sumideros:
+            sumidero.publicar(evento)
+    
+    def _puede_adoptar(self) -> bool:
+        """Indica si los empleados ajenos pueden modificarse sin copiarlos"""
+        return not self._instantaneas
+    
+    def _empleado_mutable(self, cedula: str) -> Optional[Empleado]:
+        """Devuelve el empleado listo para modificarse, copiándolo si está compartido"""
+        if cedula in self.empleados:
+            self._marcar_modificado(cedula)
+        return self._empleado_propio(cedula)
+    
+    def _empleado_propio(self, cedula: str) -> Optional[Empleado]:
+        """Devuelve el empleado sin compartir con instantáneas, sin contarlo como cambio"""
+        empleado = self.empleados.get(cedula)
+        if empleado is not None and empleado._marca is not self._marca:
+            if not self._puede_adoptar():
+                empleado = empleado.copiar()
+                self.empleados[cedula] = empleado
+            empleado._marca = self._marca
+        return empleado
+    
+    @_escritura
+    def instantanea(self) -> "InstantaneaRRHH":
+        """Toma una instantánea de solo lectura que comparte los empleados actuales
+        
+        No copia los empleados: a partir de aquí el sistema copia cada empleado solo
+        la primera vez que lo modifica mientras la instantánea siga viva.
+        """
+        vista = InstantaneaRRHH(self)
+        self._marca = object()
+        self._instantaneas.add(vista)
+        return vista
+    
+    def _serializar_empleado(self, empleado: Empleado) -> Dict:
+        """Diccionario del empleado para el archivo principal"""
+        data = empleado.to_dict()
+        # Copiar las listas para poder serializar fuera del bloqueo
+        for campo, valor in data.items():
+            if isinstance(valor, list):
+                data[campo] = list(valor)
+        if self.particionar_historial:
+            data["historial_nominas"] = [n for n in empleado.historial_nominas
+                                         if self._es_residente(n.get("periodo", ""))]
+        return data
+    
+    def _es_residente(self, periodo: str) -> bool:
+        """Indica si las nóminas del período se guardan en el archivo principal"""
+        anio = periodo[:4]
+        return not (anio.isdigit() and anio < self._anio_residente)
+    
+    def _ruta_particion(self, anio: str) -> str:
+        """Ruta del archivo de historial de nóminas de un año"""
+        return ruta_particion(self.archivo_datos, anio)
+    
+    def _anios_no_residentes_en_memoria(self) -> List[str]:
+        """Años no residentes con nóminas en memoria"""
+        if not self.particionar_historial:
+            return []
+        anios = set()
+        for empleado in self.empleados.values():
+            for nomina_data in empleado.historial_nominas:
+                periodo = nomina_data.get("periodo", "")
+                if not self._es_residente(periodo):
+                    anios.add(periodo[:4])
+        return sorted(anios)
+    
+    def anios_archivados(self) -> List[str]:
+        """Lista los años con archivo de historial en disco"""
+        return anios_archivados(self.archivo_datos)
+    
+    def cargar_particion(self, anio: str):
+        """Incorpora al historial de los empleados las nóminas archivadas de un año
+        
+        Permitido también en instantáneas: no cambia el estado lógico del sistema.
+        """
+        if not self.particionar_historial or anio in self._anios_cargados or self._es_residente(anio):
+            return
+        
+        with self._bloqueo.escritura():
+            ruta = self._ruta_particion(anio)
+            if anio not in self._anios_cargados and os.path.exists(ruta):
+                with abrir_datos(ruta) as file:
+                    archivadas = json.load(file).get("nominas", {})
+                for cedula, nominas in archivadas.items():
+                    empleado = self.empleados.get(cedula)
+                    if not empleado:
+                        continue
+                    # Evitar duplicados si una nómina ya estaba en el archivo principal
+                    presentes = {(n.get("periodo"), n.get("fecha_calculo")) for n in empleado.historial_nominas}
+                    nuevas = [n for n in nominas if (n.get("periodo"), n.get("fecha_calculo")) not in presentes]
+                    if nuevas:
+                        # Incorporar nóminas archivadas no es una modificación: no cambia la
+                        # versión de los datos ni marca fragmentos para reescribir
+                        empleado = self._empleado_propio(cedula)
+                        empleado.historial_nominas = sorted(nuevas + empleado.historial_nominas,
+                                                            key=lambda n: n.get("periodo", ""))
+                        if self._vista_columnar is not None:
+                            self._cedulas_vista.add(cedula)
+            self._anios_cargados.add(anio)
+    
+    def _asegurar_periodos(self, desde: str = "", hasta: str = None):
+        """Carga las particiones de historial que cubren un rango de períodos"""
+        if not self.particionar_historial:
+            return
+        pendientes = [anio for anio in self.anios_archivados()
+                      if anio not in self._anios_cargados and anio >= desde[:4]
+                      and (hasta is None or anio <= hasta[:4])]
+        if pendientes:
+            with self._bloqueo.escritura():
+                for anio in pendientes:
+                    self.cargar_particion(anio)
+    
+    def _cargar_anios_no_residentes(self):
+        """Carga las particiones de los años antiguos con nóminas en memoria"""
+        with self._bloqueo.escritura():
+            for anio in self._anios_no_residentes_en_memoria():
+                self.cargar_particion(anio)
+    
+    def _particiones_en_memoria(self) -> Dict[str, Dict[str, List[Dict]]]:
+        """Agrupa por año y cédula las nóminas de los años cargados"""
+        particiones = {anio: {} for anio in self._anios_cargados}
+        for empleado in self.empleados.values():
+            for nomina_data in empleado.historial_nominas:
+                anio = nomina_data.get("periodo", "")[:4]
+                if anio in particiones:
+                    particiones[anio].setdefault(empleado.cedula, []).append(nomina_data)
+        return particiones
     
-    def guardar_datos(self):
-        """Guarda los datos en el archivo JSON"""
+    def obtener_historial_nominas(self, cedula: str, desde: str = "",
+                                  hasta: str = None) -> List[Dict]:
+        """Historial de nóminas de un empleado entre dos períodos, abriendo archivos si hace falta"""
+        self._asegurar_periodos(desde, hasta)
+        with self._bloqueo.lectura():
+            empleado = self.obtener_empleado(cedula)
+            if not empleado:
+                return []
+            return [n for n in empleado.historial_nominas
+                    if n.get("periodo", "") >= desde and (hasta is None or n.get("periodo", "") <= hasta)]
+    
+    @_lectura
+    def guardar_snapshot_compacto(self, ruta: str) -> bool:
+        """Guarda una instantánea compacta con los campos categóricos como códigos enteros
+        
+        Los empleados se escriben como filas sin nombres de campo repetidos y cargo y
+        tipo_contrato como índices a tablas de valores propias del archivo.
+        """
+        campos = []
+        categorias = {campo: TablaCategorias() for campo in CATEGORIAS}
+        filas = []
+        for empleado in self.empleados.values():
+            data = self._serializar_empleado(empleado)
+            campos = campos or list(data)
+            for campo, tabla in categorias.items():
+                data[campo] = tabla.codificar(data[campo])
+            filas.append([data[campo] for campo in campos])
         try:
-            data = {
-                "sistema_info": {
+            with abrir_datos(ruta, 'w') as file:
+                json.dump({
+                    "formato": "compacto",
                     "version": "1.0",
-                    "ultima_actualizacion": datetime.now().isoformat(),
-                    "total_empleados": len(self.empleados)
-                },
-                "empleados": [emp.to_dict() for emp in self.empleados.values()]
-            }
-            with open(self.archivo_datos, 'w', encoding='utf-8') as file:
-                json.dump(data, file, indent=2, ensure_ascii=False)
-            print("Datos guardados exitosamente.")
+                    "campos": campos,
+                    "categorias": {campo: tabla.valores for campo, tabla in categorias.items()},
+                    "empleados": filas
+                }, file, ensure_ascii=False, separators=(",", ":"))
             return True
         except Exception as e:
-            print(f"Error al guardar datos: {e}")
+            print(f"Error al guardar instantánea: {e}")
             return False
     
+    @_escritura
+    def cargar_snapshot_compacto(self, ruta: str) -> bool:
+        """Reemplaza los empleados con los de una instantánea compacta"""
+        try:
+            with abrir_datos(ruta) as file:
+                data = json.load(file)
+            campos = data["campos"]
+            categorias = data["categorias"]
+            empleados = {}
+            for fila in data["empleados"]:
+                emp_data = dict(zip(campos, fila))
+                for campo, valores in categorias.items():
+                    emp_data[campo] = valores[emp_data[campo]]
+                empleado = Empleado.from_dict(emp_data)
+                empleado._marca = self._marca
+                empleados[empleado.cedula] = empleado
+            self.empleados = empleados
+            self.version_datos += 1
+            self._vista_columnar = None
+            self._orden_listado = (None, [])
+            self._fragmentos_sucios = set(range(self.fragmentos))
+            return True
+        except Exception as e:
+            print(f"Error al cargar instantánea: {e}")
+            return False
+    
+    @_escritura
     def agregar_empleado(self, cedula: str, nombre: str, apellido: str, cargo: str,
                         salario_base: float, tipo_contrato: str, telefono: str = "",
                         email: str = "", valoracion: int = 5) -> bool:
@@ -237,17 +1970,20 @@ class SistemaRRHH:
             return False
         
         # Validación de tipo de contrato
-        contratos_validos = ["indefinido", "termino_fijo", "prestacion_servicios"]
-        if tipo_contrato.lower() not in contratos_validos:
+        if tipo_contrato.lower() not in TIPOS_CONTRATO_VALIDOS:
             print("Tipo de contrato inválido. Use: indefinido, termino_fijo, prestacion_servicios")
             return False
         
         empleado = Empleado(cedula, nombre, apellido, cargo, salario_base,
                           tipo_contrato, telefono, email, valoracion)
+        empleado._marca = self._marca
         self.empleados[cedula] = empleado
+        self._marcar_modificado(cedula)
+        self._emitir("empleado_agregado", cedula, self._serializar_empleado(empleado))
         print(f"Empleado {nombre} {apellido} agregado exitosamente.")
         return True
     
+    @_lectura
     def buscar_empleado(self, criterio: str) -> List[Empleado]:
         """Busca empleados por nombre, apellido o cédula"""
         resultados = []
@@ -261,37 +1997,87 @@ class SistemaRRHH:
         
         return resultados
     
+    @_lectura
     def obtener_empleado(self, cedula: str) -> Optional[Empleado]:
         """Obtiene un empleado por su cédula"""
         return self.empleados.get(cedula)
     
-    def actualizar_empleado(self, cedula: str, **kwargs) -> bool:
-        """Actualiza los datos de un empleado"""
+    @_escritura
+    def actualizar_empleado(self, cedula: str, vigente_desde: str = None, **kwargs) -> bool:
+        """Actualiza los datos de un empleado
+        
+        Si se indica vigente_desde (YYYY-MM) junto con salario_base, el cambio se
+        registra con fecha efectiva y se reliquidan las nóminas afectadas.
+        """
         if cedula not in self.empleados:
             print("Empleado no encontrado.")
             return False
         
-        empleado = self.empleados[cedula]
+        tipo_contrato = kwargs.get('tipo_contrato')
+        if tipo_contrato and tipo_contrato.lower() not in TIPOS_CONTRATO_VALIDOS:
+            print("Tipo de contrato inválido. Use: indefinido, termino_fijo, prestacion_servicios")
+            return False
+        
+        if vigente_desde is not None and not validar_periodo(vigente_desde):
+            print(f"Período inválido: {vigente_desde}. Use el formato YYYY-MM")
+            return False
+        
+        empleado = self._empleado_mutable(cedula)
         campos_actualizables = ['nombre', 'apellido', 'cargo', 'salario_base',
                               'tipo_contrato', 'telefono', 'email']
         
+        cambios = {}
         for campo, valor in kwargs.items():
             if campo in campos_actualizables and valor:
-                setattr(empleado, campo, valor)
+                anterior = getattr(empleado, campo)
+                if campo == 'salario_base' and (vigente_desde or empleado.historial_salarios):
+                    self.aplicar_cambios_salariales([{
+                        "cedula": cedula,
+                        "salario_base": valor,
+                        "vigente_desde": vigente_desde or datetime.now().strftime("%Y-%m")
+                    }])
+                else:
+                    setattr(empleado, campo, valor)
+                if getattr(empleado, campo) != anterior:
+                    cambios[campo] = [anterior, getattr(empleado, campo)]
         
+        if cambios:
+            self._emitir("empleado_actualizado", cedula, {"cambios": cambios})
         print("Empleado actualizado exitosamente.")
         return True
     
+    @_escritura
     def eliminar_empleado(self, cedula: str) -> bool:
         """Realiza eliminación lógica del empleado"""
         if cedula not in self.empleados:
             print("Empleado no encontrado.")
             return False
         
-        self.empleados[cedula].desactivar()
+        self._empleado_mutable(cedula).desactivar()
+        self._emitir("empleado_desactivado", cedula)
         print("Empleado desactivado exitosamente.")
         return True
     
+    @_escritura
+    def actualizar_valoracion(self, cedula: str, nueva_valoracion: int) -> bool:
+        """Actualiza la valoración de un empleado"""
+        empleado = self._empleado_mutable(cedula)
+        if not empleado:
+            print("Empleado no encontrado.")
+            return False
+        if not empleado.actualizar_valoracion(nueva_valoracion):
+            return False
+        self._emitir("valoracion_actualizada", cedula, empleado.historial_valoraciones[-1])
+        return True
+    
+    @_escritura
+    def registrar_nomina(self, nomina: Nomina):
+        """Guarda una nómina calculada en el historial de su empleado"""
+        nomina_data = nomina.to_dict()
+        self._empleado_mutable(nomina.empleado.cedula).agregar_nomina(nomina_data)
+        self._emitir("nomina_registrada", nomina.empleado.cedula, nomina_data)
+    
+    @_lectura
     def calcular_nomina(self, cedula: str, periodo: str) -> Optional[Nomina]:
         """Calcula la nómina de un empleado para un período específico"""
         empleado = self.obtener_empleado(cedula)
@@ -306,33 +2092,293 @@ class SistemaRRHH:
         nomina = Nomina(empleado, periodo)
         return nomina
     
+    def _construir_nomina(self, empleado: Empleado, periodo: str, horas_extra: Dict[str, int],
+                          bonificaciones: Dict[str, float],
+                          deducciones: Dict[str, float],
+                          evaluador: EvaluadorReglas = None,
+                          fecha_calculo: str = None) -> Nomina:
+        """Construye la nómina de un empleado con sus novedades del período"""
+        nomina = Nomina(empleado, periodo, evaluador, fecha_calculo)
+        
+        # Agregar horas extra si las hay
+        if empleado.cedula in horas_extra:
+            nomina.agregar_horas_extra(horas_extra[empleado.cedula])
+        
+        # Agregar bonificaciones si las hay
+        if empleado.cedula in bonificaciones:
+            nomina.agregar_bonificacion(bonificaciones[empleado.cedula])
+        
+        # Agregar deducciones adicionales si las hay
+        if empleado.cedula in deducciones:
+            nomina.agregar_deduccion(deducciones[empleado.cedula])
+        
+        return nomina
+    
+    @_escritura
     def procesar_nomina_completa(self, periodo: str, horas_extra: Dict[str, int] = None,
-                               bonificaciones: Dict[str, float] = None) -> List[Nomina]:
-        """Procesa nómina para todos los empleados activos"""
-        nominas = []
+                               bonificaciones: Dict[str, float] = None,
+                               deducciones: Dict[str, float] = None) -> List[Nomina]:
+        """Procesa nómina para todos los empleados activos
+        
+        Todas las nóminas de la corrida comparten la fecha de cálculo. Si las reglas
+        vigentes son solo las de ley, iguales para todos, y las horas extra son
+        enteras, se liquidan por columnas con Nomina.liquidar_lote.
+        """
+        horas_extra = horas_extra or {}
+        bonificaciones = bonificaciones or {}
+        deducciones = deducciones or {}
+        evaluador = evaluador_reglas(periodo)
+        fecha_calculo = fecha_calculo_actual()
+        empleados = [self._empleado_mutable(cedula) for cedula, empleado in self.empleados.items()
+                     if empleado.activo]
+        
+        if evaluador.tramo_uniforme and all(isinstance(horas, int) for horas in horas_extra.values()):
+            nominas = Nomina.liquidar_lote(empleados, periodo, evaluador, horas_extra,
+                                           bonificaciones, deducciones, fecha_calculo)
+        else:
+            nominas = [self._construir_nomina(empleado, periodo, horas_extra, bonificaciones,
+                                              deducciones, evaluador, fecha_calculo)
+                       for empleado in empleados]
+        
+        for nomina in nominas:
+            # Guardar en el historial del empleado
+            nomina_data = nomina.to_dict()
+            nomina.empleado.agregar_nomina(nomina_data)
+            self._emitir("nomina_registrada", nomina.empleado.cedula, nomina_data)
+        
+        return nominas
+    
+    @_escritura
+    def procesar_nomina_incremental(self, periodo: str, horas_extra: Dict[str, int] = None,
+                                  bonificaciones: Dict[str, float] = None,
+                                  deducciones: Dict[str, float] = None) -> Dict[str, Any]:
+        """Reprocesa la nómina del período recalculando solo los empleados con cambios
+        
+        Compara la huella de entradas (nombre, salario base, tipo de contrato, horas
+        extra, valor de la hora, bonificaciones, deducciones y reglas vigentes) con la
+        nómina ya registrada para el período.
+        Las nóminas sin cambios se reutilizan; las demás se recalculan y reemplazan
+        la nómina anterior del período en lugar de duplicarla.
+        """
         horas_extra = horas_extra or {}
         bonificaciones = bonificaciones or {}
+        deducciones = deducciones or {}
+        nominas = []
+        reutilizadas = 0
+        evaluador = evaluador_reglas(periodo)
+        self._asegurar_periodos(periodo, periodo)
         
         for empleado in self.empleados.values():
-            if empleado.activo:
-                nomina = Nomina(empleado, periodo)
-                
-                # Agregar horas extra si las hay
-                if empleado.cedula in horas_extra:
-                    nomina.agregar_horas_extra(horas_extra[empleado.cedula])
+            if not empleado.activo:
+                continue
+            
+            anterior = empleado.nomina_periodo(periodo)
+            if anterior is not None:
+                cedula = empleado.cedula
+                salario_base = empleado.salario_vigente(periodo)
+                huella = (f"{empleado.nombre} {empleado.apellido}", salario_base,
+                          empleado.tipo_contrato.lower(), horas_extra.get(cedula, 0),
+                          evaluador.valor_hora_extra(a_centavos(salario_base), empleado.tipo_contrato),
+                          bonificaciones.get(cedula, 0), deducciones.get(cedula, 0), evaluador.firma)
+                if Nomina.huella_registro(anterior) == huella:
+                    reutilizadas += 1
+                    continue
+            
+            empleado = self._empleado_mutable(empleado.cedula)
+            nomina = self._construir_nomina(empleado, periodo, horas_extra,
+                                            bonificaciones, deducciones, evaluador)
+            nomina_data = nomina.to_dict()
+            empleado.reemplazar_nomina(nomina_data)
+            self._emitir("nomina_registrada", empleado.cedula, nomina_data)
+            nominas.append(nomina)
+        
+        return {
+            "periodo": periodo,
+            "recalculadas": len(nominas),
+            "reutilizadas": reutilizadas,
+            "nominas": nominas
+        }
+    
+    @_escritura
+    def aplicar_cambios_salariales(self, cambios: List[Dict]) -> List[Dict]:
+        """Aplica cambios salariales con fecha efectiva y reliquida los períodos afectados
+        
+        Cada cambio es un diccionario con cedula, salario_base y vigente_desde
+        (YYYY-MM). Solo se recalculan las nóminas del empleado desde la fecha
+        efectiva cuyo salario base difiere del nuevo vigente. Por cada una se
+        reemplaza la nómina del historial y se emite una línea de reajuste con las
+        diferencias, que también queda en el historial_reajustes del empleado.
+        """
+        reajustes = []
+        
+        for cambio in cambios:
+            vigente_desde = cambio["vigente_desde"]
+            if not validar_periodo(vigente_desde):
+                print(f"Período inválido: {vigente_desde}. Use el formato YYYY-MM")
+                continue
+            empleado = self._empleado_mutable(cambio["cedula"])
+            if not empleado:
+                print(f"Empleado {cambio['cedula']} no encontrado.")
+                continue
+            
+            self._asegurar_periodos(vigente_desde)
+            empleado.registrar_salario(cambio["salario_base"], vigente_desde)
+            self._emitir("salario_registrado", empleado.cedula,
+                         {"salario_base": cambio["salario_base"], "vigente_desde": vigente_desde})
+            for periodo in empleado.periodos_nomina(vigente_desde):
+                anterior = empleado.nomina_periodo(periodo)
+                if anterior["salario_base"] == empleado.salario_vigente(periodo):
+                    continue
                 
-                # Agregar bonificaciones si las hay
-                if empleado.cedula in bonificaciones:
-                    nomina.agregar_bonificacion(bonificaciones[empleado.cedula])
+                nomina = Nomina(empleado, periodo)
+                nomina.agregar_horas_extra(anterior.get("horas_extra", 0),
+                                           anterior.get("valor_hora_extra"))
+                nomina.agregar_bonificacion(anterior.get("bonificaciones", 0))
+                nomina.agregar_deduccion(anterior.get("deducciones_adicionales", 0))
+                nueva = nomina.to_dict()
+                empleado.reemplazar_nomina(nueva)
                 
-                # Guardar en el historial del empleado
-                empleado.agregar_nomina(nomina.to_dict())
-                nominas.append(nomina)
+                # Las diferencias se restan en centavos y se convierten una sola vez
+                devengado = a_centavos(nueva["total_devengado"]) - a_centavos(anterior["total_devengado"])
+                deducciones = (a_centavos(nueva["total_deducciones"]) -
+                               a_centavos(anterior["total_deducciones"]))
+                neto = a_centavos(nueva["salario_neto"]) - a_centavos(anterior["salario_neto"])
+                reajuste = {
+                    "cedula": empleado.cedula,
+                    "periodo": periodo,
+                    "concepto": "reajuste",
+                    "vigente_desde": vigente_desde,
+                    "fecha_calculo": nueva["fecha_calculo"],
+                    "salario_anterior": anterior["salario_base"],
+                    "salario_nuevo": nueva["salario_base"],
+                    "diferencia_devengado": devengado / 100,
+                    "diferencia_deducciones": deducciones / 100,
+                    "diferencia_neto": neto / 100
+                }
+                empleado.historial_reajustes.append(reajuste)
+                reajustes.append(reajuste)
+                self._emitir("nomina_registrada", empleado.cedula, nueva)
+                self._emitir("reajuste_registrado", empleado.cedula, reajuste)
         
-        return nominas
+        return reajustes
+    
+    def _ruta_punto_control(self, periodo: str) -> str:
+        """Ruta del punto de control de una nómina por lotes"""
+        return f"{self.archivo_datos}.nomina-{periodo}.ckpt"
+    
+    def _recuperar_punto_control(self, ruta: str) -> List[Dict]:
+        """Lee los lotes confirmados de un punto de control
+        
+        Un lote solo cuenta como confirmado si su línea quedó completa; si la
+        última línea quedó a medias se descarta y se trunca el archivo.
+        """
+        lotes = []
+        confirmado = 0
+        with open(ruta, 'rb') as archivo:
+            for linea in archivo:
+                try:
+                    lotes.append(json.loads(linea))
+                except ValueError:
+                    break
+                if not linea.endswith(b"\n"):
+                    lotes.pop()
+                    break
+                confirmado += len(linea)
+        
+        if confirmado != os.path.getsize(ruta):
+            with open(ruta, 'r+b') as archivo:
+                archivo.truncate(confirmado)
+        return lotes
+    
+    def procesar_nomina_por_lotes(self, periodo: str, horas_extra: Dict[str, int] = None,
+                                bonificaciones: Dict[str, float] = None,
+                                deducciones: Dict[str, float] = None,
+                                tamano_lote: int = 1000) -> Dict[str, Any]:
+        """Procesa la nómina masiva en lotes ordenados por cédula con punto de control
+        
+        Cada lote se confirma en un archivo de control junto a archivo_datos antes de
+        incorporarse al historial. Si la corrida se interrumpe, una nueva llamada para
+        el mismo período recupera los lotes confirmados y continúa desde el siguiente,
+        sin repetir ni duplicar nóminas. Al terminar guarda los datos y elimina el
+        punto de control.
+        """
+        self._verificar_escritura()
+        horas_extra = horas_extra or {}
+        bonificaciones = bonificaciones or {}
+        deducciones = deducciones or {}
+        ruta = self._ruta_punto_control(periodo)
+        evaluador = evaluador_reglas(periodo)
+        
+        # Recuperar lotes confirmados de una corrida interrumpida
+        cursor = None
+        recuperadas = 0
+        lotes = 0
+        if os.path.exists(ruta):
+            self._asegurar_periodos(periodo, periodo)
+            with self._bloqueo.escritura():
+                for lote in self._recuperar_punto_control(ruta):
+                    for nomina_data in lote["registros"]:
+                        empleado = self.empleados.get(nomina_data["empleado_cedula"])
+                        if empleado and not any(
+                                n.get("periodo") == periodo and
+                                n.get("fecha_calculo") == nomina_data["fecha_calculo"]
+                                for n in empleado.historial_nominas):
+                            self._empleado_mutable(empleado.cedula).agregar_nomina(nomina_data)
+                            self._emitir("nomina_registrada", empleado.cedula, nomina_data)
+                        recuperadas += 1
+                    cursor = lote["ultima_cedula"]
+                    lotes += 1
+            if lotes:
+                print(f"Reanudando nómina {periodo} después de {lotes} lote(s) confirmados.")
+        
+        with self._bloqueo.lectura():
+            pendientes = sorted(cedula for cedula, empleado in self.empleados.items()
+                                if empleado.activo and (cursor is None or cedula > cursor))
+        procesadas = 0
+        
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            for inicio in range(0, len(pendientes), tamano_lote):
+                cedulas = pendientes[inicio:inicio + tamano_lote]
+                # El bloqueo se toma por lote para no detener a los lectores toda la corrida
+                with self._bloqueo.escritura():
+                    registros = [
+                        self._construir_nomina(self.empleados[cedula], periodo, horas_extra,
+                                               bonificaciones, deducciones, evaluador).to_dict()
+                        for cedula in cedulas
+                    ]
+                    
+                    # Confirmar el lote antes de tocar el historial
+                    archivo.write(json.dumps({"lote": lotes, "ultima_cedula": cedulas[-1],
+                                              "registros": registros}, ensure_ascii=False) + "\n")
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+                    
+                    for nomina_data in registros:
+                        self._empleado_mutable(nomina_data["empleado_cedula"]).agregar_nomina(nomina_data)
+                        self._emitir("nomina_registrada", nomina_data["empleado_cedula"], nomina_data)
+                procesadas += len(registros)
+                lotes += 1
+        
+        guardado = self.guardar_datos()
+        if guardado:
+            os.remove(ruta)
+        
+        return {
+            "periodo": periodo,
+            "procesadas": procesadas,
+            "recuperadas": recuperadas,
+            "lotes": lotes,
+            "guardado": guardado
+        }
     
     def generar_reporte_nomina_periodo(self, periodo: str) -> str:
         """Genera reporte consolidado de nómina por período"""
+        self._asegurar_periodos(periodo, periodo)
+        return self._generar_reporte_nomina_periodo(periodo)
+    
+    @_lectura
+    def _generar_reporte_nomina_periodo(self, periodo: str) -> str:
+        """Arma el reporte del período con el historial ya cargado"""
         total_devengado = 0
         total_deducciones = 0
         total_neto = 0
@@ -345,11 +2391,7 @@ class SistemaRRHH:
         for empleado in self.empleados.values():
             if empleado.activo:
                 # Buscar nómina del período en el historial
-                nomina_periodo = None
-                for nomina_data in empleado.historial_nominas:
-                    if nomina_data.get("periodo") == periodo:
-                        nomina_periodo = nomina_data
-                        break
+                nomina_periodo = empleado.nomina_periodo(periodo)
                 
                 if nomina_periodo:
                     nombre_completo = f"{empleado.nombre} {empleado.apellido}"
@@ -360,11 +2402,15 @@ class SistemaRRHH:
                     reporte += f"{nombre_completo[:29]:<30} {empleado.cargo[:19]:<20} "
                     reporte += f"${devengado:>12,.0f} ${deducciones:>12,.0f} ${neto:>12,.0f}\n"
                     
-                    total_devengado += devengado
-                    total_deducciones += deducciones
-                    total_neto += neto
+                    # Los totales se acumulan en centavos para que no se desvíen
+                    total_devengado += a_centavos(devengado)
+                    total_deducciones += a_centavos(deducciones)
+                    total_neto += a_centavos(neto)
                     count_empleados += 1
         
+        total_devengado /= 100
+        total_deducciones /= 100
+        total_neto /= 100
         reporte += "-" * 95 + "\n"
         reporte += f"{'TOTALES':<50} ${total_devengado:>12,.0f} ${total_deducciones:>12,.0f} ${total_neto:>12,.0f}\n"
         reporte += f"\nEmpleados procesados: {count_empleados}\n"
@@ -372,13 +2418,668 @@ class SistemaRRHH:
         
         return reporte
     
+    def iterar_nominas_periodo(self, periodo: str):
+        """Genera (empleado, nómina) para cada empleado con nómina en el período"""
+        self._asegurar_periodos(periodo, periodo)
+        with self._bloqueo.lectura():
+            empleados = list(self.empleados.values())
+        for empleado in empleados:
+            nomina_data = empleado.nomina_periodo(periodo)
+            if nomina_data is not None:
+                yield empleado, nomina_data
+    
+    def generar_comprobantes(self, periodo: str, destino: str, formato: str = "archivos",
+                             trabajadores: int = None, usar_procesos: bool = False,
+                             tamano_bloque: int = 500) -> Dict[str, Any]:
+        """Genera en paralelo los comprobantes de nómina de un período
+        
+        formato: "archivos" (un archivo por empleado dentro del directorio destino),
+        "concatenado" (un solo archivo de texto) o "zip". Los comprobantes se
+        generan por bloques en hilos o procesos y se escriben a medida que llegan,
+        con a lo sumo dos bloques por trabajador en memoria.
+        """
+        if formato not in ("archivos", "concatenado", "zip"):
+            print("Formato inválido. Use: archivos, concatenado, zip")
+            return {"comprobantes": 0}
+        
+        trabajadores = trabajadores or os.cpu_count() or 1
+        Ejecutor = ProcessPoolExecutor if usar_procesos else ThreadPoolExecutor
+        inicio = time.perf_counter()
+        total = 0
+        
+        if formato == "archivos":
+            os.makedirs(destino, exist_ok=True)
+            salida = None
+        elif formato == "zip":
+            salida = zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED)
+        else:
+            salida = open(destino, 'w', encoding='utf-8')
+        
+        def escribir(comprobantes):
+            for cedula, texto in comprobantes:
+                nombre = f"comprobante_{periodo}_{cedula}.txt"
+                if formato == "archivos":
+                    with open(os.path.join(destino, nombre), 'w', encoding='utf-8') as archivo:
+                        archivo.write(texto)
+                elif formato == "zip":
+                    salida.writestr(nombre, texto)
+                else:
+                    salida.write(texto)
+        
+        try:
+            with Ejecutor(max_workers=trabajadores) as ejecutor:
+                pendientes = deque()
+                bloque = []
+                for empleado, nomina_data in self.iterar_nominas_periodo(periodo):
+                    bloque.append((nomina_data, empleado.cargo))
+                    if len(bloque) == tamano_bloque:
+                        pendientes.append(ejecutor.submit(_renderizar_bloque, bloque))
+                        bloque = []
+                    if len(pendientes) >= 2 * trabajadores:
+                        comprobantes = pendientes.popleft().result()
+                        escribir(comprobantes)
+                        total += len(comprobantes)
+                if bloque:
+                    pendientes.append(ejecutor.submit(_renderizar_bloque, bloque))
+                while pendientes:
+                    comprobantes = pendientes.popleft().result()
+                    escribir(comprobantes)
+                    total += len(comprobantes)
+        finally:
+            if salida is not None:
+                salida.close()
+        
+        segundos = time.perf_counter() - inicio
+        return {
+            "periodo": periodo,
+            "comprobantes": total,
+            "segundos": segundos,
+            "paginas_por_segundo": total / segundos if segundos else 0.0,
+            "destino": destino
+        }
+    
+    def verificar_integridad(self, verificador: VerificadorIntegridad = None) -> Iterator[Dict]:
+        """Verifica la consistencia de los empleados en memoria, entregando los hallazgos
+        
+        Recorre los empleados presentes al comenzar; los hallazgos se producen a medida
+        que avanza, sin mantener el bloqueo entre uno y otro.
+        """
+        with self._bloqueo.lectura():
+            empleados = list(self.empleados.values())
+        verificador = verificador or VerificadorIntegridad()
+        for empleado in empleados:
+            yield from verificador.revisar_empleado(empleado.to_dict())
+    
+    @_lectura
+    def vista_columnar(self) -> Optional[Dict[str, Any]]:
+        """Devuelve los empleados y su historial de nóminas como columnas NumPy
+        
+        Columnas de empleados: cedula, salario_base, valoracion, activo,
+        codigo_cargo y codigo_tipo_contrato (índices en cargos y tipos_contrato).
+        Tabla de nóminas: nomina_empleado (fila del empleado), nomina_periodo
+        (YYYYMM) y nomina_devengado, nomina_deducciones y nomina_neto en centavos.
+        La vista se mantiene entre consultas y solo se actualizan los empleados
+        modificados desde la anterior. Requiere numpy.
+        """
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("La vista columnar requiere numpy.")
+            return None
+        
+        with self._bloqueo_vista:
+            if self._vista_columnar is None:
+                self._cedulas_vista = set()
+                self._vista_columnar = VistaColumnar()
+                self._vista_columnar.actualizar(self.empleados)
+            elif self._cedulas_vista:
+                cedulas, self._cedulas_vista = self._cedulas_vista, set()
+                self._vista_columnar.actualizar(self.empleados, sorted(cedulas))
+            return self._vista_columnar.columnas()
+    
+    def exportar_npz(self, ruta: str, comprimir: bool = False) -> bool:
+        """Exporta la vista columnar a un archivo .npz de NumPy"""
+        columnas = self.vista_columnar()
+        if columnas is None:
+            return False
+        import numpy as np
+        try:
+            guardar = np.savez_compressed if comprimir else np.savez
+            guardar(ruta, **columnas)
+            return True
+        except OSError as e:
+            print(f"Error al exportar columnas: {e}")
+            return False
+    
+    def exportar_archivo_pagos(self, periodo: str, ruta: str, formato: str = "csv") -> Dict[str, Any]:
+        """Exporta el archivo de pagos al banco con el neto de cada nómina del período
+        
+        formato "csv" escribe cedula, nombre, periodo y valor (con signo "-" si el
+        neto es negativo); "ancho_fijo" escribe un registro de encabezado (1), uno de
+        detalle por pago (2) con el valor en centavos y un registro de control (3)
+        con la cantidad y el total. El formato de ancho fijo no admite signo: los
+        pagos con neto negativo, cédula de más de 15 caracteres o valor de más de
+        15 dígitos no se escriben y se devuelven en rechazados. Los registros se
+        escriben a medida que se recorren y los totales se acumulan en centavos
+        enteros.
+        """
+        if formato not in ("csv", "ancho_fijo"):
+            print("Formato inválido. Use: csv, ancho_fijo")
+            return {"registros": 0}
+        
+        registros = 0
+        total_centavos = 0
+        rechazados = []
+        with open(ruta, 'w', encoding='utf-8', newline='') as archivo:
+            if formato == "csv":
+                escritor = csv.writer(archivo)
+                escritor.writerow(["cedula", "nombre", "periodo", "valor"])
+            else:
+                archivo.write(f"1{periodo.replace('-', ''):<6}{datetime.now():%Y%m%d}\n")
+            
+            for empleado, nomina_data in self.iterar_nominas_periodo(periodo):
+                centavos = a_centavos(nomina_data["salario_neto"])
+                if formato == "csv":
+                    escritor.writerow([empleado.cedula, nomina_data["empleado_nombre"], periodo,
+                                       formatear_centavos(centavos)])
+                elif (centavos < 0 or len(empleado.cedula) > ANCHO_CEDULA_PAGO or
+                      centavos >= 10 ** ANCHO_VALOR_PAGO):
+                    print(f"Pago de {empleado.cedula} rechazado: no cabe en el formato de ancho fijo")
+                    rechazados.append(empleado.cedula)
+                    continue
+                else:
+                    nombre = unicodedata.normalize("NFKD", nomina_data["empleado_nombre"])
+                    nombre = nombre.encode("ascii", "ignore").decode("ascii").upper()
+                    archivo.write(f"2{empleado.cedula:>{ANCHO_CEDULA_PAGO}}{nombre[:40]:<40}"
+                                  f"{centavos:0{ANCHO_VALOR_PAGO}d}\n")
+                registros += 1
+                total_centavos += centavos
+            
+            if formato == "ancho_fijo":
+                archivo.write(f"3{registros:010d}{total_centavos:018d}\n")
+        
+        if formato == "ancho_fijo" and total_centavos >= 10 ** 18:
+            os.unlink(ruta)
+            print("Error: el total de pagos no cabe en el registro de control")
+            return {"registros": 0}
+        
+        return {
+            "periodo": periodo,
+            "formato": formato,
+            "ruta": ruta,
+            "registros": registros,
+            "total_centavos": total_centavos,
+            "total": total_centavos / 100,
+            "rechazados": rechazados
+        }
+    
+    def iterar_variacion_nomina(self, periodo_anterior: str, periodo_actual: str,
+                                umbral_porcentaje: float = 10.0):
+        """Compara dos períodos de nómina y genera las filas de variación
+        
+        Une las nóminas por cédula con una tabla hash del período anterior y un
+        solo recorrido del actual. Genera filas "ingreso" (solo en el actual),
+        "variacion" (neto que cambia más que el umbral), "retiro" (solo en el
+        anterior) y al final una fila "resumen" con cantidades y totales.
+        """
+        anteriores = {}
+        for empleado, nomina_data in self.iterar_nominas_periodo(periodo_anterior):
+            anteriores[empleado.cedula] = (nomina_data["empleado_nombre"],
+                                           a_centavos(nomina_data["salario_neto"]))
+        total_anterior = sum(neto for _, neto in anteriores.values())
+        
+        resumen = {
+            "tipo": "resumen",
+            "periodo_anterior": periodo_anterior,
+            "periodo_actual": periodo_actual,
+            "empleados_anterior": len(anteriores),
+            "empleados_actual": 0,
+            "ingresos": 0,
+            "retiros": 0,
+            "variaciones": 0,
+            "total_anterior": total_anterior / 100,
+            "total_actual": 0
+        }
+        total_actual = 0
+        
+        for empleado, nomina_data in self.iterar_nominas_periodo(periodo_actual):
+            neto = a_centavos(nomina_data["salario_neto"])
+            total_actual += neto
+            resumen["empleados_actual"] += 1
+            anterior = anteriores.pop(empleado.cedula, None)
+            fila = {"cedula": empleado.cedula, "nombre": nomina_data["empleado_nombre"],
+                    "neto_anterior": None, "neto_actual": neto / 100}
+            
+            if anterior is None:
+                resumen["ingresos"] += 1
+                fila.update(tipo="ingreso", diferencia=neto / 100, variacion_porcentaje=None)
+                yield fila
+                continue
+            
+            neto_anterior = anterior[1]
+            diferencia = neto - neto_anterior
+            porcentaje = diferencia * 100 / neto_anterior if neto_anterior else None
+            if (diferencia and porcentaje is None) or (porcentaje is not None and
+                                                       abs(porcentaje) > umbral_porcentaje):
+                resumen["variaciones"] += 1
+                fila.update(tipo="variacion", neto_anterior=neto_anterior / 100,
+                            diferencia=diferencia / 100, variacion_porcentaje=porcentaje)
+                yield fila
+        
+        for cedula, (nombre, neto_anterior) in anteriores.items():
+            resumen["retiros"] += 1
+            yield {"tipo": "retiro", "cedula": cedula, "nombre": nombre,
+                   "neto_anterior": neto_anterior / 100, "neto_actual": None,
+                   "diferencia": -neto_anterior / 100, "variacion_porcentaje": None}
+        
+        resumen["total_actual"] = total_actual / 100
+        resumen["diferencia_total"] = (total_actual - total_anterior) / 100
+        yield resumen
+    
+    @_lectura
+    def filtrar_por_categoria(self, campo: str, valor: str,
+                              incluir_inactivos: bool = False) -> List[Empleado]:
+        """Empleados cuyo campo categórico (cargo o tipo_contrato) tiene el valor dado"""
+        codigo = CATEGORIAS[campo].codigo(valor)
+        if codigo is None:
+            return []
+        atributo = f"codigo_{campo}"
+        return [empleado for empleado in self.empleados.values()
+                if getattr(empleado, atributo) == codigo and (incluir_inactivos or empleado.activo)]
+    
+    @_lectura
+    def contar_por_categoria(self, campo: str, incluir_inactivos: bool = False) -> Dict[str, int]:
+        """Cantidad de empleados por valor de un campo categórico"""
+        atributo = f"codigo_{campo}"
+        conteo: Dict[int, int] = {}
+        for empleado in self.empleados.values():
+            if incluir_inactivos or empleado.activo:
+                codigo = getattr(empleado, atributo)
+                conteo[codigo] = conteo.get(codigo, 0) + 1
+        tabla = CATEGORIAS[campo]
+        return {tabla.decodificar(codigo): cantidad for codigo, cantidad in conteo.items()}
+    
+    @_lectura
+    def promedio_valoraciones_por_cargo(self, desde=None, hasta=None,
+                                        incluir_inactivos: bool = False) -> Dict[str, float]:
+        """Promedio de las valoraciones registradas en el rango, agrupado por cargo"""
+        acumulados: Dict[int, List[int]] = {}
+        for empleado in self.empleados.values():
+            if incluir_inactivos or empleado.activo:
+                valores = empleado.valoraciones_en_rango(desde, hasta)
+                if valores:
+                    acumulado = acumulados.setdefault(empleado.codigo_cargo, [0, 0])
+                    acumulado[0] += sum(valores)
+                    acumulado[1] += len(valores)
+        cargos = CATEGORIAS["cargo"]
+        return {cargos.decodificar(codigo): suma / cantidad
+                for codigo, (suma, cantidad) in acumulados.items()}
+    
+    @_lectura
+    def empleados_con_caida_valoracion(self, puntos: int = 3, desde=None,
+                                       hasta=None) -> List[Empleado]:
+        """Empleados activos cuya valoración bajó al menos puntos dentro del rango"""
+        resultados = []
+        for empleado in self.empleados.values():
+            if empleado.activo:
+                valores = empleado.valoraciones_en_rango(desde, hasta)
+                if len(valores) > 1 and valores[0] - valores[-1] >= puntos:
+                    resultados.append(empleado)
+        return resultados
+    
+    @_lectura
     def listar_empleados(self, incluir_inactivos: bool = False) -> List[Empleado]:
         """Lista todos los empleados del sistema"""
-        empleados_lista = []
-        for empleado in self.empleados.values():
+        return [empleado for empleado in self._empleados_ordenados()
+                if incluir_inactivos or empleado.activo]
+    
+    @_lectura
+    def _empleados_ordenados(self) -> List[Empleado]:
+        """Empleados ordenados por apellido y nombre; el orden se reutiliza mientras no cambien los datos"""
+        version, ordenados = self._orden_listado
+        if version != self.version_datos:
+            ordenados = sorted(self.empleados.values(), key=lambda x: f"{x.apellido} {x.nombre}")
+            self._orden_listado = (self.version_datos, ordenados)
+        return ordenados
+    
+    def iterar_empleados(self, incluir_inactivos: bool = False) -> Iterator[Empleado]:
+        """Genera los empleados en el orden de listar_empleados, sin armar la lista completa"""
+        for empleado in self._empleados_ordenados():
             if incluir_inactivos or empleado.activo:
-                empleados_lista.append(empleado)
-        return sorted(empleados_lista, key=lambda x: f"{x.apellido} {x.nombre}")
+                yield empleado
+    
+    def iterar_busqueda(self, criterio: str) -> Iterator[Empleado]:
+        """Genera en orden de listado los empleados que coinciden con buscar_empleado"""
+        criterio = criterio.lower()
+        for empleado in self._empleados_ordenados():
+            if (criterio in empleado.nombre.lower() or
+                criterio in empleado.apellido.lower() or
+                criterio in empleado.cedula):
+                yield empleado
+
+class InstantaneaRRHH(SistemaRRHH):
+    """Vista de solo lectura de SistemaRRHH en un instante dado
+    
+    Comparte los objetos Empleado con el sistema de origen; el origen los copia
+    antes de modificarlos. Admite búsquedas, listados, reportes y exportaciones.
+    """
+    
+    def __init__(self, origen: SistemaRRHH):
+        self._inicializar_estado(origen.archivo_datos, origen.particionar_historial,
+                                 type(origen._bloqueo)(), origen.fragmentos)
+        self.fecha_instantanea = datetime.now().isoformat()
+        self.empleados = dict(origen.empleados)
+        self.secuencia_cambios = origen.secuencia_cambios
+        self._anio_residente = origen._anio_residente
+        self._anios_cargados = set(origen._anios_cargados)
+        self._fragmentos_en_disco = origen._fragmentos_en_disco
+        self.version_datos = origen.version_datos
+        self._version_guardada = origen.version_datos
+    
+    def _verificar_escritura(self):
+        raise RuntimeError("La instantánea es de solo lectura")
+    
+    def _puede_adoptar(self) -> bool:
+        # Los empleados siguen compartidos con el origen mientras este exista
+        return False
+
+
+class RegistroEmpresas:
+    """Registro de sistemas de RRHH de varias empresas con memoria acotada
+    
+    Cada empresa tiene su archivo <empresa><extension> en el directorio. Las
+    empresas se abren bajo demanda y se mantienen residentes las usadas más
+    recientemente, hasta max_empresas o max_bytes (según memoria_estimada).
+    Antes de expulsar una empresa con empleados se guardan sus datos; si el
+    guardado falla, sigue residente. Las tablas de categorías y las reglas de
+    nómina compiladas son globales y las comparten todas las empresas.
+    """
+    
+    def __init__(self, directorio: str, max_empresas: int = 50, max_bytes: int = None,
+                 extension: str = ".json", **opciones):
+        self.directorio = directorio
+        self.max_empresas = max_empresas
+        self.max_bytes = max_bytes
+        self.extension = extension
+        # Opciones de SistemaRRHH comunes a todas las empresas
+        self.opciones = opciones
+        self._residentes = OrderedDict()
+        self._ultimo_uso: Dict[str, float] = {}
+        self._en_uso: Dict[str, int] = {}
+        self._bloqueo = threading.RLock()
+        os.makedirs(directorio, exist_ok=True)
+    
+    def _ruta(self, empresa: str) -> str:
+        """Ruta del archivo de datos de una empresa"""
+        if not empresa or not all(c.isalnum() or c in "-_" for c in empresa):
+            raise ValueError(f"Identificador de empresa inválido: {empresa!r}")
+        return os.path.join(self.directorio, f"{empresa}{self.extension}")
+    
+    def obtener(self, empresa: str) -> SistemaRRHH:
+        """Devuelve el sistema de una empresa, abriéndolo si no está residente"""
+        with self._bloqueo:
+            sistema = self._residentes.get(empresa)
+            self._ultimo_uso[empresa] = time.monotonic()
+            if sistema is None:
+                sistema = SistemaRRHH(self._ruta(empresa), **self.opciones)
+                self._residentes[empresa] = sistema
+                # Los límites se revisan al abrir, no en cada acceso a una residente
+                self._aplicar_limites(conservar=empresa)
+            else:
+                self._residentes.move_to_end(empresa)
+            return sistema
+    
+    @contextmanager
+    def usar(self, empresa: str):
+        """Entrega el sistema de una empresa impidiendo su expulsión mientras se usa"""
+        with self._bloqueo:
+            sistema = self.obtener(empresa)
+            self._en_uso[empresa] = self._en_uso.get(empresa, 0) + 1
+        try:
+            yield sistema
+        finally:
+            with self._bloqueo:
+                self._en_uso[empresa] -= 1
+                if not self._en_uso[empresa]:
+                    del self._en_uso[empresa]
+                self._ultimo_uso[empresa] = time.monotonic()
+    
+    def empresas_residentes(self) -> List[str]:
+        """Lista las empresas residentes de la menos a la más recientemente usada"""
+        with self._bloqueo:
+            return list(self._residentes)
+    
+    def memoria_estimada(self) -> int:
+        """Memoria estimada de todas las empresas residentes"""
+        with self._bloqueo:
+            return sum(sistema.memoria_estimada() for sistema in self._residentes.values())
+    
+    @staticmethod
+    def _requiere_guardado(sistema: SistemaRRHH) -> bool:
+        """Indica si una empresa debe guardarse antes de liberarla
+        
+        Los cambios hechos directamente sobre un Empleado (por ejemplo con
+        obtener_empleado(...).agregar_nomina) no cambian version_datos, así que
+        solo se omite el guardado de las empresas vacías sin cambios.
+        """
+        return bool(sistema.empleados) or sistema.tiene_cambios_pendientes()
+    
+    def _expulsar(self, empresa: str) -> bool:
+        """Guarda los datos de una empresa y la saca de memoria"""
+        sistema = self._residentes[empresa]
+        if self._requiere_guardado(sistema) and not sistema.guardar_datos():
+            print(f"No se pudo guardar la empresa {empresa}; se mantiene en memoria.")
+            return False
+        del self._residentes[empresa]
+        self._ultimo_uso.pop(empresa, None)
+        return True
+    
+    def _aplicar_limites(self, conservar: str = None):
+        """Expulsa las empresas menos usadas hasta cumplir los límites de cantidad y memoria"""
+        memoria = None
+        if self.max_bytes is not None:
+            memoria = {empresa: sistema.memoria_estimada()
+                       for empresa, sistema in self._residentes.items()}
+        for empresa in list(self._residentes):
+            excede_cantidad = len(self._residentes) > self.max_empresas
+            excede_memoria = memoria is not None and sum(memoria.values()) > self.max_bytes
+            if not (excede_cantidad or excede_memoria):
+                break
+            if empresa == conservar or empresa in self._en_uso:
+                continue
+            if self._expulsar(empresa) and memoria is not None:
+                del memoria[empresa]
+    
+    def expulsar_inactivas(self, segundos: float) -> List[str]:
+        """Expulsa las empresas sin uso en los últimos segundos indicados"""
+        limite = time.monotonic() - segundos
+        expulsadas = []
+        with self._bloqueo:
+            for empresa in list(self._residentes):
+                if (empresa not in self._en_uso and self._ultimo_uso.get(empresa, 0) <= limite
+                        and self._expulsar(empresa)):
+                    expulsadas.append(empresa)
+        return expulsadas
+    
+    def guardar_todas(self) -> bool:
+        """Guarda las empresas residentes con empleados o cambios pendientes"""
+        with self._bloqueo:
+            return all([sistema.guardar_datos() for sistema in self._residentes.values()
+                        if self._requiere_guardado(sistema)])
+    
+    def cerrar(self) -> bool:
+        """Guarda los cambios pendientes y libera todas las empresas"""
+        with self._bloqueo:
+            guardado = self.guardar_todas()
+            if guardado:
+                self._residentes.clear()
+                self._ultimo_uso.clear()
+            return guardado
+
+
+MAX_CURSORES_CLI = 32
+
+
+class CursorResultados:
+    """Cursor paginado sobre el resultado de una consulta de SistemaRRHH
+    
+    Las filas se piden a la consulta (un generador) solo hasta completar la página
+    solicitada, y cada página se formatea una vez como un único bloque de texto.
+    Filas y páginas se conservan mientras no cambie la versión de datos del sistema;
+    si cambia, la consulta se repite desde el comienzo.
+    """
+    
+    def __init__(self, sistema: SistemaRRHH, consulta: Callable[[], Iterable],
+                 formatear: Callable[[int, Any], str], tamano_pagina: int = 20,
+                 encabezado: str = ""):
+        self.sistema = sistema
+        self.consulta = consulta
+        self.formatear = formatear
+        self.tamano_pagina = tamano_pagina
+        self.encabezado = encabezado
+        self.pagina = 0
+        self._version = None
+    
+    def _sincronizar(self):
+        """Reinicia el resultado si los datos cambiaron desde la última consulta"""
+        if self._version != self.sistema.version_datos:
+            self._version = self.sistema.version_datos
+            self._iterador = iter(self.consulta())
+            self._filas = []
+            self._agotado = False
+            self._paginas: Dict[int, str] = {}
+    
+    def _cargar_hasta(self, cantidad: Optional[int]):
+        """Obtiene filas de la consulta hasta tener la cantidad pedida (None: todas)"""
+        while not self._agotado and (cantidad is None or len(self._filas) < cantidad):
+            try:
+                self._filas.append(next(self._iterador))
+            except StopIteration:
+                self._agotado = True
+    
+    @property
+    def completo(self) -> bool:
+        """Indica si ya se recorrió toda la consulta"""
+        self._sincronizar()
+        return self._agotado
+    
+    def total(self) -> int:
+        """Cantidad total de filas; recorre la consulta completa si aún no terminó"""
+        self._sincronizar()
+        self._cargar_hasta(None)
+        return len(self._filas)
+    
+    def total_paginas(self) -> int:
+        return max(1, -(-self.total() // self.tamano_pagina))
+    
+    def hay_siguiente(self) -> bool:
+        self._sincronizar()
+        self._cargar_hasta((self.pagina + 1) * self.tamano_pagina + 1)
+        return len(self._filas) > (self.pagina + 1) * self.tamano_pagina
+    
+    def texto_pagina(self, numero: int = None) -> str:
+        """Devuelve el texto de una página (la actual por omisión), formateándola una vez"""
+        self._sincronizar()
+        numero = self.pagina if numero is None else numero
+        texto = self._paginas.get(numero)
+        if texto is None:
+            inicio = numero * self.tamano_pagina
+            self._cargar_hasta(inicio + self.tamano_pagina)
+            filas = self._filas[inicio:inicio + self.tamano_pagina]
+            lineas = [self.formatear(inicio + i, fila) for i, fila in enumerate(filas, 1)]
+            texto = self._paginas[numero] = "\n".join(lineas)
+        return texto
+    
+    def ir_a(self, numero: int) -> bool:
+        """Cambia a una página (desde 0); devuelve False si no existe"""
+        self._sincronizar()
+        if numero < 0:
+            return False
+        self._cargar_hasta(numero * self.tamano_pagina + 1)
+        if numero > 0 and len(self._filas) <= numero * self.tamano_pagina:
+            return False
+        self.pagina = numero
+        return True
+    
+    def siguiente(self) -> bool:
+        return self.ir_a(self.pagina + 1)
+    
+    def anterior(self) -> bool:
+        return self.ir_a(self.pagina - 1)
+
+
+def navegar_resultados(cursor: CursorResultados, vacio: str, leer: Callable[[str], str] = None):
+    """Muestra un cursor página por página con navegación siguiente/anterior/ir a"""
+    leer = leer or input
+    cursor.ir_a(0)
+    if not cursor.texto_pagina():
+        print(vacio)
+        return
+    
+    while True:
+        pagina = cursor.texto_pagina()
+        mas = cursor.hay_siguiente()
+        total = f" de {cursor.total_paginas()}" if cursor.completo else ""
+        salida = [cursor.encabezado, pagina] if cursor.encabezado else [pagina]
+        salida.append(f"-- Página {cursor.pagina + 1}{total} --")
+        print("\n".join(salida))
+        
+        if not mas and cursor.pagina == 0:
+            return
+        opcion = leer("[s]iguiente, [a]nterior, número de página, [f]in, Enter para salir: ").strip().lower()
+        if not opcion:
+            return
+        if opcion == "s":
+            movido = cursor.siguiente()
+        elif opcion == "a":
+            movido = cursor.anterior()
+        elif opcion == "f":
+            movido = cursor.ir_a(cursor.total_paginas() - 1)
+        elif opcion.isdigit():
+            movido = cursor.ir_a(int(opcion) - 1)
+        else:
+            movido = False
+        if not movido:
+            print("Página no disponible.")
+
+
+def _formatear_busqueda(numero: int, emp: Empleado) -> str:
+    return f"{numero}. {emp} - ${emp.salario_base:,.0f}"
+
+
+def _formatear_listado(numero: int, emp: Empleado) -> str:
+    estado = "Activo" if emp.activo else "Inactivo"
+    nombre_completo = f"{emp.nombre} {emp.apellido}"
+    return (f"{numero:<3} {nombre_completo[:24]:<25} {emp.cargo[:19]:<20} "
+            f"${emp.salario_base:>12,.0f} {estado:<10}")
+
+
+def _filas_nomina(sistema: SistemaRRHH, periodo: str) -> Iterator[tuple]:
+    """Genera (empleado, nómina) de los empleados activos con nómina en el período"""
+    for empleado in sistema.iterar_empleados():
+        nomina_data = empleado.nomina_periodo(periodo)
+        if nomina_data:
+            yield empleado, nomina_data
+
+
+def _formatear_nomina(numero: int, fila: tuple) -> str:
+    empleado, nomina_data = fila
+    return f"- {empleado.nombre} {empleado.apellido}: ${nomina_data['salario_neto']:,.0f}"
+
+
+def _cursor_cli(cursores: Dict[tuple, CursorResultados], clave: tuple, sistema: SistemaRRHH,
+                consulta: Callable[[], Iterable], formatear: Callable[[int, Any], str],
+                encabezado: str = "") -> CursorResultados:
+    """Reutiliza el cursor de una consulta ya mostrada para aprovechar sus páginas en caché"""
+    cursor = cursores.get(clave)
+    if cursor is None:
+        # Conservar solo las consultas más recientes
+        if len(cursores) >= MAX_CURSORES_CLI:
+            del cursores[next(iter(cursores))]
+        cursor = cursores[clave] = CursorResultados(sistema, consulta, formatear,
+                                                    encabezado=encabezado)
+    return cursor
+
 
 def mostrar_menu():
     """Muestra el menú principal del sistema"""
@@ -397,9 +3098,156 @@ def mostrar_menu():
     print("0. Salir")
     print("="*50)
 
-def main():
+CAMPOS_TEXTO_LOTE = ("cedula", "nombre", "apellido", "cargo", "tipo_contrato", "telefono", "email",
+                     "vigente_desde", "periodo")
+
+
+def _validar_comando(comando: Dict) -> Dict:
+    """Valida los tipos de los campos de un comando de lote y convierte los numéricos"""
+    if not isinstance(comando, dict):
+        raise TypeError("cada línea debe ser un objeto JSON")
+    for campo in CAMPOS_TEXTO_LOTE:
+        if campo in comando and not isinstance(comando[campo], str):
+            raise TypeError(f"el campo {campo} debe ser texto")
+    if "salario_base" in comando:
+        salario_base = float(comando["salario_base"])
+        if not math.isfinite(salario_base) or salario_base <= 0:
+            raise ValueError(f"salario_base inválido: {comando['salario_base']}")
+        comando["salario_base"] = salario_base
+    if "valoracion" in comando:
+        comando["valoracion"] = int(comando["valoracion"])
+    return comando
+
+
+def _comando_agregar(sistema: SistemaRRHH, comando: Dict) -> bool:
+    return sistema.agregar_empleado(
+        comando["cedula"], comando["nombre"], comando["apellido"], comando["cargo"],
+        comando["salario_base"], comando["tipo_contrato"],
+        comando.get("telefono", ""), comando.get("email", ""), comando.get("valoracion", 5))
+
+
+def _comando_actualizar(sistema: SistemaRRHH, comando: Dict) -> bool:
+    campos = {campo: valor for campo, valor in comando.items()
+              if campo not in ("accion", "cedula", "vigente_desde")}
+    if comando.get("vigente_desde") and not validar_periodo(comando["vigente_desde"]):
+        raise ValueError(f"período inválido: {comando['vigente_desde']}")
+    return sistema.actualizar_empleado(comando["cedula"], comando.get("vigente_desde"), **campos)
+
+
+def _comando_desactivar(sistema: SistemaRRHH, comando: Dict) -> bool:
+    return sistema.eliminar_empleado(comando["cedula"])
+
+
+def _comando_valorar(sistema: SistemaRRHH, comando: Dict) -> bool:
+    return sistema.actualizar_valoracion(comando["cedula"], comando["valoracion"])
+
+
+def _comando_nomina(sistema: SistemaRRHH, comando: Dict) -> str:
+    novedades = (comando["periodo"], comando.get("horas_extra"), comando.get("bonificaciones"),
+                 comando.get("deducciones"))
+    if comando.get("incremental"):
+        resultado = sistema.procesar_nomina_incremental(*novedades)
+        return f"{resultado['recalculadas']} recalculadas, {resultado['reutilizadas']} reutilizadas"
+    return f"{len(sistema.procesar_nomina_completa(*novedades))} nóminas"
+
+
+def _comando_reporte(sistema: SistemaRRHH, comando: Dict) -> str:
+    return sistema.generar_reporte_nomina_periodo(comando["periodo"])
+
+
+COMANDOS_LOTE = {
+    "agregar": _comando_agregar,
+    "actualizar": _comando_actualizar,
+    "desactivar": _comando_desactivar,
+    "valorar": _comando_valorar,
+    "nomina": _comando_nomina,
+    "reporte": _comando_reporte
+}
+
+
+def ejecutar_lote(sistema: SistemaRRHH, lineas: Iterable[str], guardar_cada: int = 0) -> Dict[str, int]:
+    """Ejecuta comandos JSONL sobre el sistema en memoria y guarda una sola vez al final
+    
+    Cada línea es un objeto JSON con una "accion" (agregar, actualizar, desactivar,
+    valorar, nomina, reporte) y sus parámetros. Con guardar_cada > 0 también se
+    guarda cada esa cantidad de comandos aplicados. Cualquier falla de un comando
+    se informa como error de ese comando; al terminar, aun si el lote se
+    interrumpe, se guarda todo cambio que haya quedado en memoria.
+    """
+    exitosos = 0
+    fallidos = 0
+    pendientes = 0
+    
+    try:
+        for numero, linea in enumerate(lineas, 1):
+            if not linea.strip() or linea.lstrip().startswith("#"):
+                continue
+            try:
+                comando = _validar_comando(json.loads(linea))
+                accion = comando["accion"]
+                if accion not in COMANDOS_LOTE:
+                    raise ValueError(f"acción desconocida '{accion}'")
+                resultado = COMANDOS_LOTE[accion](sistema, comando)
+            except Exception as e:
+                print(f"[{numero}] ERROR: {e}")
+                fallidos += 1
+                continue
+            
+            if resultado is False:
+                print(f"[{numero}] {accion}: ERROR")
+                fallidos += 1
+                continue
+            
+            print(f"[{numero}] {accion}: {'OK' if resultado is True else resultado}")
+            exitosos += 1
+            if accion != "reporte":
+                pendientes += 1
+            if guardar_cada and pendientes >= guardar_cada:
+                sistema.guardar_datos()
+                pendientes = 0
+    finally:
+        # Un comando fallido pudo modificar la memoria antes de fallar
+        if pendientes or sistema.tiene_cambios_pendientes():
+            sistema.guardar_datos()
+    return {"exitosos": exitosos, "fallidos": fallidos}
+
+
+def main(argumentos: List[str] = None):
     """Función principal del programa"""
-    sistema = SistemaRRHH()
+    parser = argparse.ArgumentParser(description="Sistema de gestión de recursos humanos")
+    parser.add_argument("--datos", default="empleados.json", help="archivo de datos")
+    parser.add_argument("--lote", help="archivo JSONL de comandos a ejecutar sin menú ('-' para stdin)")
+    parser.add_argument("--guardar-cada", type=int, default=0,
+                        help="en modo lote, guardar cada N comandos además de al final")
+    parser.add_argument("--verificar", action="store_true",
+                        help="verificar la consistencia del archivo de datos y salir")
+    opciones = parser.parse_args(argumentos)
+    
+    if opciones.verificar:
+        if not os.path.exists(opciones.datos):
+            print(f"Archivo de datos no encontrado: {opciones.datos}")
+            return
+        verificador = VerificadorIntegridad()
+        for hallazgo in verificar_integridad_archivo(opciones.datos, verificador):
+            periodo = f" [{hallazgo['periodo']}]" if "periodo" in hallazgo else ""
+            print(f"{hallazgo['tipo']}: {hallazgo['cedula']}{periodo} - {hallazgo['detalle']}")
+        print(f"Empleados revisados: {verificador.empleados_revisados}. "
+              f"Nóminas revisadas: {verificador.nominas_revisadas}. "
+              f"Hallazgos: {sum(verificador.hallazgos.values())}.")
+        return
+    
+    sistema = SistemaRRHH(opciones.datos)
+    # Cursores de los listados ya mostrados, con sus páginas formateadas en caché
+    cursores: Dict[tuple, CursorResultados] = {}
+    
+    if opciones.lote:
+        if opciones.lote == "-":
+            resumen = ejecutar_lote(sistema, sys.stdin, opciones.guardar_cada)
+        else:
+            with open(opciones.lote, 'r', encoding='utf-8') as archivo:
+                resumen = ejecutar_lote(sistema, archivo, opciones.guardar_cada)
+        print(f"Comandos exitosos: {resumen['exitosos']}. Comandos con error: {resumen['fallidos']}.")
+        return
     
     while True:
         mostrar_menu()
@@ -427,31 +3275,21 @@ def main():
                 # Buscar empleado
                 print("\n--- BUSCAR EMPLEADO ---")
                 criterio = input("Ingrese nombre, apellido o cédula: ").strip()
-                resultados = sistema.buscar_empleado(criterio)
-                
-                if resultados:
-                    print(f"\nSe encontraron {len(resultados)} resultado(s):")
-                    for i, emp in enumerate(resultados, 1):
-                        print(f"{i}. {emp} - ${emp.salario_base:,.0f}")
-                else:
-                    print("No se encontraron empleados.")
+                cursor = _cursor_cli(cursores, ("buscar", criterio), sistema,
+                                     partial(sistema.iterar_busqueda, criterio), _formatear_busqueda,
+                                     "\nResultados:")
+                navegar_resultados(cursor, "No se encontraron empleados.")
             
             elif opcion == "3":
                 # Listar empleados
                 print("\n--- LISTA DE EMPLEADOS ---")
                 incluir_inactivos = input("¿Incluir empleados inactivos? (s/n): ").lower() == 's'
-                empleados = sistema.listar_empleados(incluir_inactivos)
-                
-                if empleados:
-                    print(f"\n{'#':<3} {'NOMBRE':<25} {'CARGO':<20} {'SALARIO':<15} {'ESTADO':<10}")
-                    print("-" * 73)
-                    for i, emp in enumerate(empleados, 1):
-                        estado = "Activo" if emp.activo else "Inactivo"
-                        nombre_completo = f"{emp.nombre} {emp.apellido}"
-                        print(f"{i:<3} {nombre_completo[:24]:<25} {emp.cargo[:19]:<20} "
-                              f"${emp.salario_base:>12,.0f} {estado:<10}")
-                else:
-                    print("No hay empleados registrados.")
+                encabezado = (f"\n{'#':<3} {'NOMBRE':<25} {'CARGO':<20} {'SALARIO':<15} {'ESTADO':<10}\n" +
+                              "-" * 73)
+                cursor = _cursor_cli(cursores, ("listar", incluir_inactivos), sistema,
+                                     partial(sistema.iterar_empleados, incluir_inactivos),
+                                     _formatear_listado, encabezado)
+                navegar_resultados(cursor, "No hay empleados registrados.")
             
             elif opcion == "4":
                 # Actualizar empleado
@@ -467,6 +3305,9 @@ def main():
                     apellido = input(f"Apellido ({empleado.apellido}): ").strip()
                     cargo = input(f"Cargo ({empleado.cargo}): ").strip()
                     salario = input(f"Salario ({empleado.salario_base}): ").strip()
+                    vigente_desde = ""
+                    if salario:
+                        vigente_desde = input("Vigente desde (YYYY-MM, opcional): ").strip()
                     telefono = input(f"Teléfono ({empleado.telefono}): ").strip()
                     email = input(f"Email ({empleado.email}): ").strip()
                     
@@ -478,7 +3319,7 @@ def main():
                     if telefono: kwargs['telefono'] = telefono
                     if email: kwargs['email'] = email
                     
-                    sistema.actualizar_empleado(cedula, **kwargs)
+                    sistema.actualizar_empleado(cedula, vigente_desde or None, **kwargs)
                     sistema.guardar_datos()
                 else:
                     print("Empleado no encontrado.")
@@ -510,7 +3351,7 @@ def main():
                     print(nomina.generar_reporte())
                     
                     # Guardar en historial
-                    nomina.empleado.agregar_nomina(nomina.to_dict())
+                    sistema.registrar_nomina(nomina)
                     sistema.guardar_datos()
             
             elif opcion == "7":
@@ -518,14 +3359,13 @@ def main():
                 print("\n--- PROCESAR NÓMINA MASIVA ---")
                 periodo = input("Período (YYYY-MM): ").strip()
                 
-                nominas = sistema.procesar_nomina_completa(periodo)
-                print(f"\nNómina procesada para {len(nominas)} empleados.")
+                resultado = sistema.procesar_nomina_por_lotes(periodo)
+                total = resultado["procesadas"] + resultado["recuperadas"]
+                print(f"\nNómina procesada para {total} empleados.")
                 
-                for nomina in nominas:
-                    print(f"- {nomina.empleado.nombre} {nomina.empleado.apellido}: "
-                          f"${nomina.salario_neto:,.0f}")
-                
-                sistema.guardar_datos()
+                cursor = _cursor_cli(cursores, ("nomina", periodo), sistema,
+                                     partial(_filas_nomina, sistema, periodo), _formatear_nomina)
+                navegar_resultados(cursor, "No hay nóminas para el período.")
             
             elif opcion == "8":
                 # Generar reporte de nómina
@@ -545,7 +3385,7 @@ def main():
                     print(f"Valoración actual: {empleado.valoracion}")
                     nueva_valoracion = int(input("Nueva valoración (1-10): "))
                     
-                    if empleado.actualizar_valoracion(nueva_valoracion):
+                    if sistema.actualizar_valoracion(cedula, nueva_valoracion):
                         print("Valoración actualizada exitosamente.")
                         sistema.guardar_datos()
                     else:
@@ -2,12 +2,24 @@ import pytest
 import json
 import os
 import tempfile
+from array import array
 from datetime import datetime
 from unittest.mock import patch, mock_open
+import gzip
+import io
+import shutil
 import sys
+import threading
+import zipfile
+import arnes_nomina
+import sistema_rrhh
 
 # Importar las clases del sistema (asumiendo que están en un archivo llamado sistema_rrhh.py)
-from sistema_rrhh import Empleado, Nomina, SistemaRRHH
+from sistema_rrhh import (Empleado, Nomina, SistemaRRHH, BloqueoLecturaEscritura, SumideroCola,
+                          MotorNominaCentavos, configurar_reglas_nomina,
+                          REGLAS_NOMINA_PREDETERMINADAS, fragmento_de, RegistroEmpresas,
+                          BYTES_POR_EMPLEADO, verificar_integridad_archivo, CursorResultados,
+                          SumideroJSONL, ejecutar_lote, main)
 
 # Como el código está en el documento, lo copiamos aquí para las pruebas
 # En un proyecto real, esto sería una importación normal
@@ -63,6 +75,28 @@ class TestEmpleado:
         assert empleado.valoracion == 5  # Valor original
         assert len(empleado.historial_valoraciones) == 1
     
+    def test_indice_temporal_valoraciones(self):
+        """Prueba consultas por rango y resumen del historial de valoraciones"""
+        empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        empleado.historial_valoraciones = [
+            {"fecha": "2024-05-10T09:00:00", "valoracion": 6},
+            {"fecha": "2024-01-15T09:00:00", "valoracion": 9},
+            {"fecha": "2024-08-01T09:00:00", "valoracion": 4},
+        ]
+        
+        assert empleado.valoraciones_en_rango("2024-04-01", "2024-07-01") == [6]
+        assert empleado.valoraciones_en_rango() == [9, 6, 4]
+        resumen = empleado.resumen_valoraciones()
+        assert resumen["ultima"] == 4
+        assert resumen["minima"] == 4 and resumen["maxima"] == 9
+        assert resumen["tendencia"] == -5
+        
+        empleado.actualizar_valoracion(10)
+        resumen = empleado.resumen_valoraciones()
+        assert resumen["ultima"] == 10
+        assert resumen["cantidad"] == 4
+        assert resumen["media"] == (9 + 6 + 4 + 10) / 4
+    
     def test_agregar_nomina(self):
         """Prueba agregar nómina al historial"""
         empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
@@ -73,6 +107,34 @@ class TestEmpleado:
         assert len(empleado.historial_nominas) == 1
         assert empleado.historial_nominas[0] == nomina_data
     
+    def test_registrar_salario_con_fecha_efectiva(self):
+        """Prueba el historial salarial con fechas efectivas"""
+        empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        
+        empleado.registrar_salario(3300000, "2024-03")
+        empleado.registrar_salario(3600000, "2024-07")
+        
+        assert empleado.salario_base == 3600000
+        assert empleado.salario_vigente("2024-01") == 3000000
+        assert empleado.salario_vigente("2024-03") == 3300000
+        assert empleado.salario_vigente("2024-06") == 3300000
+        assert empleado.salario_vigente("2025-01") == 3600000
+        assert Empleado.from_dict(empleado.to_dict()).salario_vigente("2024-05") == 3300000
+    
+    def test_registrar_salario_futuro_o_invalido(self):
+        """Prueba que un cambio futuro no altera el salario actual y que se valida la fecha"""
+        empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        
+        assert empleado.registrar_salario(9000000, "2999-01")
+        assert empleado.salario_base == 3000000
+        assert Nomina(empleado, datetime.now().strftime("%Y-%m")).salario_base == 3000000
+        assert empleado.salario_vigente("2999-02") == 9000000
+        
+        assert not empleado.registrar_salario(5, "garbage")
+        assert not empleado.registrar_salario(5, "2024-13")
+        assert empleado.salario_base == 3000000
+        assert [s["vigente_desde"] for s in empleado.historial_salarios] == ["", "2999-01"]
+    
     def test_desactivar_empleado(self):
         """Prueba desactivación de empleado"""
         empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
@@ -126,6 +188,19 @@ class TestEmpleado:
         assert len(empleado.historial_nominas) == 1
         assert len(empleado.historial_valoraciones) == 1
     
+    def test_campos_categoricos_codificados(self):
+        """Prueba que cargo y tipo de contrato se comparten como códigos"""
+        empleado1 = Empleado("1", "Juan", "Pérez", "Analista", 3000000, "indefinido")
+        empleado2 = Empleado("2", "Ana", "Ruiz", "Analista", 3100000, "termino_fijo")
+        
+        assert empleado1.codigo_cargo == empleado2.codigo_cargo
+        assert empleado1.codigo_tipo_contrato != empleado2.codigo_tipo_contrato
+        assert empleado1.cargo == "Analista"
+        
+        empleado2.cargo = "Líder"
+        assert empleado2.cargo == "Líder"
+        assert empleado2.to_dict()["cargo"] == "Líder"
+    
     def test_str_representation(self):
         """Prueba representación en string"""
         empleado = Empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
@@ -236,6 +311,199 @@ class TestNomina:
         assert "DEVENGADO" in reporte
         assert "DEDUCCIONES" in reporte
         assert "NETO A PAGAR" in reporte
+    
+    def test_deducciones_exactas_en_centavos(self):
+        """Prueba el redondeo al centavo de salud y pensión"""
+        empleado = Empleado("777", "Ana", "Ruiz", "Dev", 1234567.89, "indefinido")
+        nomina = Nomina(empleado, "2024-01")
+        nomina.agregar_bonificacion(0.1)
+        nomina.agregar_bonificacion(0.2)
+        
+        # 4% de 1.234.567,89 = 49.382,7156 -> 49.382,72
+        assert nomina.deduccion_salud == 49382.72
+        assert nomina.deduccion_pension == 49382.72
+        assert nomina.total_devengado == 1234568.19
+        assert nomina.salario_neto == 1234568.19 - 98765.44
+    
+    def test_motor_centavos_escalar_y_lote(self):
+        """Prueba que el cálculo por lote coincide con el de las reglas predeterminadas"""
+        motor = MotorNominaCentavos()
+        evaluador = sistema_rrhh.evaluador_reglas("2024-01")
+        salarios = array('q', [300_000_000, 123_456_789, 99, 12_63, 12_37])
+        horas = array('q', [2, 0, 1, 0, 0])
+        valores = array('q', [2_000_000] * 5)
+        bonificaciones = array('q', [10, 0, 5, 0, 0])
+        deducciones = array('q', [0, 1, 0, 0, 0])
+        lote = motor.calcular_lote(salarios, horas, valores, bonificaciones, deducciones)
+        
+        for i in range(5):
+            escalar = evaluador.calcular(salarios[i], "indefinido", horas[i], valores[i],
+                                         bonificaciones[i], deducciones[i])
+            for campo, valores_lote in lote.items():
+                assert valores_lote[i] == escalar[campo]
+        assert lote["deduccion_salud"][0] == 12_000_000
+        assert list(lote["deduccion_salud"][3:]) == [51, 49]  # 50,52 -> 51 y 49,48 -> 49
+    
+    def test_liquidar_lote_igual_a_nomina_individual(self):
+        """Prueba que la liquidación por columnas coincide con construir cada Nomina"""
+        evaluador = sistema_rrhh.evaluador_reglas("2024-01")
+        assert evaluador.tramo_uniforme is not None
+        empleados = [Empleado(str(i), "Ana", "Ruiz", "Dev", salario, "indefinido")
+                     for i, salario in enumerate([1234567.89, 1000000, 12.63, 3000000.5])]
+        horas = {"0": 3, "2": 0}
+        bonificaciones = {"0": 0.1, "1": 12345.67, "3": 0.0}
+        deducciones = {"1": 999.99, "3": 0.005}
+        
+        lote = Nomina.liquidar_lote(empleados, "2024-01", evaluador, horas, bonificaciones,
+                                    deducciones, "2024-01-31T00:00:00")
+        for empleado, nomina in zip(empleados, lote):
+            individual = Nomina(empleado, "2024-01", evaluador, "2024-01-31T00:00:00")
+            if empleado.cedula in horas:
+                individual.agregar_horas_extra(horas[empleado.cedula])
+            if empleado.cedula in bonificaciones:
+                individual.agregar_bonificacion(bonificaciones[empleado.cedula])
+            if empleado.cedula in deducciones:
+                individual.agregar_deduccion(deducciones[empleado.cedula])
+            assert nomina.to_dict() == individual.to_dict()
+            nomina.agregar_horas_extra(4)
+            individual.agregar_horas_extra(4)
+            assert nomina.to_dict() == individual.to_dict()
+    
+    def test_fecha_calculo_con_formato_iso(self):
+        """Prueba que la fecha de cálculo tiene el formato de datetime.isoformat"""
+        antes = datetime.now()
+        fecha = sistema_rrhh.fecha_calculo_actual()
+        assert antes <= datetime.fromisoformat(fecha) <= datetime.now()
+        assert len(fecha) in (19, 26)
+        with patch("sistema_rrhh.time.time_ns", return_value=1_700_000_000_000_000_000):
+            assert sistema_rrhh.fecha_calculo_actual() == datetime.fromtimestamp(1_700_000_000).isoformat()
+        with patch("sistema_rrhh.time.time_ns", return_value=1_700_000_000_000_042_000):
+            assert sistema_rrhh.fecha_calculo_actual() == datetime.fromtimestamp(1_700_000_000.000042).isoformat()
+
+
+class TestReglasNomina:
+    """Pruebas para las reglas de nómina configurables"""
+    
+    @pytest.fixture(autouse=True)
+    def restaurar_reglas(self):
+        """Restaura las reglas predeterminadas después de cada prueba"""
+        yield
+        configurar_reglas_nomina(REGLAS_NOMINA_PREDETERMINADAS)
+    
+    def test_reglas_por_banda_contrato_y_vigencia(self):
+        """Prueba topes, bandas salariales, tipos de contrato y vigencias"""
+        assert configurar_reglas_nomina(REGLAS_NOMINA_PREDETERMINADAS + [
+            {"nombre": "auxilio_transporte", "concepto": "devengado", "valor": 162000,
+             "salario_hasta": 2600000},
+            {"nombre": "solidaridad", "concepto": "deduccion", "porcentaje_pb": 100,
+             "salario_desde": 5200000, "tope": 60000},
+            {"nombre": "arl", "concepto": "deduccion", "valor": 10000,
+             "tipos_contrato": ["temporal"], "vigente_desde": "2024-06"},
+        ])
+        
+        bajo = Nomina(Empleado("1", "Ana", "Ruiz", "Aux", 1300000, "temporal"), "2024-01")
+        assert bajo.otros_devengados == {"auxilio_transporte": 162000}
+        assert bajo.otras_deducciones == {}
+        assert bajo.total_devengado == 1462000
+        assert "Auxilio transporte: $162,000.00" in bajo.generar_reporte()
+        
+        alto = Nomina(Empleado("2", "Luis", "Mora", "Dir", 9000000, "temporal"), "2024-07")
+        assert alto.otros_devengados == {}
+        assert alto.otras_deducciones == {"solidaridad": 60000, "arl": 10000}
+        assert alto.total_deducciones == 360000 + 360000 + 60000 + 10000
+        
+        fijo = Nomina(Empleado("3", "Eva", "Gil", "Dir", 5200000, "indefinido"), "2024-07")
+        assert fijo.otras_deducciones == {"solidaridad": 52000}
+        assert fijo.to_dict()["reglas"] != bajo.to_dict()["reglas"]
+    
+    def test_reglas_invalidas_se_rechazan(self):
+        """Prueba que una regla mal declarada no reemplaza las vigentes"""
+        assert not configurar_reglas_nomina([{"nombre": "x", "concepto": "deduccion"}])
+        assert not configurar_reglas_nomina([{"nombre": "x", "concepto": "deduccion",
+                                              "valor": 1, "vigente_desde": "2024-13"}])
+        nomina = Nomina(Empleado("1", "Ana", "Ruiz", "Aux", 1000000, "indefinido"), "2024-01")
+        assert nomina.deduccion_salud == 40000
+    
+    def test_cambio_de_reglas_recalcula_incremental(self, tmp_path):
+        """Prueba que la nómina incremental se recalcula al cambiar las reglas"""
+        sistema = SistemaRRHH(str(tmp_path / "empleados.json"))
+        sistema.agregar_empleado("1", "Ana", "Ruiz", "Aux", 1000000, "indefinido")
+        sistema.procesar_nomina_completa("2024-01")
+        assert sistema.procesar_nomina_incremental("2024-01")["reutilizadas"] == 1
+        
+        reglas = [dict(regla) for regla in REGLAS_NOMINA_PREDETERMINADAS]
+        reglas[0]["porcentaje_pb"] = 450
+        assert configurar_reglas_nomina(reglas)
+        resultado = sistema.procesar_nomina_incremental("2024-01")
+        assert resultado["recalculadas"] == 1
+        assert sistema.obtener_empleado("1").nomina_periodo("2024-01")["deduccion_salud"] == 45000
+    
+    def test_nomina_completa_por_columnas_y_por_empleado(self, tmp_path):
+        """Prueba que la nómina completa da lo mismo por columnas y empleado por empleado"""
+        sistema = SistemaRRHH(str(tmp_path / "empleados.json"))
+        sistema.agregar_empleado("1", "Ana", "Ruiz", "Aux", 1234567.89, "indefinido")
+        sistema.agregar_empleado("2", "Luis", "Mora", "Dir", 5200000, "temporal")
+        novedades = ({"1": 2}, {"2": 100000.5}, {"1": 0.01})
+        
+        por_columnas = sistema.procesar_nomina_completa("2024-01", *novedades)
+        assert sistema_rrhh.evaluador_reglas("2024-01").tramo_uniforme is not None
+        assert len({nomina.fecha_calculo for nomina in por_columnas}) == 1
+        
+        # Una regla que no es de ley obliga a liquidar empleado por empleado
+        assert configurar_reglas_nomina(REGLAS_NOMINA_PREDETERMINADAS + [
+            {"nombre": "caja", "concepto": "deduccion", "valor": 0, "tipos_contrato": ["temporal"]},
+        ])
+        assert sistema_rrhh.evaluador_reglas("2024-01").tramo_uniforme is None
+        por_empleado = sistema.procesar_nomina_completa("2024-01", *novedades)
+        for columnas, individual in zip(por_columnas, por_empleado):
+            datos_columnas = columnas.to_dict()
+            datos_individual = individual.to_dict()
+            for datos in (datos_columnas, datos_individual):
+                del datos["fecha_calculo"], datos["reglas"]
+                datos.pop("otras_deducciones", None)
+            assert datos_columnas == datos_individual
+        assert por_columnas[0].salario_neto == 1234567.89 + 40000 - 98765.44 - 0.01
+    
+    def test_cambio_de_contrato_recalcula_incremental(self, tmp_path):
+        """Prueba que la nómina incremental se recalcula al cambiar el tipo de contrato"""
+        assert configurar_reglas_nomina(REGLAS_NOMINA_PREDETERMINADAS + [
+            {"nombre": "retencion", "concepto": "deduccion", "porcentaje_pb": 1000,
+             "tipos_contrato": ["prestacion_servicios"]},
+        ])
+        sistema = SistemaRRHH(str(tmp_path / "empleados.json"))
+        sistema.agregar_empleado("1", "Ana", "Ruiz", "Aux", 1000000, "indefinido")
+        sistema.procesar_nomina_incremental("2024-01")
+        sistema.actualizar_empleado("1", tipo_contrato="prestacion_servicios")
+        
+        resultado = sistema.procesar_nomina_incremental("2024-01")
+        assert resultado["recalculadas"] == 1
+        nomina_data = sistema.obtener_empleado("1").nomina_periodo("2024-01")
+        assert nomina_data["otras_deducciones"] == {"retencion": 100000}
+        assert sistema.procesar_nomina_incremental("2024-01")["reutilizadas"] == 1
+    
+    def test_etiquetas_de_tasas_y_contrato_sin_mayusculas(self):
+        """Prueba que el comprobante muestra las tasas vigentes y que el contrato ignora mayúsculas"""
+        reglas = [dict(regla) for regla in REGLAS_NOMINA_PREDETERMINADAS]
+        reglas[0]["porcentaje_pb"] = 500
+        reglas[1]["porcentaje_pb"] = 425
+        assert configurar_reglas_nomina(reglas + [
+            {"nombre": "arl", "concepto": "deduccion", "valor": 10000, "tipos_contrato": ["Termino_Fijo"]},
+            {"nombre": "caja", "concepto": "deduccion", "valor": 5000, "tipos_contrato": ["indefinido"]},
+        ])
+        
+        nomina = Nomina(Empleado("1", "Ana", "Ruiz", "Aux", 1000000, "Indefinido"), "2024-01")
+        reporte = nomina.generar_reporte()
+        assert "Salud (5%): $50,000.00" in reporte
+        assert "Pensión (4.25%): $42,500.00" in reporte
+        assert nomina.otras_deducciones == {"caja": 5000}
+        
+        fijo = Nomina(Empleado("2", "Luis", "Mora", "Aux", 1000000, "termino_fijo"), "2024-01")
+        assert fijo.otras_deducciones == {"arl": 10000}
+        
+        # Una nómina registrada sin tasas no muestra un porcentaje que podría ser falso
+        registro = dict(nomina.to_dict())
+        del registro["tasas_pb"]
+        assert "Salud: $50,000.00" in sistema_rrhh.renderizar_comprobante(registro, "Aux")
 
 
 class TestSistemaRRHH:
@@ -403,6 +671,156 @@ class TestSistemaRRHH:
         empleado1 = sistema_test.obtener_empleado("12345")
         assert len(empleado1.historial_nominas) == 1
     
+    def test_procesar_nomina_incremental_reutiliza_sin_cambios(self, sistema_test):
+        """Prueba que el reproceso incremental solo recalcula empleados con cambios"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.agregar_empleado("11111", "Pedro", "López", "PM", 4000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01", {"12345": 5}, {"67890": 100000})
+        
+        resultado = sistema_test.procesar_nomina_incremental(
+            "2024-01", {"12345": 8}, {"67890": 100000}, {"11111": 50000})
+        
+        assert resultado["recalculadas"] == 2
+        assert resultado["reutilizadas"] == 1
+        empleado = sistema_test.obtener_empleado("12345")
+        assert len(empleado.historial_nominas) == 1
+        assert empleado.nomina_periodo("2024-01")["horas_extra"] == 8
+        assert sistema_test.obtener_empleado("11111").nomina_periodo("2024-01")["deducciones_adicionales"] == 50000
+    
+    def test_procesar_nomina_incremental_periodo_nuevo(self, sistema_test):
+        """Prueba que un período sin nóminas previas se calcula completo"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        
+        resultado = sistema_test.procesar_nomina_incremental("2024-02")
+        repetido = sistema_test.procesar_nomina_incremental("2024-02")
+        
+        assert resultado["recalculadas"] == 1
+        assert repetido["recalculadas"] == 0
+        assert repetido["reutilizadas"] == 1
+    
+    def test_procesar_nomina_incremental_corrige_nombre(self, sistema_test):
+        """Prueba que una corrección del nombre se refleja en la nómina reprocesada"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.actualizar_empleado("12345", nombre="Juan Carlos")
+        
+        resultado = sistema_test.procesar_nomina_incremental("2024-01")
+        
+        assert resultado["recalculadas"] == 1
+        nomina_data = sistema_test.obtener_empleado("12345").nomina_periodo("2024-01")
+        assert nomina_data["empleado_nombre"] == "Juan Carlos Pérez"
+    
+    def test_procesar_nomina_por_lotes(self, sistema_test):
+        """Prueba nómina por lotes: guarda los datos y elimina el punto de control"""
+        for i in range(5):
+            sistema_test.agregar_empleado(f"{i:05d}", f"Nombre{i}", "Apellido", "Dev", 3000000, "indefinido")
+        
+        resultado = sistema_test.procesar_nomina_por_lotes("2024-01", tamano_lote=2)
+        
+        assert resultado["procesadas"] == 5
+        assert resultado["lotes"] == 3
+        assert not os.path.exists(sistema_test._ruta_punto_control("2024-01"))
+        assert len(SistemaRRHH(sistema_test.archivo_datos).obtener_empleado("00004").historial_nominas) == 1
+    
+    def test_procesar_nomina_por_lotes_reanuda_sin_duplicar(self, sistema_test):
+        """Prueba que una corrida interrumpida se reanuda desde el último lote confirmado"""
+        for i in range(5):
+            sistema_test.agregar_empleado(f"{i:05d}", f"Nombre{i}", "Apellido", "Dev", 3000000, "indefinido")
+        construir_original = sistema_test._construir_nomina
+        llamadas = []
+        
+        def construir_con_fallo(*args):
+            llamadas.append(args)
+            if len(llamadas) == 4:
+                raise KeyboardInterrupt
+            return construir_original(*args)
+        
+        with patch.object(sistema_test, '_construir_nomina', side_effect=construir_con_fallo):
+            with pytest.raises(KeyboardInterrupt):
+                sistema_test.procesar_nomina_por_lotes("2024-01", tamano_lote=2)
+        
+        # Simular que el manejador de Ctrl-C guardó el estado parcial
+        sistema_test.guardar_datos()
+        with open(sistema_test._ruta_punto_control("2024-01"), 'a', encoding='utf-8') as archivo:
+            archivo.write('{"lote": 9, "registros": [')
+        reanudado = SistemaRRHH(sistema_test.archivo_datos)
+        resultado = reanudado.procesar_nomina_por_lotes("2024-01", tamano_lote=2)
+        
+        assert resultado["recuperadas"] == 2
+        assert resultado["procesadas"] == 3
+        for empleado in reanudado.empleados.values():
+            assert len(empleado.historial_nominas) == 1
+    
+    def test_aplicar_cambios_salariales_retroactivos(self, sistema_test):
+        """Prueba reliquidación retroactiva solo de los períodos afectados"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        for periodo in ["2024-01", "2024-02", "2024-03"]:
+            sistema_test.procesar_nomina_completa(periodo, {"12345": 2})
+        
+        reajustes = sistema_test.aplicar_cambios_salariales([
+            {"cedula": "12345", "salario_base": 3500000, "vigente_desde": "2024-02"}
+        ])
+        
+        assert [r["periodo"] for r in reajustes] == ["2024-02", "2024-03"]
+        assert reajustes[0]["diferencia_devengado"] == 500000
+        assert reajustes[0]["diferencia_neto"] == 500000 - 500000 * 0.08
+        empleado = sistema_test.obtener_empleado("12345")
+        assert empleado.nomina_periodo("2024-01")["salario_base"] == 3000000
+        assert empleado.nomina_periodo("2024-02")["salario_base"] == 3500000
+        assert empleado.nomina_periodo("2024-02")["horas_extra"] == 2
+        assert len(empleado.historial_reajustes) == 2
+        assert sistema_test.obtener_empleado("67890").historial_reajustes == []
+    
+    def test_actualizar_empleado_salario_con_vigencia(self, sistema_test):
+        """Prueba que actualizar con vigente_desde registra historial y reliquida"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-05")
+        
+        sistema_test.actualizar_empleado("12345", "2024-05", salario_base=3200000)
+        
+        empleado = sistema_test.obtener_empleado("12345")
+        assert empleado.salario_base == 3200000
+        assert empleado.nomina_periodo("2024-05")["salario_base"] == 3200000
+        assert len(empleado.historial_reajustes) == 1
+    
+    def test_actualizar_empleado_vigencia_invalida(self, sistema_test):
+        """Prueba que una fecha efectiva inválida rechaza la actualización"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        version = sistema_test.version_datos
+        
+        assert not sistema_test.actualizar_empleado("12345", "2024-13", salario_base=3200000)
+        assert sistema_test.obtener_empleado("12345").salario_base == 3000000
+        assert sistema_test.version_datos == version
+    
+    def test_reajuste_con_diferencias_exactas(self, sistema_test):
+        """Prueba que las diferencias del reajuste se calculan en centavos"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 1000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        
+        reajustes = sistema_test.aplicar_cambios_salariales([
+            {"cedula": "12345", "salario_base": 1234567.88, "vigente_desde": "2024-01"}
+        ])
+        
+        assert reajustes[0]["diferencia_devengado"] == 234567.88
+        assert reajustes[0]["diferencia_neto"] == 215802.44
+    
+    def test_analitica_valoraciones_por_cohorte(self, sistema_test):
+        """Prueba promedio por cargo y detección de caídas de valoración"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "Dev", 2500000, "indefinido")
+        sistema_test.obtener_empleado("12345").historial_valoraciones = [
+            {"fecha": "2024-02-01", "valoracion": 9}, {"fecha": "2024-05-01", "valoracion": 5}]
+        sistema_test.obtener_empleado("67890").historial_valoraciones = [
+            {"fecha": "2024-02-01", "valoracion": 7}, {"fecha": "2024-05-01", "valoracion": 8}]
+        
+        promedios = sistema_test.promedio_valoraciones_por_cargo("2024-04-01", "2024-07-01")
+        caidas = sistema_test.empleados_con_caida_valoracion(3, "2024-01-01", "2025-01-01")
+        
+        assert promedios == {"Dev": 6.5}
+        assert [e.cedula for e in caidas] == ["12345"]
+    
     def test_listar_empleados_solo_activos(self, sistema_test):
         """Prueba listar solo empleados activos"""
         sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
@@ -441,6 +859,434 @@ class TestSistemaRRHH:
         assert "12345" in nuevo_sistema.empleados
         assert nuevo_sistema.empleados["12345"].nombre == "Juan"
     
+    def test_historial_particionado_por_anio(self, sistema_test):
+        """Prueba que las nóminas antiguas se archivan por año y se abren bajo demanda"""
+        periodo_actual = datetime.now().strftime("%Y-%m")
+        sistema = SistemaRRHH(sistema_test.archivo_datos, particionar_historial=True)
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.procesar_nomina_completa("2020-01")
+        sistema.procesar_nomina_completa(periodo_actual)
+        sistema.guardar_datos()
+        ruta_2020 = sistema._ruta_particion("2020")
+        
+        try:
+            with open(sistema.archivo_datos, encoding='utf-8') as archivo:
+                principal = json.load(archivo)
+            assert [n["periodo"] for n in principal["empleados"][0]["historial_nominas"]] == [periodo_actual]
+            assert sistema.anios_archivados() == ["2020"]
+            
+            recargado = SistemaRRHH(sistema.archivo_datos, particionar_historial=True)
+            assert len(recargado.obtener_empleado("12345").historial_nominas) == 1
+            assert "Juan Pérez" in recargado.generar_reporte_nomina_periodo("2020-01")
+            assert len(recargado.obtener_historial_nominas("12345")) == 2
+            
+            # Guardar de nuevo no debe perder ni duplicar nóminas archivadas
+            recargado.guardar_datos()
+            otra_vez = SistemaRRHH(sistema.archivo_datos, particionar_historial=True)
+            assert len(otra_vez.obtener_historial_nominas("12345", "2020-01", "2020-12")) == 1
+        finally:
+            if os.path.exists(ruta_2020):
+                os.unlink(ruta_2020)
+    
+    def test_particion_sobrevive_escritura_fallida(self, tmp_path):
+        """Prueba que una falla al reescribir una partición no destruye la copia anterior"""
+        ruta = str(tmp_path / "empleados.json")
+        sistema = SistemaRRHH(ruta, particionar_historial=True)
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.procesar_nomina_completa("2020-01")
+        assert sistema.guardar_datos()
+        
+        dump_original = json.dump
+        def dump_interrumpido(data, archivo, **opciones):
+            if "anio" in data:
+                archivo.write('{"anio": "20')
+                raise OSError("disco lleno")
+            dump_original(data, archivo, **opciones)
+        
+        sistema.procesar_nomina_completa("2020-02")
+        with patch.object(sistema_rrhh.json, "dump", side_effect=dump_interrumpido):
+            assert not sistema.guardar_datos()
+        
+        recargado = SistemaRRHH(ruta, particionar_historial=True)
+        assert [n["periodo"] for n in recargado.obtener_historial_nominas("12345")] == ["2020-01"]
+    
+    def test_cargar_particion_no_es_un_cambio(self, tmp_path):
+        """Prueba que abrir un año archivado no deja cambios pendientes"""
+        ruta = str(tmp_path / "empleados.json")
+        sistema = SistemaRRHH(ruta, particionar_historial=True, fragmentos=2)
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.procesar_nomina_completa("2019-01")
+        assert sistema.guardar_datos()
+        
+        recargado = SistemaRRHH(ruta, particionar_historial=True)
+        assert "Juan Pérez" in recargado.generar_reporte_nomina_periodo("2019-01")
+        assert not recargado.tiene_cambios_pendientes()
+        assert recargado._fragmentos_sucios == set()
+    
+    def test_instantanea_no_ve_particiones_posteriores(self, tmp_path):
+        """Prueba que la instantánea ve los años archivados como estaban al tomarla"""
+        ruta = str(tmp_path / "empleados.json")
+        sistema = SistemaRRHH(ruta, particionar_historial=True)
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.procesar_nomina_completa("2018-01")
+        assert sistema.guardar_datos()
+        
+        recargado = SistemaRRHH(ruta, particionar_historial=True)
+        vista = recargado.instantanea()
+        recargado.procesar_nomina_completa("2018-07")
+        recargado.procesar_nomina_completa("2017-03")
+        assert recargado.guardar_datos()
+        
+        assert "Empleados procesados: 0" in vista.generar_reporte_nomina_periodo("2018-07")
+        assert "Empleados procesados: 0" in vista.generar_reporte_nomina_periodo("2017-03")
+        assert "Empleados procesados: 1" in vista.generar_reporte_nomina_periodo("2018-01")
+        assert "Empleados procesados: 1" in recargado.generar_reporte_nomina_periodo("2018-07")
+    
+    def test_filtrar_y_contar_por_categoria(self, sistema_test):
+        """Prueba filtros y agrupaciones por campos categóricos"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.agregar_empleado("11111", "Pedro", "López", "Dev", 4000000, "termino_fijo")
+        
+        assert {e.cedula for e in sistema_test.filtrar_por_categoria("cargo", "Dev")} == {"12345", "11111"}
+        assert sistema_test.filtrar_por_categoria("cargo", "Inexistente") == []
+        assert sistema_test.contar_por_categoria("tipo_contrato") == {"indefinido": 2, "termino_fijo": 1}
+    
+    def test_snapshot_compacto(self, sistema_test):
+        """Prueba guardar y cargar una instantánea compacta con códigos"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        ruta = sistema_test.archivo_datos + ".compacto"
+        
+        try:
+            assert sistema_test.guardar_snapshot_compacto(ruta)
+            with open(ruta, encoding='utf-8') as archivo:
+                data = json.load(archivo)
+            posicion = data["campos"].index("cargo")
+            assert [fila[posicion] for fila in data["empleados"]] == [0, 1]
+            
+            nuevo = SistemaRRHH(sistema_test.archivo_datos)
+            assert nuevo.cargar_snapshot_compacto(ruta)
+            assert nuevo.obtener_empleado("67890").cargo == "QA"
+            assert nuevo.obtener_empleado("12345").to_dict() == sistema_test.obtener_empleado("12345").to_dict()
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_almacenamiento_fragmentado(self, tmp_path, monkeypatch):
+        """Prueba guardar y cargar empleados repartidos en fragmentos por cédula"""
+        ruta = str(tmp_path / "empleados.json")
+        sistema = SistemaRRHH(ruta, fragmentos=4)
+        for i in range(20):
+            sistema.agregar_empleado(str(1000 + i), "Emp", str(i), "Dev", 1000000 + i, "indefinido")
+        assert sistema.guardar_datos()
+        
+        with open(ruta, encoding='utf-8') as archivo:
+            indice = json.load(archivo)
+        assert indice["sistema_info"]["fragmentos"] == 4
+        assert indice["empleados"] == []
+        cedula = "1007"
+        ruta_fragmento = str(tmp_path / f"empleados.fragmento-{fragmento_de(cedula, 4):03d}.json")
+        with open(ruta_fragmento, encoding='utf-8') as archivo:
+            assert cedula in {e["cedula"] for e in json.load(archivo)["empleados"]}
+        
+        # Solo el fragmento modificado se reescribe
+        recargado = SistemaRRHH(ruta)
+        assert recargado.fragmentos == 4
+        assert len(recargado.listar_empleados()) == 20
+        assert recargado.actualizar_valoracion(cedula, 9)
+        escritos = []
+        original = SistemaRRHH._escribir_atomico
+        monkeypatch.setattr(SistemaRRHH, "_escribir_atomico", staticmethod(
+            lambda ruta, data, indent=None: (escritos.append(ruta), original(ruta, data, indent))))
+        assert recargado.guardar_datos()
+        assert escritos == [ruta_fragmento, ruta]
+        assert SistemaRRHH(ruta).obtener_empleado(cedula).valoracion == 9
+    
+    def test_cambio_cantidad_fragmentos(self, tmp_path):
+        """Prueba pasar de un archivo único a fragmentos y reducir la cantidad"""
+        ruta = str(tmp_path / "empleados.json")
+        sistema = SistemaRRHH(ruta)
+        for i in range(10):
+            sistema.agregar_empleado(str(500 + i), "Emp", str(i), "QA", 2000000, "indefinido")
+        sistema.guardar_datos()
+        
+        assert SistemaRRHH(ruta, fragmentos=8).guardar_datos()
+        assert SistemaRRHH(ruta, fragmentos=2).guardar_datos()
+        assert sorted(os.listdir(tmp_path)) == ["empleados.fragmento-000.json",
+                                                "empleados.fragmento-001.json", "empleados.json"]
+        assert len(SistemaRRHH(ruta).listar_empleados()) == 10
+    
+    def test_vista_columnar_incremental(self, sistema_test):
+        """Prueba la vista columnar y su actualización después de cambios"""
+        np = pytest.importorskip("numpy")
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        
+        vista = sistema_test.vista_columnar()
+        assert list(vista["cedula"]) == ["12345", "67890"]
+        assert list(vista["salario_base"]) == [3000000, 2500000]
+        assert vista["cargos"][vista["codigo_cargo"][1]] == "QA"
+        assert list(vista["nomina_periodo"]) == [202401, 202401]
+        assert vista["nomina_neto"][0] == 276000000  # centavos
+        
+        sistema_test.procesar_nomina_completa("2024-02")
+        sistema_test.eliminar_empleado("12345")
+        sistema_test.actualizar_valoracion("67890", 9)
+        vista = sistema_test.vista_columnar()
+        assert list(vista["activo"]) == [False, True]
+        assert list(vista["valoracion"]) == [5, 9]
+        assert sorted(zip(vista["nomina_empleado"], vista["nomina_periodo"])) == [
+            (0, 202401), (0, 202402), (1, 202401), (1, 202402)]
+        
+        ruta = sistema_test.archivo_datos + ".npz"
+        try:
+            assert sistema_test.exportar_npz(ruta)
+            with np.load(ruta) as datos:
+                assert list(datos["valoracion"]) == [5, 9]
+                assert datos["nomina_devengado"].sum() == vista["nomina_devengado"].sum()
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_verificar_integridad(self, sistema_test):
+        """Prueba la detección de duplicados, nóminas tardías, deducciones y períodos"""
+        sistema_test.agregar_empleado("1", "Ana", "Ruiz", "Dev", 3000000, "indefinido",
+                                      "300 123 4567", "ana@empresa.com")
+        sistema_test.agregar_empleado("2", "Luis", "Mora", "QA", 2000000, "indefinido",
+                                      "3001234567", "ANA@empresa.com ")
+        sistema_test.agregar_empleado("3", "Eva", "Gil", "PM", 4000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.eliminar_empleado("3")
+        empleado = sistema_test.obtener_empleado("3")
+        empleado.fecha_desactivacion = "2023-12-15T10:00:00"
+        empleado.historial_nominas[0]["deduccion_salud"] = 1
+        sistema_test.obtener_empleado("1").historial_nominas.append({"periodo": "2024-13"})
+        sistema_test.aplicar_cambios_salariales([{"cedula": "2", "salario_base": 2100000,
+                                                  "vigente_desde": "2024-02"}])
+        
+        hallazgos = list(sistema_test.verificar_integridad())
+        assert sorted((h["tipo"], h["cedula"]) for h in hallazgos) == [
+            ("deduccion_inconsistente", "3"), ("email_duplicado", "2"),
+            ("nomina_posterior_desactivacion", "3"), ("periodo_invalido", "1"),
+            ("telefono_duplicado", "2")]
+        
+        # La misma verificación sobre el archivo, leído por bloques pequeños
+        sistema_test.guardar_datos()
+        with patch.object(sistema_rrhh.LectorJSONIncremental.__init__, "__defaults__", (16,)):
+            en_archivo = list(verificar_integridad_archivo(sistema_test.archivo_datos))
+        assert en_archivo == hallazgos
+    
+    def test_lector_incremental_valor_grande(self):
+        """Prueba que un valor de muchos bloques se lee con pocas lecturas"""
+        empleado = {"cedula": "1", "historial_nominas": [{"periodo": "2024-01", "neto": i}
+                                                        for i in range(5000)]}
+        archivo = io.StringIO(json.dumps({"empleados": [empleado, {"cedula": "2"}]}))
+        lecturas = []
+        leer = archivo.read
+        archivo.read = lambda tamano: lecturas.append(tamano) or leer(tamano)
+        lector = sistema_rrhh.LectorJSONIncremental(archivo, tamano_bloque=16)
+        
+        for clave in lector.miembros():
+            assert list(lector.elementos()) == [empleado, {"cedula": "2"}]
+        assert len(lecturas) < 25
+    
+    def test_instantanea_aislada_de_escrituras(self, sistema_test):
+        """Prueba que una instantánea no ve los cambios posteriores del sistema"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        
+        vista = sistema_test.instantanea()
+        assert vista.obtener_empleado("67890") is sistema_test.obtener_empleado("67890")
+        
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.actualizar_empleado("12345", nombre="Juan Carlos")
+        sistema_test.agregar_empleado("11111", "Pedro", "López", "PM", 4000000, "indefinido")
+        
+        assert "Empleados procesados: 0" in vista.generar_reporte_nomina_periodo("2024-01")
+        assert "Empleados procesados: 2" in sistema_test.generar_reporte_nomina_periodo("2024-01")
+        assert vista.obtener_empleado("12345").nombre == "Juan"
+        assert vista.obtener_empleado("12345").historial_nominas == []
+        assert vista.obtener_empleado("11111") is None
+        assert len(vista.listar_empleados()) == 2
+        assert sistema_test.obtener_empleado("12345").nombre == "Juan Carlos"
+        assert len(sistema_test.obtener_empleado("67890").historial_nominas) == 1
+    
+    def test_instantanea_solo_lectura(self, sistema_test):
+        """Prueba que la instantánea rechaza modificaciones"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        vista = sistema_test.instantanea()
+        
+        with pytest.raises(RuntimeError):
+            vista.eliminar_empleado("12345")
+        with pytest.raises(RuntimeError):
+            vista.guardar_datos()
+        
+        assert vista.obtener_empleado("12345").activo
+    
+    def test_instantanea_tiene_todo_el_estado(self, sistema_test):
+        """Prueba que la instantánea inicializa los mismos atributos que el sistema"""
+        vista = sistema_test.instantanea()
+        
+        assert set(vars(sistema_test)) <= set(vars(vista))
+    
+    @pytest.mark.parametrize("extension,firma", [(".gz", b"\x1f\x8b"), (".xz", b"\xfd7zXZ"), (".bz2", b"BZh")])
+    def test_guardar_y_cargar_comprimido(self, sistema_test, extension, firma):
+        """Prueba guardar y cargar el archivo de datos comprimido"""
+        ruta = sistema_test.archivo_datos + extension
+        sistema = SistemaRRHH(ruta)
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.procesar_nomina_completa("2024-01")
+        
+        try:
+            assert sistema.guardar_datos()
+            with open(ruta, 'rb') as archivo:
+                assert archivo.read(len(firma)) == firma
+            recargado = SistemaRRHH(ruta)
+            assert recargado.obtener_empleado("12345").to_dict() == sistema.obtener_empleado("12345").to_dict()
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_cargar_comprimido_detecta_firma(self, sistema_test):
+        """Prueba que la compresión se detecta por contenido aunque la extensión sea .json"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.guardar_datos()
+        with open(sistema_test.archivo_datos, 'rb') as origen:
+            contenido = origen.read()
+        with gzip.open(sistema_test.archivo_datos, 'wb') as destino:
+            destino.write(contenido)
+        
+        recargado = SistemaRRHH(sistema_test.archivo_datos)
+        
+        assert recargado.obtener_empleado("12345").nombre == "Juan"
+    
+    @pytest.mark.parametrize("formato,usar_procesos", [("archivos", False), ("concatenado", False),
+                                                        ("zip", True)])
+    def test_generar_comprobantes_masivos(self, sistema_test, formato, usar_procesos):
+        """Prueba la generación masiva de comprobantes de un período"""
+        for i in range(7):
+            sistema_test.agregar_empleado(f"{i:05d}", f"Nombre{i}", "Apellido", "Dev", 3000000 + i, "indefinido")
+        nominas = sistema_test.procesar_nomina_completa("2024-01", {"00003": 4})
+        esperado = {n.empleado.cedula: n.generar_reporte() for n in nominas}
+        destino = sistema_test.archivo_datos + ".comprobantes"
+        
+        try:
+            resultado = sistema_test.generar_comprobantes("2024-01", destino, formato, trabajadores=2,
+                                                          usar_procesos=usar_procesos, tamano_bloque=3)
+            
+            assert resultado["comprobantes"] == 7
+            assert resultado["paginas_por_segundo"] > 0
+            if formato == "archivos":
+                with open(os.path.join(destino, "comprobante_2024-01_00003.txt"), encoding='utf-8') as archivo:
+                    assert archivo.read() == esperado["00003"]
+            elif formato == "zip":
+                with zipfile.ZipFile(destino) as archivo_zip:
+                    assert len(archivo_zip.namelist()) == 7
+                    assert archivo_zip.read("comprobante_2024-01_00003.txt").decode('utf-8') == esperado["00003"]
+            else:
+                with open(destino, encoding='utf-8') as archivo:
+                    assert archivo.read() == "".join(esperado.values())
+        finally:
+            if os.path.isdir(destino):
+                shutil.rmtree(destino)
+            elif os.path.exists(destino):
+                os.unlink(destino)
+    
+    @pytest.mark.parametrize("formato", ["csv", "ancho_fijo"])
+    def test_exportar_archivo_pagos(self, sistema_test, formato):
+        """Prueba el archivo de pagos al banco con totales de control"""
+        sistema_test.agregar_empleado("12345", "José", "Núñez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000.55, "indefinido")
+        sistema_test.agregar_empleado("11111", "Pedro", "López", "PM", 4000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.procesar_nomina_completa("2024-02", bonificaciones={"12345": 100000})
+        ruta = sistema_test.archivo_datos + ".pagos"
+        
+        try:
+            resultado = sistema_test.exportar_archivo_pagos("2024-02", ruta, formato)
+            with open(ruta, encoding='utf-8') as archivo:
+                lineas = archivo.read().splitlines()
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+        
+        assert resultado["registros"] == 3
+        assert resultado["total_centavos"] == 2860000_00 + 2300000_51 + 3680000_00
+        if formato == "csv":
+            assert lineas[0] == "cedula,nombre,periodo,valor"
+            assert lineas[1] == "12345,José Núñez,2024-02,2860000.00"
+            assert lineas[2].endswith(",2300000.51")
+        else:
+            assert lineas[0].startswith("1202402")
+            assert lineas[1] == "2" + "12345".rjust(15) + "JOSE NUNEZ".ljust(40) + "000000286000000"
+            assert len({len(linea) for linea in lineas[1:-1]}) == 1
+            assert lineas[-1] == "3" + "0000000003" + str(resultado["total_centavos"]).zfill(18)
+    
+    @pytest.mark.parametrize("formato", ["csv", "ancho_fijo"])
+    def test_archivo_pagos_neto_negativo_y_cedula_larga(self, sistema_test, formato):
+        """Prueba el signo de los netos negativos y los pagos que no caben en ancho fijo"""
+        sistema_test.agregar_empleado("12345", "José", "Núñez", "Dev", 1000000, "indefinido")
+        sistema_test.agregar_empleado("1234567890123456", "Ana", "Ruiz", "QA", 2000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01", deducciones={"12345": 1200001.5})
+        ruta = sistema_test.archivo_datos + ".pagos"
+        
+        try:
+            resultado = sistema_test.exportar_archivo_pagos("2024-01", ruta, formato)
+            with open(ruta, encoding='utf-8') as archivo:
+                lineas = archivo.read().splitlines()
+        finally:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+        
+        if formato == "csv":
+            assert lineas[1] == "12345,José Núñez,2024-01,-280001.50"
+            assert resultado["registros"] == 3
+            assert resultado["rechazados"] == []
+        else:
+            assert resultado["rechazados"] == ["12345", "1234567890123456"]
+            assert resultado["registros"] == 1
+            assert resultado["total_centavos"] == 2300000_00
+            assert [linea[0] for linea in lineas] == ["1", "2", "3"]
+            assert len(lineas[1]) == 1 + 15 + 40 + 15
+            assert lineas[-1] == "3" + "0000000001" + "230000000".zfill(18)
+    
+    def test_variacion_nomina_entre_periodos(self, sistema_test):
+        """Prueba ingresos, retiros y variaciones entre dos períodos"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema_test.agregar_empleado("67890", "María", "García", "QA", 2500000, "indefinido")
+        sistema_test.agregar_empleado("11111", "Pedro", "López", "PM", 4000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.eliminar_empleado("67890")
+        sistema_test.agregar_empleado("22222", "Ana", "Ruiz", "Dev", 2000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-02", bonificaciones={"12345": 600000, "11111": 100000})
+        
+        filas = list(sistema_test.iterar_variacion_nomina("2024-01", "2024-02", umbral_porcentaje=10))
+        
+        por_tipo = {fila["tipo"]: fila for fila in filas}
+        assert [fila["tipo"] for fila in filas] == ["variacion", "ingreso", "retiro", "resumen"]
+        assert por_tipo["variacion"]["cedula"] == "12345"
+        assert por_tipo["variacion"]["diferencia"] == 600000
+        assert por_tipo["ingreso"]["cedula"] == "22222"
+        assert por_tipo["retiro"]["cedula"] == "67890"
+        resumen = por_tipo["resumen"]
+        assert resumen["empleados_anterior"] == 3 and resumen["empleados_actual"] == 3
+        assert resumen["total_anterior"] == (3000000 + 2500000 + 4000000) * 0.92
+        assert resumen["diferencia_total"] == 600000 + 100000 + 2000000 * 0.92 - 2500000 * 0.92
+    
+    def test_variacion_nomina_diferencia_total_exacta(self, sistema_test):
+        """Prueba que la diferencia total se calcula en centavos"""
+        sistema_test.agregar_empleado("12345", "Juan", "Pérez", "Dev", 1000000, "indefinido")
+        sistema_test.procesar_nomina_completa("2024-01")
+        sistema_test.procesar_nomina_completa("2024-02", bonificaciones={"12345": 0.11})
+        
+        resumen = list(sistema_test.iterar_variacion_nomina("2024-01", "2024-02"))[-1]
+        assert resumen["total_anterior"] == 920000
+        assert resumen["diferencia_total"] == 0.11
+    
     @patch('builtins.open', side_effect=IOError("Error de archivo"))
     def test_error_al_guardar_datos(self, mock_file, sistema_test):
         """Prueba manejo de error al guardar datos"""
@@ -463,6 +1309,450 @@ class TestSistemaRRHH:
         assert "TOTALES" in reporte
 
 
+class TestFlujoCambios:
+    """Pruebas del flujo de eventos de cambio"""
+    
+    @pytest.fixture
+    def archivo_temp(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
+            archivo = f.name
+        yield archivo
+        for ruta in [archivo, archivo + ".secuencia", archivo + ".eventos",
+                     archivo + ".eventos.1", archivo + ".eventos.2"]:
+            if os.path.exists(ruta):
+                os.unlink(ruta)
+    
+    def test_eventos_en_orden_con_diferencias(self, archivo_temp):
+        """Prueba que cada modificación publica un evento numerado"""
+        sistema = SistemaRRHH(archivo_temp)
+        sumidero = SumideroCola()
+        sistema.suscribir(sumidero)
+        
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.actualizar_empleado("12345", cargo="Líder", telefono="555")
+        sistema.actualizar_valoracion("12345", 9)
+        sistema.procesar_nomina_completa("2024-01")
+        sistema.eliminar_empleado("12345")
+        
+        eventos = [sumidero.cola.get_nowait() for _ in range(sumidero.cola.qsize())]
+        assert [e["secuencia"] for e in eventos] == [1, 2, 3, 4, 5]
+        assert [e["tipo"] for e in eventos] == ["empleado_agregado", "empleado_actualizado",
+                                                "valoracion_actualizada", "nomina_registrada",
+                                                "empleado_desactivado"]
+        assert eventos[1]["datos"]["cambios"] == {"cargo": ["Dev", "Líder"], "telefono": ["", "555"]}
+        assert eventos[3]["datos"]["periodo"] == "2024-01"
+    
+    def test_sumidero_jsonl_rota_y_continua_secuencia(self, archivo_temp):
+        """Prueba la rotación del JSONL y la continuidad de la secuencia entre ejecuciones"""
+        ruta_eventos = archivo_temp + ".eventos"
+        sistema = SistemaRRHH(archivo_temp)
+        sumidero = SumideroJSONL(ruta_eventos, max_bytes=600, max_archivos=2)
+        sistema.suscribir(sumidero)
+        for i in range(6):
+            sistema.agregar_empleado(str(i), "Nombre", "Apellido", "Dev", 1000000, "indefinido")
+        sumidero.cerrar()
+        
+        assert os.path.exists(ruta_eventos + ".1")
+        os.unlink(archivo_temp + ".secuencia")
+        otro = SistemaRRHH(archivo_temp)
+        reabierto = SumideroJSONL(ruta_eventos, max_bytes=600, max_archivos=2)
+        otro.suscribir(reabierto)
+        otro.agregar_empleado("99", "Nombre", "Apellido", "Dev", 1000000, "indefinido")
+        reabierto.cerrar()
+        
+        secuencias = [e["secuencia"] for e in reabierto.leer_eventos(4)]
+        assert secuencias == sorted(secuencias)
+        assert secuencias[-1] == 7
+        assert all(s > 4 for s in secuencias)
+    
+    def test_secuencia_persistida_en_archivo_datos(self, archivo_temp):
+        """Prueba que la secuencia se guarda con los datos"""
+        sistema = SistemaRRHH(archivo_temp)
+        sistema.suscribir(SumideroCola())
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.guardar_datos()
+        
+        assert SistemaRRHH(archivo_temp).secuencia_cambios == 1
+    
+    def test_secuencia_no_se_repite_tras_caida(self, archivo_temp):
+        """Prueba que sin guardar los datos la secuencia continúa tras los eventos publicados"""
+        sistema = SistemaRRHH(archivo_temp)
+        sistema.suscribir(SumideroCola())
+        sistema.agregar_empleado("12345", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.guardar_datos()
+        sistema.actualizar_empleado("12345", telefono="555")
+        sistema.actualizar_valoracion("12345", 9)
+        
+        otro = SistemaRRHH(archivo_temp)
+        sumidero = SumideroCola()
+        otro.suscribir(sumidero)
+        otro.actualizar_valoracion("12345", 7)
+        
+        assert sumidero.cola.get_nowait()["secuencia"] > 3
+
+
+class TestModoLote:
+    """Pruebas del modo de comandos por lotes"""
+    
+    @pytest.fixture
+    def archivo_temp(self):
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
+            archivo = f.name
+        yield archivo
+        if os.path.exists(archivo):
+            os.unlink(archivo)
+    
+    def test_ejecutar_lote_guarda_una_vez(self, archivo_temp):
+        """Prueba que el lote aplica todos los comandos y guarda solo al final"""
+        sistema = SistemaRRHH(archivo_temp)
+        lineas = [
+            '{"accion": "agregar", "cedula": "1", "nombre": "Juan", "apellido": "Pérez", '
+            '"cargo": "Dev", "salario_base": 3000000, "tipo_contrato": "indefinido"}',
+            '{"accion": "actualizar", "cedula": "1", "telefono": "555"}',
+            '{"accion": "valorar", "cedula": "1", "valoracion": 9}',
+            '{"accion": "nomina", "periodo": "2024-01", "horas_extra": {"1": 4}}',
+            '{"accion": "desactivar", "cedula": "99"}',
+            'esto no es json',
+            '{"accion": "reporte", "periodo": "2024-01"}',
+        ]
+        
+        with patch.object(sistema, 'guardar_datos', wraps=sistema.guardar_datos) as guardar:
+            resumen = ejecutar_lote(sistema, lineas)
+        
+        assert resumen == {"exitosos": 5, "fallidos": 2}
+        assert guardar.call_count == 1
+        empleado = SistemaRRHH(archivo_temp).obtener_empleado("1")
+        assert empleado.telefono == "555"
+        assert empleado.valoracion == 9
+        assert empleado.historial_nominas[0]["horas_extra"] == 4
+    
+    def test_ejecutar_lote_guardado_por_intervalo(self, archivo_temp):
+        """Prueba el guardado cada N comandos"""
+        sistema = SistemaRRHH(archivo_temp)
+        lineas = [json.dumps({"accion": "agregar", "cedula": str(i), "nombre": "N", "apellido": "A",
+                              "cargo": "Dev", "salario_base": 1000000, "tipo_contrato": "indefinido"})
+                  for i in range(5)]
+        
+        with patch.object(sistema, 'guardar_datos') as guardar:
+            ejecutar_lote(sistema, lineas, guardar_cada=2)
+        
+        assert guardar.call_count == 3
+    
+    def test_ejecutar_lote_valida_campos_y_fallas(self, archivo_temp):
+        """Prueba que los campos inválidos y las fallas inesperadas son errores del comando"""
+        sistema = SistemaRRHH(archivo_temp)
+        sistema.agregar_empleado("1", "Juan", "Pérez", "Dev", 3000000, "indefinido")
+        sistema.guardar_datos()
+        lineas = [
+            '{"accion": "actualizar", "cedula": "1", "salario_base": "mucho"}',
+            '{"accion": "actualizar", "cedula": "1", "salario_base": "3500000"}',
+            '{"accion": "actualizar", "cedula": "1", "tipo_contrato": 3}',
+            '{"accion": "actualizar", "cedula": "1", "tipo_contrato": "temporal"}',
+            '{"accion": "agregar", "cedula": "2", "nombre": "Ana", "apellido": "Ruiz", '
+            '"cargo": "QA", "salario_base": 2000000, "tipo_contrato": 1}',
+            '{"accion": "valorar", "cedula": "1", "valoracion": 8}',
+        ]
+        
+        # Un comando que modifica la memoria y luego falla no aborta el lote ni pierde el cambio
+        original = sistema_rrhh.COMANDOS_LOTE["valorar"]
+        def valorar_y_fallar(sistema_lote, comando):
+            original(sistema_lote, comando)
+            raise AttributeError("falla inesperada")
+        
+        with patch.dict(sistema_rrhh.COMANDOS_LOTE, {"valorar": valorar_y_fallar}):
+            resumen = ejecutar_lote(sistema, lineas)
+        
+        assert resumen == {"exitosos": 1, "fallidos": 5}
+        empleado = SistemaRRHH(archivo_temp).obtener_empleado("1")
+        assert empleado.salario_base == 3500000.0
+        assert empleado.tipo_contrato == "indefinido"
+        assert empleado.valoracion == 8
+        assert Nomina(empleado, "2024-01").salario_neto == 3220000.0
+    
+    def test_main_modo_lote_desde_archivo(self, archivo_temp):
+        """Prueba la entrada por línea de comandos sin menú interactivo"""
+        ruta_comandos = archivo_temp + ".jsonl"
+        with open(ruta_comandos, 'w', encoding='utf-8') as archivo:
+            archivo.write('{"accion": "agregar", "cedula": "1", "nombre": "Ana", "apellido": "Ruiz", '
+                          '"cargo": "QA", "salario_base": 2000000, "tipo_contrato": "indefinido"}\n')
+        
+        try:
+            with patch('builtins.input', side_effect=AssertionError("no debe pedir datos")):
+                main(["--datos", archivo_temp, "--lote", ruta_comandos])
+            assert SistemaRRHH(archivo_temp).obtener_empleado("1").nombre == "Ana"
+        finally:
+            os.unlink(ruta_comandos)
+
+
+class TestListadosPaginados:
+    """Pruebas del cursor paginado de los listados del menú"""
+    
+    @pytest.fixture
+    def sistema(self, tmp_path):
+        sistema = SistemaRRHH(str(tmp_path / "empleados.json"))
+        for i in range(45):
+            sistema.agregar_empleado(str(100 + i), f"Nombre{i:02d}", f"Apellido{i:02d}", "Dev",
+                                     1000000 + i, "indefinido")
+        return sistema
+    
+    def test_cursor_pagina_y_cache(self, sistema):
+        """Prueba que solo se formatean las páginas pedidas y se reutilizan"""
+        formateadas = []
+        
+        def formatear(numero, empleado):
+            formateadas.append(numero)
+            return f"{numero} {empleado.cedula}"
+        
+        cursor = CursorResultados(sistema, sistema.iterar_empleados, formatear, tamano_pagina=20)
+        assert cursor.texto_pagina().splitlines()[0] == "1 100"
+        assert not cursor.completo
+        assert cursor.siguiente() and cursor.siguiente()
+        assert cursor.texto_pagina().splitlines() == ["41 140", "42 141", "43 142", "44 143", "45 144"]
+        assert not cursor.siguiente()
+        assert cursor.total_paginas() == 3
+        assert cursor.ir_a(0)
+        cursor.texto_pagina()
+        assert len(formateadas) == 25  # la página 2 nunca se mostró
+        
+        # Un cambio en los datos invalida las páginas en caché
+        sistema.eliminar_empleado("100")
+        assert cursor.texto_pagina().splitlines()[0] == "1 101"
+        assert cursor.total() == 44
+    
+    def test_menu_listar_navega_paginas(self, sistema, capsys):
+        """Prueba la navegación del listado de empleados en el menú"""
+        sistema.guardar_datos()
+        capsys.readouterr()
+        entradas = iter(["3", "n", "s", "3", "9", "", "0"])
+        with patch('builtins.input', side_effect=lambda *args: next(entradas)):
+            main(["--datos", sistema.archivo_datos])
+        
+        salida = capsys.readouterr().out
+        assert "-- Página 1 --" in salida
+        assert "-- Página 2 --" in salida
+        assert "-- Página 3 de 3 --" in salida
+        assert "Página no disponible." in salida
+        assert "Nombre44 Apellido44" in salida
+
+
+class TestConcurrencia:
+    """Pruebas del modo concurrente de SistemaRRHH"""
+    
+    def test_bloqueo_lectores_simultaneos_y_escritor_exclusivo(self):
+        """Prueba que varios lectores comparten el bloqueo y el escritor espera"""
+        bloqueo = BloqueoLecturaEscritura()
+        dentro = threading.Barrier(3, timeout=5)
+        eventos = []
+        
+        def lector():
+            with bloqueo.lectura():
+                dentro.wait()
+                eventos.append("lectura")
+        
+        lectores = [threading.Thread(target=lector) for _ in range(2)]
+        with bloqueo.lectura():
+            for hilo in lectores:
+                hilo.start()
+            dentro.wait()  # tres lectores dentro a la vez
+        for hilo in lectores:
+            hilo.join()
+        
+        with bloqueo.escritura():
+            with bloqueo.lectura():
+                with bloqueo.escritura():
+                    eventos.append("escritura")
+        with bloqueo.lectura():
+            with pytest.raises(RuntimeError):
+                bloqueo.adquirir_escritura()
+        
+        assert eventos == ["lectura", "lectura", "escritura"]
+    
+    def test_estres_lecturas_y_escrituras_concurrentes(self):
+        """Somete el sistema a lecturas, escrituras y guardados desde muchos hilos"""
+        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as f:
+            archivo_temp = f.name
+        
+        try:
+            sistema = SistemaRRHH(archivo_temp, concurrente=True)
+            errores = []
+            hilos_escritores = 4
+            por_hilo = 50
+            
+            def escritor(numero):
+                try:
+                    for i in range(por_hilo):
+                        cedula = f"{numero}-{i}"
+                        sistema.agregar_empleado(cedula, f"N{i}", f"A{numero}", "Dev", 1000000 + i, "indefinido")
+                        sistema.actualizar_empleado(cedula, telefono=str(i))
+                        sistema.actualizar_valoracion(cedula, 1 + i % 10)
+                        if i % 10 == 0:
+                            sistema.procesar_nomina_completa(f"2024-{numero + 1:02d}")
+                            sistema.guardar_datos()
+                except Exception as e:
+                    errores.append(e)
+            
+            def lector():
+                try:
+                    for _ in range(100):
+                        sistema.buscar_empleado("N1")
+                        sistema.listar_empleados(True)
+                        sistema.generar_reporte_nomina_periodo("2024-01")
+                        sistema.contar_por_categoria("cargo")
+                except Exception as e:
+                    errores.append(e)
+            
+            hilos = [threading.Thread(target=escritor, args=(n,)) for n in range(hilos_escritores)]
+            hilos += [threading.Thread(target=lector) for _ in range(4)]
+            with patch('builtins.print'):
+                for hilo in hilos:
+                    hilo.start()
+                for hilo in hilos:
+                    hilo.join()
+                assert sistema.guardar_datos()
+            
+            assert errores == []
+            assert len(sistema.empleados) == hilos_escritores * por_hilo
+            assert all(len(e.historial_valoraciones) == 2 for e in sistema.empleados.values())
+            with patch('builtins.print'):
+                recargado = SistemaRRHH(archivo_temp)
+            assert len(recargado.empleados) == hilos_escritores * por_hilo
+        finally:
+            if os.path.exists(archivo_temp):
+                os.unlink(archivo_temp)
+
+
+class TestRegistroEmpresas:
+    """Pruebas para el registro de empresas con memoria acotada"""
+    
+    def test_expulsion_lru_guarda_cambios(self, tmp_path):
+        """Prueba que la empresa menos usada se guarda y se expulsa"""
+        registro = RegistroEmpresas(str(tmp_path), max_empresas=2)
+        registro.obtener("acme").agregar_empleado("1", "Ana", "Ruiz", "Dev", 3000000, "indefinido")
+        registro.obtener("beta")
+        registro.obtener("acme")
+        
+        registro.obtener("gama")
+        assert registro.empresas_residentes() == ["acme", "gama"]
+        assert not os.path.exists(tmp_path / "beta.json")  # sin cambios no se escribe
+        
+        registro.obtener("delta")
+        assert registro.empresas_residentes() == ["gama", "delta"]
+        assert SistemaRRHH(str(tmp_path / "acme.json")).obtener_empleado("1").nombre == "Ana"
+        assert registro.obtener("acme").obtener_empleado("1").nombre == "Ana"
+    
+    def test_expulsion_guarda_cambios_directos_en_empleado(self, tmp_path):
+        """Prueba que los cambios hechos sobre el Empleado no se pierden al expulsar"""
+        registro = RegistroEmpresas(str(tmp_path), max_empresas=1)
+        acme = registro.obtener("acme")
+        acme.agregar_empleado("1", "Ana", "Ruiz", "Dev", 3000000, "indefinido")
+        assert acme.guardar_datos()
+        acme.obtener_empleado("1").actualizar_valoracion(9)
+        
+        registro.obtener("beta")
+        assert registro.empresas_residentes() == ["beta"]
+        assert SistemaRRHH(str(tmp_path / "acme.json")).obtener_empleado("1").valoracion == 9
+    
+    def test_limite_de_memoria_y_empresas_en_uso(self, tmp_path):
+        """Prueba el límite de memoria sin expulsar empresas en uso"""
+        registro = RegistroEmpresas(str(tmp_path), max_bytes=1)
+        with registro.usar("acme") as acme:
+            acme.agregar_empleado("1", "Ana", "Ruiz", "Dev", 3000000, "indefinido")
+            registro.obtener("beta")
+            assert registro.empresas_residentes() == ["acme", "beta"]
+            assert registro.memoria_estimada() >= BYTES_POR_EMPLEADO
+        
+        # Basta con expulsar a acme: las empresas vacías no suman memoria
+        registro.obtener("gama")
+        assert registro.empresas_residentes() == ["beta", "gama"]
+        assert os.path.exists(tmp_path / "acme.json")
+    
+    def test_expulsar_inactivas_y_cerrar(self, tmp_path):
+        """Prueba la expulsión por inactividad y el cierre del registro"""
+        registro = RegistroEmpresas(str(tmp_path))
+        registro.obtener("acme").agregar_empleado("1", "Ana", "Ruiz", "Dev", 3000000, "indefinido")
+        with registro.usar("beta"):
+            assert registro.expulsar_inactivas(0) == ["acme"]
+        assert registro.empresas_residentes() == ["beta"]
+        
+        registro.obtener("beta").agregar_empleado("2", "Luis", "Mora", "QA", 2000000, "indefinido")
+        assert registro.cerrar()
+        assert registro.empresas_residentes() == []
+        assert SistemaRRHH(str(tmp_path / "beta.json")).obtener_empleado("2") is not None
+        with pytest.raises(ValueError):
+            registro.obtener("../otra")
+    
+    def test_exportar_npz_solo_categorias_propias(self, tmp_path):
+        """Prueba que la exportación columnar no incluye categorías de otras empresas"""
+        np = pytest.importorskip("numpy")
+        registro = RegistroEmpresas(str(tmp_path))
+        registro.obtener("acme").agregar_empleado("1", "Ana", "Ruiz", "Director secreto ACME",
+                                                  9000000, "termino_fijo")
+        beta = registro.obtener("beta")
+        beta.agregar_empleado("2", "Luis", "Mora", "QA", 2000000, "indefinido")
+        beta.agregar_empleado("3", "Eva", "Gil", "Dev", 2500000, "indefinido")
+        
+        ruta = str(tmp_path / "beta.npz")
+        assert beta.exportar_npz(ruta)
+        with np.load(ruta) as datos:
+            assert sorted(datos["cargos"]) == ["Dev", "QA"]
+            assert list(datos["tipos_contrato"]) == ["indefinido"]
+            assert [datos["cargos"][codigo] for codigo in datos["codigo_cargo"]] == ["QA", "Dev"]
+            assert list(datos["codigo_tipo_contrato"]) == [0, 0]
+
+
+class TestArnesNomina:
+    """Pruebas diferenciales de los motores de nómina frente a la referencia"""
+    
+    @pytest.fixture(autouse=True)
+    def restaurar_reglas(self):
+        """Restaura las reglas predeterminadas después de cada prueba"""
+        yield
+        configurar_reglas_nomina(REGLAS_NOMINA_PREDETERMINADAS)
+    
+    @pytest.mark.parametrize("semilla", [1, 2])
+    def test_motores_coinciden_con_referencia(self, tmp_path, semilla):
+        """Prueba que todos los motores registrados producen las mismas nóminas"""
+        resultados = arnes_nomina.ejecutar_arnes(150, "2024-06", semilla, directorio=str(tmp_path))
+        assert set(resultados) == {"referencia", *arnes_nomina.MOTORES}
+        for nombre, resultado in resultados.items():
+            assert resultado["aplica"], nombre
+            assert resultado["diferencias"] == [], nombre
+    
+    def test_reglas_adicionales_y_motor_defectuoso(self, tmp_path):
+        """Prueba que el arnés detecta diferencias y omite motores que no aplican"""
+        reglas = REGLAS_NOMINA_PREDETERMINADAS + [
+            {"nombre": "solidaridad", "concepto": "deduccion", "porcentaje_pb": 100,
+             "salario_desde": 4000000}]
+        assert configurar_reglas_nomina(reglas)
+        
+        @arnes_nomina.registrar_motor("defectuoso")
+        def defectuoso(sistema, periodo, horas_extra, bonificaciones, deducciones):
+            nominas = arnes_nomina.referencia(sistema, periodo, horas_extra, bonificaciones, deducciones)
+            for nomina_data in nominas.values():
+                nomina_data["salario_neto"] += 0.004  # menos de medio centavo
+            nominas.pop(min(nominas))
+            return nominas
+        
+        motores = ["procesar_nomina_completa", "motor_centavos_lote", "defectuoso"]
+        try:
+            exacta = arnes_nomina.ejecutar_arnes(80, "2024-06", 3, motores, str(tmp_path))
+            tolerante = arnes_nomina.ejecutar_arnes(80, "2024-06", 3, motores, str(tmp_path),
+                                                    tolerancia_centavos=1)
+        finally:
+            del arnes_nomina.MOTORES["defectuoso"]
+        
+        assert not exacta["motor_centavos_lote"]["aplica"]
+        assert exacta["procesar_nomina_completa"]["diferencias"] == []
+        diferencias = exacta["defectuoso"]["diferencias"]
+        assert diferencias[0].endswith("falta la nómina")
+        assert "salario_neto" in diferencias[1]
+        assert exacta["defectuoso"]["toleradas"] == 0
+        
+        # La tolerancia acepta la diferencia de centavo pero la informa
+        assert tolerante["defectuoso"]["diferencias"] == [diferencias[0]]
+        assert tolerante["defectuoso"]["toleradas"] == 73
+        assert tolerante["procesar_nomina_completa"]["toleradas"] == 0
+
 class TestIntegracion:
     """Pruebas de integración del sistema completo"""
     